@@ -1,29 +1,31 @@
 # Librerias
 import pandas as pd
 import numpy as np
-import numpy_financial as npf
-from numpy_financial import irr, npv
 import streamlit as st
-import rasterio
-import glob
-import os
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from streamlit_folium import folium_static
-from streamlit_folium import st_folium
-import folium
 from carga_datos import subida_tabla, subida_checkbox, subida_formato
+from rasters_fv import (MAX_DISTANCIA_PIXELES, cargar_cubo_pvout, cargar_cubo_ghi, consultar_cubo,
+                        muestrear_sitios)
+from motor_fv import (MESES_ES, preparar_consumo, tarifas_consumo, consumo_por_mes, evaluar_proyecto,
+                      calcular_cobertura, indicadores_financieros, dimensionar_sistema,
+                      produccion_anual_por_kWp, generacion_mensual_por_kWp)
+from optimizador_fv import optimizar_tamano
+from finanzas_fv import van_lote
+from cache_fv import CacheEscenarios, huella
+from ingesta_fv import ingerir, columnas_archivo
+from lote_fv import agregar_por_sitio, evaluar_bloque
+from horario_fv import simular_horario, dia_tipico
+from baterias_fv import evaluar_baterias, COSTO_KWH_BATERIA
+from tarifas_fv import ESQUEMAS, ahorro_por_esquema
+from graficos_fv import figura_consumo, figura_flujo_caja, figura_cobertura, precalentar_exportador
+from mapas_fv import imagen_pvout, imagen_raster, mapa_base, marcador
+from mapa_nacional_fv import capas_disponibles
+from reportes_fv import ColaReportes
+from montecarlo_fv import simular_montecarlo
+from sensibilidad_fv import PARAMETROS, tornado, mapa_calor
 from datetime import datetime
 import io # para crear buffer en memoria
-import base64
-import plotly.io as pio
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-import tempfile
-import os
+# plotly, folium/streamlit_folium y reportlab se importan dentro de las funciones que los usan,
+# para no cargarlos al iniciar cada proceso si el panel o botón correspondiente no se usa
 
 
 
@@ -32,7 +34,109 @@ import os
 st.set_page_config(page_title= 'Solar OnGrid', layout= 'wide', initial_sidebar_state= "collapsed")
 
 
+# Rasters cargados una sola vez por proceso y compartidos entre sesiones
+@st.cache_resource(show_spinner="Cargando rasters de radiación...")
+def cubo_pvout():
+    return cargar_cubo_pvout()
+
+
+@st.cache_resource(show_spinner="Cargando raster GHI...")
+def cubo_ghi():
+    return cargar_cubo_ghi()
+
+
+# Mapas base de folium (sin capa, con el PVOUT anual o con un mapa nacional de
+# mapa_nacional_fv), armados y renderizados una sola vez
+@st.cache_resource(show_spinner="Preparando capa del mapa...")
+def capa_raster(ruta):
+    # ruta: COG de mapa_nacional_fv, o None para el PVOUT anual
+    return imagen_pvout(cubo_pvout()) if ruta is None else imagen_raster(ruta)
+
+
+@st.cache_resource
+def mapa_cacheado(zoom, capturar_clics, capa):
+    # capa: None o (leyenda, ruta) como en capa_raster
+    if capa is None:
+        return mapa_base(zoom, capturar_clics)
+    leyenda, ruta = capa
+    return mapa_base(zoom, capturar_clics, capa_raster(ruta), leyenda)
+
+
+# Cola de reportes PDF en segundo plano, compartida entre sesiones; el proceso de exportación de
+# gráficos (kaleido) se arranca con el primer reporte pedido, no al abrir la app
+@st.cache_resource
+def cola_reportes():
+    return ColaReportes(al_primer_pedido=precalentar_exportador)
+
+
+# Caché de escenarios por capas (archivo, consumo, muestreo, proyección, VAN, gráficos)
+@st.cache_resource
+def cache_escenarios():
+    return CacheEscenarios(max_entradas=256)
+
+
+# Lectura de un archivo subido (CSV o Excel) a DataFrame
+def leer_archivo(contenido, tipo_archivo, columna_cliente=None):
+    # Lectura por bloques con limpieza y agregación mensual (ingesta_fv); devuelve (df, resumen).
+    # Si el archivo trae la columna de cliente se agrega por cliente y se conservan lat/lon.
+    columnas = columnas_archivo(contenido, tipo_archivo)
+    if columna_cliente not in columnas:
+        return ingerir(contenido, tipo_archivo)
+    extras = [c for c in ("lat", "lon") if c in columnas]
+    return ingerir(contenido, tipo_archivo, columna_cliente, extras)
+
+
+def mostrar_estadisticas_cache(cache):
+    # Estadísticas de la caché de escenarios (aciertos, fallos y expulsiones por capa)
+    with st.sidebar.expander("⚙️ Caché de cálculos"):
+        st.dataframe(cache.estadisticas(), use_container_width=True)
+
+
+def mostrar_resumen_clientes(resultados, columna_cliente):
+    # Tabla ordenable (clic en el encabezado) con el resultado de cada cliente
+    st.title("👥 Resultados por cliente")
+    st.caption("Cada cliente se dimensiona con el objetivo de cobertura y los parámetros de la barra lateral; "
+               "elige un cliente arriba para ver su panel completo.")
+    validos = resultados["estado"] == "ok"
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Clientes", f"{len(resultados)}")
+    col2.metric("Rentables (VAN > 0)", f"{int(((resultados['van'] > 0) & validos).sum())}")
+    col3.metric("Potencia total", f"{resultados.loc[validos, 'tamano_sistema_kWp'].sum():,.1f} kWp")
+    col4.metric("Inversión total", f"${resultados.loc[validos, 'inversion_usd'].sum():,.0f}")
+    if not validos.all():
+        st.warning(f"⚠️ {int((~validos).sum())} clientes tienen coordenadas fuera del área de los rasters.")
+
+    tabla = pd.DataFrame({
+        "Cliente": resultados[columna_cliente].astype(str),
+        "Meses": resultados["meses"],
+        "Consumo (kWh/mes)": resultados["consumo_promedio_kWh"],
+        "Tarifa ($/kWh)": resultados["tarifa_mas_impuestos"],
+        "Tamaño (kWp)": resultados["tamano_sistema_kWp"],
+        "Inversión (USD)": resultados["inversion_usd"],
+        "VAN (USD)": resultados["van"],
+        "TIR (%)": resultados["tir"] * 100,
+        "Payback (años)": resultados["payback"],
+    }).sort_values("VAN (USD)", ascending=False)
+    st.dataframe(
+        tabla, use_container_width=True, hide_index=True,
+        column_config={
+            "Consumo (kWh/mes)": st.column_config.NumberColumn(format="%.1f"),
+            "Tarifa ($/kWh)": st.column_config.NumberColumn(format="%.4f"),
+            "Tamaño (kWp)": st.column_config.NumberColumn(format="%.2f"),
+            "Inversión (USD)": st.column_config.NumberColumn(format="$%.2f"),
+            "VAN (USD)": st.column_config.NumberColumn(format="$%.2f"),
+            "TIR (%)": st.column_config.NumberColumn(format="%.1f%%"),
+            "Payback (años)": st.column_config.NumberColumn(format="%.1f"),
+        },
+    )
+    st.download_button("📤 Descargar resultados (CSV)", resultados.to_csv(index=False).encode("utf-8"),
+                       file_name="resultados_clientes.csv", mime="text/csv")
+
+
 def main ():
+    cache = cache_escenarios()
+
     # Título de pagina
     st.title('Factibilidad de Sistema On-Grid Fotovoltaico en Ecuador')
     
@@ -62,13 +166,11 @@ def main ():
         st.subheader("Saludos, selecciona una opción de carga")
 
     archivo_datos = st.session_state.get("archivo_datos",None)
+    columna_cliente = st.session_state.get("columna_cliente", "Cliente").strip()
    
 
     #######
     with st.popover("Selecciona tus coordenadas"):
-        # Carpeta con el archivo raster GHI (.tif)
-        ruta_ghi = 'solar_python/ghi/GHI.tif'
-
         ##############
         # --- Inicializar estado ---
         if "lat" not in st.session_state:
@@ -99,21 +201,27 @@ def main ():
                                 format="%.10f",
                                 on_change=actualizar_lon)
 
-        # --- Mapa con clic para capturar coordenadas ---
-        m = folium.Map(location=[st.session_state["lat"], st.session_state["lon"]], zoom_start=7)
-        folium.Marker(location=[st.session_state["lat"], st.session_state["lon"]],
-                    tooltip="Coordenada actual",
-                    icon=folium.Icon(color="blue")).add_to(m)
-        m.add_child(folium.LatLngPopup())
+        capas_mapa = {"PVOUT anual (kWh/kWp)": None, **capas_disponibles()}
+        capa_elegida = st.sidebar.selectbox("🗺️ Capa en los mapas", ["Ninguna", *capas_mapa])
+        capa_mapa = None if capa_elegida == "Ninguna" else (capa_elegida, capas_mapa[capa_elegida])
 
-        # --- Mostrar el mapa e interactuar ---
+        # --- Mapa con clic para capturar coordenadas ---
+        # El mapa base es siempre el mismo objeto; solo el marcador y el centro cambian entre reruns
+        from streamlit_folium import st_folium
         st.write("📍 Haz clic en el mapa o usa la barra lateral para ingresar coordenadas:")
-        map_data = st_folium(m, width=700, height=500)
+        map_data = st_folium(
+            mapa_cacheado(7, True, capa_mapa),
+            feature_group_to_add=marcador(st.session_state["lat"], st.session_state["lon"], tooltip="Coordenada actual"),
+            center=(st.session_state["lat"], st.session_state["lon"]),
+            width=700, height=500, returned_objects=["last_clicked"], render=False,
+        )
 
-        # --- Actualizar si hubo clic ---
-        if map_data.get("last_clicked"):
-            st.session_state["lat"] = round(map_data["last_clicked"]["lat"], 10)
-            st.session_state["lon"] = round(map_data["last_clicked"]["lng"], 10)
+        # --- Actualizar si hubo un clic nuevo (el mapa no se vuelve a montar y conserva el último) ---
+        clic = map_data.get("last_clicked")
+        if clic and clic != st.session_state.get("ultimo_clic"):
+            st.session_state["ultimo_clic"] = clic
+            st.session_state["lat"] = round(clic["lat"], 10)
+            st.session_state["lon"] = round(clic["lng"], 10)
 
         # --- Mostrar coordenadas actuales finales ---
         st.success(f"✅ Coordenadas seleccionadas: lat = {st.session_state['lat']}, lon = {st.session_state['lon']}")
@@ -126,23 +234,44 @@ def main ():
         st.stop()          
 
     ########333
-    # 🔍 Abrir el raster y extraer el valor en la coordenada
-    try:
-        with rasterio.open(ruta_ghi) as src:
-            # Verifica si las coordenadas están en el mismo CRS que el raster
-            coords = [(lon, lat)]
-            radiacion_diaria = list(src.sample(coords))[0][0]
-        
-        # Validar si el valor es numérico y no NaN o inf
-        if np.isnan(radiacion_diaria) or np.isinf(radiacion_diaria):
-            st.error(f"⚠️ La radiación solar en ({lat}, {lon}) es inválida (NaN o Inf).")
-            st.info("Asegúrate de que las coordenadas estén dentro del área válida del raster.")
-            st.stop()        
-
-    except Exception as e:
-        st.sidebar.error(f"❌ Error al acceder a los datos del raster: {e}")
-        st.sidebar.info("Verifica que las coordenadas estén dentro del área válida.")
-        st.stop()
+    # 🔍 Extraer GHI y PVOUT mensual en la coordenada desde los rasters en memoria.
+    # Los puntos que caen justo fuera de la máscara de datos (costa, bordes) toman el pixel
+    # válido más cercano, hasta MAX_DISTANCIA_PIXELES
+    bilineal = st.sidebar.checkbox("📐 Interpolación bilineal de los rasters", value=False)
+
+    def muestrear_ubicacion(lat, lon):
+        # PVOUT (1, 12) y GHI diario en (lat, lon); detiene la app si no hay datos utilizables
+        def muestrear():
+            pvout, desplazamiento_pvout = consultar_cubo(cubo_pvout(), lat, lon, bilineal, MAX_DISTANCIA_PIXELES)
+            ghi, desplazamiento_ghi = consultar_cubo(cubo_ghi(), lat, lon, bilineal, MAX_DISTANCIA_PIXELES)
+            return pvout, ghi[:, 0], np.maximum(desplazamiento_pvout, desplazamiento_ghi)
+
+        try:
+            pvout_sitio, ghi_sitio, desplazamiento = cache.obtener(
+                "muestreo", huella(lat, lon, bilineal), muestrear
+            )
+            radiacion_diaria = ghi_sitio[0]
+
+            # Validar si el valor es numérico y no NaN o inf
+            if np.isnan(desplazamiento[0]) or not np.all(np.isfinite(pvout_sitio)) or not np.isfinite(radiacion_diaria):
+                st.error(f"⚠️ No hay datos de radiación solar en ({lat}, {lon}) ni en los pixeles cercanos.")
+                st.info("Asegúrate de que las coordenadas estén dentro del área válida del raster.")
+                st.stop()
+            if desplazamiento[0] > 0:
+                st.warning(f"⚠️ ({lat}, {lon}) está fuera del área con datos de los rasters; se usan los valores "
+                           f"del pixel válido más cercano, a {desplazamiento[0]:.1f} km.")
+
+        except (FileNotFoundError, ValueError) as e:
+            # Falta el raster GHI o no es el que corresponde: no hay forma de estimar la producción
+            st.error(f"❌ {e}")
+            st.stop()
+        except Exception as e:
+            st.sidebar.error(f"❌ Error al acceder a los datos del raster: {e}")
+            st.sidebar.info("Verifica que las coordenadas estén dentro del área válida.")
+            st.stop()
+        return pvout_sitio, radiacion_diaria
+
+    pvout_sitio, radiacion_diaria = muestrear_ubicacion(lat, lon)
     # Ingreso de datos de cobertura consumo y factor de perdidas
     # Generar opciones de 0% a 100% en pasos de 0.5
     opciones_porcentaje = np.round(np.arange(0, 100, 1), 1).tolist()
@@ -152,7 +281,8 @@ def main ():
         options= opciones_porcentaje,
         value= 75.0 # valor predeterminado
         )
-    st.session_state['objetivo_cobertura'] = objetivo_cobertura/100
+    objetivo_cobertura = objetivo_cobertura/100
+    st.session_state['objetivo_cobertura'] = objetivo_cobertura
     factor_perdidas = st.sidebar.select_slider(
         "✅ Factor de pérdidas (%):",
         options= opciones_porcentaje,
@@ -186,6 +316,42 @@ def main ():
         help="Tasa de oportunidad que estás usando como referencia para evaluar si el proyecto es financieramente conveniente.")
     
     costo_Wp = st.sidebar.number_input("💸 Costo por Wp", value=1.2, help="Cuánto cuesta instalar 1 watt de potencia nominal del sistema solar.")
+
+    # Esquema de conexión con el que se liquida la factura (None = toda la generación a tarifa)
+    esquema = st.sidebar.selectbox("🔌 Esquema de conexión", [None] + list(ESQUEMAS),
+        format_func=lambda e: "Estimación simple (toda la generación a tarifa)" if e is None else ESQUEMAS[e],
+        help="Calcula la factura mensual con el excedente recortado (inyección cero), pagado a otro precio "
+             "(Net Billing) o guardado como saldo de energía (Net Metering).")
+
+    # Almacenamiento (0 kWh = sin batería)
+    capacidad_bateria = st.sidebar.number_input("🔋 Capacidad de batería (kWh)", min_value=0.0, value=0.0, step=1.0,
+        help="Guarda el excedente solar del día para usarlo en la noche. 0 = sin batería.")
+    costo_kWh_bateria = COSTO_KWH_BATERIA
+    if capacidad_bateria > 0:
+        costo_kWh_bateria = st.sidebar.number_input("💲 Costo de batería ($/kWh)", min_value=0.0,
+            value=COSTO_KWH_BATERIA, help="Costo instalado por kWh de capacidad; se repone cada 10 años.")
+
+    # Modo optimizador: busca el tamaño con mejor VAN o payback en lugar del objetivo fijo
+    modo_optimizador = st.sidebar.toggle("🎯 Optimizar tamaño del sistema", value=False,
+        help="Evalúa coberturas de 1% a 150% y elige el tamaño con mayor VAN o menor payback.")
+    if modo_optimizador:
+        criterio_optimizador = st.sidebar.radio("Criterio de optimización", ["van", "payback"],
+            format_func=lambda c: "Máximo VAN" if c == "van" else "Menor payback")
+    # Con cualquier esquema se muestra la comparación de los tres, que incluye Net Billing:
+    # sin este precio su excedente se pagaría a la tarifa completa
+    valor_excedente = None
+    if modo_optimizador or capacidad_bateria > 0 or esquema is not None:
+        valor_excedente = st.sidebar.select_slider(
+            "💱 Valor del excedente inyectado (% de la tarifa):",
+            options= list(range(0, 101, 5)),
+            value= 50,
+            help="Precio al que se reconoce la energía que no consumes y se inyecta a la red "
+                 "(Net Billing y comparación de esquemas).")
+    if modo_optimizador:
+        area_max_m2 = st.sidebar.number_input("📐 Área de techo disponible (m²)", min_value=0.0, value=0.0,
+            help="0 = sin límite")
+        presupuesto_max = st.sidebar.number_input("💰 Presupuesto máximo ($)", min_value=0.0, value=0.0,
+            help="0 = sin límite")
     ########
     ### trabajando datos
  #########            
@@ -197,10 +363,17 @@ def main ():
             tipo_archivo = archivo_datos.type
 
             try:
-                if tipo_archivo == "text/csv":
-                    df = pd.read_csv(archivo_datos)
-                elif tipo_archivo == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
-                    df = pd.read_excel(archivo_datos)
+                if tipo_archivo in ("text/csv", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"):
+                    # Se relee solo si cambia el contenido del archivo
+                    contenido = archivo_datos.getvalue()
+                    df, resumen_ingesta = cache.obtener(
+                        "archivo", huella(tipo_archivo, contenido, columna_cliente),
+                        lambda: leer_archivo(contenido, tipo_archivo, columna_cliente)
+                    )
+                    df = df.copy()
+                    if resumen_ingesta["filas_descartadas"]:
+                        st.warning(f"⚠️ Se descartaron {resumen_ingesta['filas_descartadas']} de "
+                                   f"{resumen_ingesta['filas']} filas sin fecha o consumo válidos.")
                 else:
                     st.warning("⚠️ Formato de archivo no compatible")
                     df = pd.DataFrame()
@@ -224,10 +397,8 @@ def main ():
             # Elimnación de espacios innecesarios (principio y final)
             df.columns = df.columns.str.strip()
 
-            # Se cambia la columna 'Fecha' a tipo datetime
-            if choice != "Selecciona los aparatos en tu hogar":
-                df['Fecha']=pd.to_datetime(df['Fecha'], format = 'mixed')
-            else:
+            # Con la selección de aparatos se construye un año de consumo estimado
+            if choice == "Selecciona los aparatos en tu hogar":
                 # Crear 12 fechas: primer día de cada mes del año actual
                 fechas = pd.date_range(start=f"{anio_actual}-01-01", periods=12, freq="MS")
                 
@@ -261,29 +432,65 @@ def main ():
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
 
-            # Lista de columnas a limpiar y redondear
-            columnas = ["Monto", "Total_pagar"]
+            # Varios clientes en el mismo archivo: todos se dimensionan y evalúan en una sola pasada
+            # vectorizada (lote_fv) y se muestra una tabla ordenable; el panel completo queda
+            # disponible para el cliente que se elija
+            if columna_cliente in df.columns and df[columna_cliente].nunique() > 1:
+                parametros = {
+                    "objetivo_cobertura": objetivo_cobertura,
+                    "factor_perdidas": factor_perdidas,
+                    "costo_Wp": costo_Wp,
+                    "mantenimiento_anual": mantenimiento_anual,
+                    "tasa_descuento": tasa_descuento,
+                    "años_proyecto": años_proyecto,
+                }
 
-            
-            # Limpieza de caracteres y redondeo a 2 decimales
-            for col in columnas:
-                df[col] = df[col].replace(r'[\$,]', '', regex=True).astype(float).round(2)
-            
-            # Periodo de analisis
-            # Diccionario de meses en español (completos)
-            meses_es = {
-                1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril',
-                5: 'Mayo', 6: 'Junio', 7: 'Julio', 8: 'Agosto',
-                9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
-            }
-
-            # Extraer año y número de mes
-            df['Año'] = df['Fecha'].dt.year
-            df['Mes_num'] = df['Fecha'].dt.month
-            df['Mes'] = df['Mes_num'].map(meses_es)
-
-            # Ordenar cronológicamente
-            df = df.sort_values(by=['Año', 'Mes_num'])
+                def evaluar_clientes():
+                    # Sin lat/lon por cliente se usan las coordenadas del mapa
+                    facturas = df.copy()
+                    for columna, valor in (("lat", lat), ("lon", lon)):
+                        if columna in facturas.columns:
+                            facturas[columna] = pd.to_numeric(facturas[columna], errors='coerce').fillna(valor)
+                        else:
+                            facturas[columna] = valor
+                    sitios = agregar_por_sitio(facturas, columna_cliente)
+                    lat_sitios = sitios["lat"].to_numpy(dtype=float)
+                    lon_sitios = sitios["lon"].to_numpy(dtype=float)
+                    pvout, ghi = cache.obtener(
+                        "muestreo", huella(lat_sitios, lon_sitios, bilineal),
+                        lambda: muestrear_sitios(lat_sitios, lon_sitios, cubo_pvout(), cubo_ghi(),
+                                                 bilineal, MAX_DISTANCIA_PIXELES)
+                    )
+                    return evaluar_bloque(sitios, pvout.astype(float), ghi.astype(float), parametros)
+
+                clientes = df[columna_cliente].drop_duplicates().tolist()
+                seleccion = st.selectbox("👥 Cliente", [None] + clientes,
+                    format_func=lambda c: f"Resumen de los {len(clientes)} clientes" if c is None else str(c))
+
+                if seleccion is None:
+                    resultados = cache.obtener(
+                        "clientes",
+                        huella(df, columna_cliente, lat, lon, parametros, bilineal, MAX_DISTANCIA_PIXELES),
+                        evaluar_clientes
+                    )
+                    mostrar_resumen_clientes(resultados, columna_cliente)
+                    mostrar_estadisticas_cache(cache)
+                    return
+                df = df[df[columna_cliente] == seleccion].drop(columns=[columna_cliente]).reset_index(drop=True)
+
+                # El panel del cliente se calcula en sus propias coordenadas (las mismas que usa la tabla
+                # de resumen: la primera lat/lon del cliente, o las del mapa si no las trae)
+                coordenadas = [pd.to_numeric(df[c], errors='coerce').fillna(valor).iloc[0] if c in df.columns
+                               else valor for c, valor in (("lat", lat), ("lon", lon))]
+                if coordenadas != [lat, lon]:
+                    lat, lon = (float(c) for c in coordenadas)
+                    st.info(f"📍 Se usan las coordenadas del cliente: lat = {lat}, lon = {lon}")
+                    pvout_sitio, radiacion_diaria = muestrear_ubicacion(lat, lon)
+
+            # Limpieza, fechas (Año, Mes_num, Mes) y orden cronológico
+            clave_consumo = huella(df)
+            datos_consumo = df
+            df = cache.obtener("consumo", clave_consumo, lambda: preparar_consumo(datos_consumo.copy())).copy()
 
             # Cantidad de meses y años
             cant_meses = df['Mes'].count()
@@ -291,7 +498,7 @@ def main ():
             año_max = df['Año'].max()
 
             # Estadisticas descriptivas
-            consumo_promedio_kWh = df["Consumo subtotal"].mean()
+            consumo_promedio_kWh, tarifa_promedio_usd_kWh, tarifa_mas_impuestos = tarifas_consumo(df)
             consumo_min_kWh = df["Consumo subtotal"].min()
             consumo_max_kWh = df["Consumo subtotal"].max()
             consumo_std_kWh = df["Consumo subtotal"].std()
@@ -302,11 +509,6 @@ def main ():
             monto_promedio = df["Monto"].mean()
             monto_max = df["Monto"].max()
             Total_pagar_promedio = df["Total_pagar"].mean()
-            pago_promedio_usd = df["Monto"].mean()
-            pago_total_promedio_usd = df["Total_pagar"].mean()
-            tarifa_promedio_usd_kWh = pago_promedio_usd / consumo_promedio_kWh
-            
-            tarifa_mas_impuestos = pago_total_promedio_usd / consumo_promedio_kWh
             st.session_state['tarifa_mas_impuestos'] = tarifa_mas_impuestos
             
             #tarifa_mas_impuestos_ctvs = (pago_total_promedio_usd / consumo_promedio_kWh)*100
@@ -350,93 +552,144 @@ def main ():
                 return descripcion_usuario
         
             ##########
-            # Carpeta con los 12 archivos raster mensuales (.tif)
-            ruta_rasters = 'solar_python/monthly_pvout'
-            archivos_raster = sorted(glob.glob(os.path.join(ruta_rasters, '*.tif')))
-            # Función para extraer valor de un punto en cada raster
-            valores_mensuales = []
-
-            for path in archivos_raster:
-                with rasterio.open(path) as src:
-                    coords = [(lon, lat)]
-                    for val in src.sample(coords):
-                        valores_mensuales.append(val[0])
-
-            # Calcular promedio anual y factores relativos
-            valores_mensuales = np.array(valores_mensuales)
-            promedio_anual = np.mean(valores_mensuales)
-            factores_relativos = valores_mensuales / promedio_anual
+            # Valores de los 12 meses ya muestreados junto con el GHI
+            valores_mensuales = pvout_sitio[0].astype(float)
+            # La simulación horaria (esquemas, batería y perfil) parte de la misma generación mensual que
+            # el flujo de caja (GHI repartido según el PVOUT), así que sus resultados son comparables
+            generacion_kWp = generacion_mensual_por_kWp(radiacion_diaria, valores_mensuales / valores_mensuales.mean())
+            # Las claves de los cálculos del sitio usan los valores muestreados: cambiar la ubicación o el
+            # modo de muestreo (bilineal, pixel más cercano) invalida todo lo que depende de ellos
+            clave_sitio = huella(lat, lon, valores_mensuales, radiacion_diaria)
 
             st.session_state['valores_mensuales']= valores_mensuales
-
-            
-            # Cálculos base
-            # --------------------------
-            # Producción mensual esperada por cada kWp instalado
-            produccion_por_kWp = promedio_anual * factor_perdidas # ya está en kWh/kWp
-
-
-            # Calcular el consumo promedio mensual
-            consumo_promedio_kWh = df['Consumo subtotal'].mean()
             st.session_state['consumo_promedio_kWh']=consumo_promedio_kWh
 
-            # Tamaño del sistema necesario
-            tamano_sistema_kWp_completo = consumo_promedio_kWh / produccion_por_kWp
-
-            # Tamaño del sistema necesario para cubrir el porcentaje deseado
-            tamano_sistema_kWp = tamano_sistema_kWp_completo * objetivo_cobertura
+            # Optimización del tamaño (reemplaza el objetivo de cobertura del slider)
+            consumo_mensual = None
+            tarifa_excedente = None
+            optimo = None
+            if modo_optimizador or capacidad_bateria > 0 or esquema is not None:
+                consumo_mensual = consumo_por_mes(df)
+            if valor_excedente is not None:
+                tarifa_excedente = tarifa_mas_impuestos * valor_excedente / 100
+            if modo_optimizador:
+                optimo = cache.obtener(
+                    "optimizacion",
+                    huella(clave_consumo, clave_sitio, factor_perdidas, costo_Wp, mantenimiento_anual,
+                           años_proyecto, tasa_descuento, valor_excedente, criterio_optimizador,
+                           area_max_m2, presupuesto_max),
+                    lambda: optimizar_tamano(
+                        consumo_promedio_kWh, consumo_mensual, valores_mensuales, radiacion_diaria,
+                        factor_perdidas, tarifa_mas_impuestos, costo_Wp, mantenimiento_anual,
+                        años_proyecto, tasa_descuento, tarifa_excedente=tarifa_excedente,
+                        criterio=criterio_optimizador, area_max_m2=area_max_m2, presupuesto_max=presupuesto_max
+                    )
+                )
+                if optimo["encontrado"]:
+                    objetivo_cobertura = optimo["cobertura"]
+                    st.session_state['objetivo_cobertura'] = objetivo_cobertura
+                else:
+                    st.warning("⚠️ Ningún tamaño cumple las restricciones de área y presupuesto; se usa el objetivo de cobertura.")
+
+            # Dimensionamiento, proyección e indicadores económicos (motor_fv).
+            # La proyección no depende de la tasa de descuento: al cambiarla solo se recalcula el VAN.
+            clave_proyecto = huella(clave_consumo, clave_sitio, factor_perdidas, objetivo_cobertura, costo_Wp,
+                                    mantenimiento_anual, años_proyecto, tarifa_excedente, esquema)
+
+            # Con un esquema de conexión, la parte de la generación que se autoconsume en cada mes
+            # sale de la simulación horaria (el resto es excedente aunque el mes tenga déficit)
+            fraccion_autoconsumo = None
+            if esquema is not None:
+                tamano_estimado = dimensionar_sistema(consumo_promedio_kWh, valores_mensuales, factor_perdidas,
+                                                      objetivo_cobertura)["tamano_sistema_kWp"]
+                balance = cache.obtener(
+                    "horario", huella(clave_consumo, clave_sitio, tamano_estimado, factor_perdidas),
+                    lambda: simular_horario(lat, lon, generacion_kWp, tamano_estimado, consumo_mensual,
+                                            factor_perdidas)
+                )
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    fraccion_autoconsumo = np.nan_to_num(balance["autoconsumo"][0] / balance["generacion"][0])
+
+            proyecto = cache.obtener(
+                "proyeccion", clave_proyecto,
+                lambda: evaluar_proyecto(
+                    consumo_promedio_kWh, tarifa_mas_impuestos, valores_mensuales, radiacion_diaria,
+                    factor_perdidas, objetivo_cobertura, costo_Wp, mantenimiento_anual,
+                    años_proyecto, tasa_descuento, consumo_mensual, tarifa_excedente,
+                    esquema, fraccion_autoconsumo
+                )
+            )
+            if proyecto["valido"]:
+                proyecto = dict(proyecto)
+                proyecto["van"] = cache.obtener(
+                    "van", huella(clave_proyecto, tasa_descuento),
+                    lambda: van_lote(proyecto["flujo_de_caja"], tasa_descuento)[0]
+                )
+            produccion_por_kWp = proyecto["produccion_por_kWp"]
+            tamano_sistema_kWp_completo = proyecto["tamano_sistema_kWp_completo"]
+            tamano_sistema_kWp = proyecto["tamano_sistema_kWp"]
+            produccion_mensual_prom = proyecto["produccion_mensual_prom"]
+            inversion_fv = proyecto["inversion_usd"]
             st.session_state['tamano_sistema_kWp'] = tamano_sistema_kWp
-            
-            # Producción mensual estimada (misma para todos los meses)
-            produccion_mensual_real  = tamano_sistema_kWp * valores_mensuales
-            produccion_mensual_prom = produccion_mensual_real.mean()
+
+            # Batería: al flujo del sistema FV solo (el mismo de arriba) se le suma el flujo incremental
+            # de guardar el excedente horario, así que la diferencia de VAN es solo la de la batería.
+            # Se evalúan de 0 a 2 veces la capacidad elegida para mostrar la curva de VAN.
+            baterias = None
+            indice_bateria = None
+            if capacidad_bateria > 0 and proyecto["valido"]:
+                # Precio que el flujo FV le da al excedente horario que la batería deja de exportar:
+                # recortado (0), pagado a tarifa_excedente (Net Billing) o acreditado a tarifa (Net
+                # Metering y el balance mensual sin esquema, que lo compensa dentro del mes)
+                precio_excedente = {"inyeccion_cero": 0.0, "net_billing": tarifa_excedente}.get(
+                    esquema, tarifa_mas_impuestos)
+
+                def evaluar_almacenamiento():
+                    horario = cache.obtener(
+                        "horario", huella(clave_consumo, clave_sitio, tamano_sistema_kWp, factor_perdidas),
+                        lambda: simular_horario(lat, lon, generacion_kWp, tamano_sistema_kWp, consumo_mensual,
+                                                factor_perdidas)
+                    )
+                    return evaluar_baterias(
+                        horario["generacion_horaria"][0], horario["carga_horaria"][0],
+                        np.linspace(0, 2 * capacidad_bateria, 21), proyecto["inversion_usd"], mantenimiento_anual,
+                        años_proyecto, tarifa_mas_impuestos, precio_excedente, tasa_descuento,
+                        costo_kWh=costo_kWh_bateria, flujo_fv=proyecto["flujo_de_caja"]
+                    )
+                baterias = cache.obtener(
+                    "baterias", huella(clave_proyecto, capacidad_bateria, costo_kWh_bateria, precio_excedente,
+                                       tasa_descuento),
+                    evaluar_almacenamiento
+                )
+                indice_bateria = int(np.argmin(np.abs(baterias["simulacion"]["capacidades_kWh"] - capacidad_bateria)))
+                flujo_con_bateria = baterias["flujos"][indice_bateria]
+                proyecto = dict(proyecto)
+                proyecto.update(indicadores_financieros(flujo_con_bateria, tasa_descuento))
+                proyecto["inversion_usd"] = -flujo_con_bateria[0]
+                proyecto["ahorros_anuales"] = flujo_con_bateria[1:].tolist()
+                proyecto["flujo_de_caja"] = flujo_con_bateria.tolist()
 
             ##########
             # Análisis económico
-            tarifa_promedio_usd_kWh = st.session_state.get('tarifa_promedio_usd_kWh')
-            
-            inversion_usd = tamano_sistema_kWp * 1000 * costo_Wp
+            inversion_usd = proyecto["inversion_usd"]
 
             ahorro_mensual = consumo_promedio_kWh * tarifa_promedio_usd_kWh
             ahorro_anual = ahorro_mensual * 12
-            
+
             ############
             # Proyección a largo plazo
-            # Parámetros de entrada
-            incremento_tarifa = 0.02
-            
-            # Cálculos base
-            produccion_prom_kWp_mes = radiacion_diaria * 30 * factor_perdidas
-                        
-            # Producción mensual por año
-            produccion_anual = []
-            tarifa_actual = tarifa_mas_impuestos
-
-            for anio in range(1, años_proyecto + 1):
-                produccion_mensual = tamano_sistema_kWp * produccion_prom_kWp_mes * factores_relativos  * (1 - 0.005) ** (anio - 1)
-                produccion_anual_kwh = np.sum(produccion_mensual)
-                
-                ingreso_anual = produccion_anual_kwh * tarifa_actual
-                ahorro_neto = ingreso_anual - mantenimiento_anual
-                produccion_anual.append(ahorro_neto)
-                
-                tarifa_actual *= (1 + incremento_tarifa)
-
-            # Indicadores económicos
-            flujo_de_caja = [-inversion_usd] + produccion_anual
+            produccion_anual = proyecto["ahorros_anuales"]
+            flujo_de_caja = proyecto["flujo_de_caja"]
 
             # Verifica que no haya NaN ni Inf
-            van = None
-            if np.any(np.isnan(flujo_de_caja)) or np.any(np.isinf(flujo_de_caja)):
+            van = proyecto["van"]
+            tir = proyecto["tir"]
+            if not proyecto["valido"]:
                 st.error("⚠️ El flujo de caja contiene valores inválidos (NaN o Inf).")
-                tir = None
             else:
-                tir = npf.irr(flujo_de_caja)
-                van = npf.npv(tasa_descuento, flujo_de_caja)
-                flujo_acumulado = np.cumsum(flujo_de_caja)
-                payback_anio = next((i for i, val in enumerate(flujo_acumulado) if val >= 0), "Más de 20 años")
+                payback_anio = proyecto["payback_anio"] if proyecto["payback_anio"] is not None else "Más de 20 años"
                 st.session_state['van']=van
-                st.session_state['tir']=tir            
+                st.session_state['tir']=tir
 
             interpretacion_van = ""
             if tir is not None and not np.isnan(tir) and not np.isinf(tir):
@@ -464,8 +717,6 @@ def main ():
 
             left.markdown("## 📍 ¡Tu proyecto se encuetra aquí!")
             def mapa_ubic():
-                mi_mapa = folium.Map(location = [lat, lon],tiles = 'OpenStreetMap', zoom_start=15)
-
                 # Crear el contenido del popup como HTML con saltos de línea
                 popup_html = (
                     f"🔢 Consumo mensual promedio: {consumo_promedio_kWh:.2f} kWh<br>"
@@ -478,21 +729,16 @@ def main ():
                     f"💸 Inversión inicial: ${inversion_usd:.2f}"
                 )
 
-                # Agregar un marcador con resumen de consumo
-                mi_mapa.add_child(
-                    folium.Marker(
-                        location=[lat, lon],
-                        popup=folium.Popup(popup_html, max_width=1000),
-                        icon=folium.Icon(color="blue")
-                    )
-                )
-
-                return mi_mapa
+                # Marcador con resumen de consumo sobre el mapa base en caché
+                from streamlit_folium import st_folium
+                st_folium(mapa_cacheado(15, False, capa_mapa), feature_group_to_add=marcador(lat, lon, popup_html),
+                          center=(lat, lon), zoom=15, width=700, height=500, returned_objects=[], render=False,
+                          key="mapa_resultados")
             ##############################
             # Celdas del lado izquierdo
             # Mostrar mapa
             with left:
-                folium_static(mapa_ubic())
+                mapa_ubic()
 
             # Descripción de resultados
             with st.expander("📌 Resumen de resultados"):
@@ -534,155 +780,7 @@ def main ():
                 st.write(f"\n💰 Ahorro total neto en {vida_util} años: ${sum(produccion_anual):.2f}")
             
 ##########################
-            def crear_graficos_interactivos(df):
-                df['Total_pagar']=df['Total_pagar'].fillna(0)
-                df['Monto'] = df['Monto'].fillna(0)
-                
-                fig = make_subplots(
-                    rows=2, cols=1,
-                    shared_xaxes=True,
-                    vertical_spacing=0.15,
-                    subplot_titles=("Costo mensual por año", "Consumo mensual por año")
-                )
-
-                # --- Gráfico 1: Total_pagar ---
-                for año in df['Año'].unique():
-                    data = df[df['Año'] == año]
-                    fig.add_trace(
-                        go.Scatter(
-                            x=data['Mes'],
-                            y=data['Total_pagar'],
-                            mode='lines+markers',
-                            name=f"Año {año} - $",
-                            hovertemplate='Mes: %{x}<br>Monto: %{y:.2f} USD',
-                        ),
-                        row=1, col=1
-                    )
-
-                # Línea de promedio de pago
-                promedio_pago = df['Total_pagar'].mean()
-                fig.add_trace(
-                    go.Scatter(
-                        x=df['Mes'].unique(),
-                        y=[promedio_pago]*len(df['Mes'].unique()),
-                        mode='lines',
-                        name=f"Promedio: {promedio_pago:.2f} USD",
-                        line=dict(color='gray', dash='dash')
-                    ),
-                    row=1, col=1
-                )
-
-                # --- Gráfico 2: Consumo subtotal ---
-                for año in df['Año'].unique():
-                    data = df[df['Año'] == año]
-                    fig.add_trace(
-                        go.Scatter(
-                            x=data['Mes'],
-                            y=data['Consumo subtotal'],
-                            mode='lines+markers',
-                            name=f"Año {año} - kWh",
-                            hovertemplate='Mes: %{x}<br>Consumo: %{y:.0f} kWh',
-                        ),
-                        row=2, col=1
-                    )
-
-                # Línea de promedio de consumo
-                promedio_consumo = df['Consumo subtotal'].mean()
-                fig.add_trace(
-                    go.Scatter(
-                        x=df['Mes'].unique(),
-                        y=[promedio_consumo]*len(df['Mes'].unique()),
-                        mode='lines',
-                        name=f"Promedio: {promedio_consumo:.0f} kWh",
-                        line=dict(color='gray', dash='dash')
-                    ),
-                    row=2, col=1
-                )
-
-                # Configuración general
-                fig.update_layout(
-                    height=500,
-                    width=900,
-                    #title_text="Análisis de Consumo y Costos Mensuales",
-                    legend=dict(orientation="h", yanchor="bottom", y=1.04, xanchor="right", x=1),
-                    margin=dict(t=80, b=30),
-                )
-
-                fig.update_xaxes(title_text="", row=2, col=1, tickangle=45, tickvals=list(range(1,13)), ticktext=[meses_es[i+1] for i in range(12)])
-                fig.update_yaxes(title_text="Monto ($)", row=1, col=1)
-                fig.update_yaxes(title_text="Consumo (kWh)", row=2, col=1)
-
-                return fig
-
-            #################
-            # Gráfico de flujo de caja
-            def mostrar_flujo_de_caja(flujo_de_caja, vida_util):
-                años = list(range(vida_util + 1))
-                flujo_acumulado = np.cumsum(flujo_de_caja)
-
-                # Calcular indicadores financieros
-     
-                beneficio_total = sum(flujo_de_caja[1:])  # omitimos inversión inicial
-                inversion_inicial = -flujo_de_caja[0]
-                #b_c_ratio = beneficio_total / inversion_inicial if inversion_inicial != 0 else None
-
-                # Calcular punto de equilibrio (Payback)
-                flujo_acum = 0
-                payback_anio = None
-                for i, f in enumerate(flujo_de_caja):
-                    flujo_acum += f
-                    if flujo_acum >= 0:
-                        payback_anio = i
-                        break
-
-                # Crear figura interactiva
-                fig = go.Figure()
-
-                # Flujo de caja por año (barras)
-                fig.add_trace(go.Bar(
-                    x=años,
-                    y=flujo_de_caja,
-                    name="Flujo de Caja",
-                    marker_color='teal',
-                    hovertemplate='Año %{x}<br>USD: %{y:,.2f}<extra></extra>'
-                ))
-
-                # Flujo de caja acumulado (línea)
-                fig.add_trace(go.Scatter(
-                    x=años,
-                    y=flujo_acumulado,
-                    mode='lines+markers',
-                    name='Flujo Acumulado',
-                    line=dict(color='orange', dash='dash'),
-                    hovertemplate='Año %{x}<br>Acumulado: %{y:,.2f}<extra></extra>'
-                ))
-
-                # Línea de cero
-                fig.add_shape(type='line',
-                    x0=años[0], x1=años[-1], y0=0, y1=0,
-                    line=dict(color='black', dash='dash')
-                )
-
-                # Línea vertical de payback
-                if payback_anio is not None:
-                    fig.add_vline(
-                        x=payback_anio,
-                        line_dash="dot",
-                        line_color="red",
-                        annotation_text=f"Payback Año {payback_anio}",
-                        annotation_position="top left"
-                    )
-
-                # Diseño del gráfico
-                fig.update_layout(
-                    title=f"💰 Flujo de Caja del Proyecto Fotovoltaico ({vida_util} años)",
-                    xaxis_title="Año",
-                    yaxis_title="USD",
-                    template='plotly_white',
-                    height=450
-                )
-
-                return fig
+            # Las figuras de consumo, flujo de caja y cobertura se arman por trazas en graficos_fv
             # Mostrar indicadores financieros clave
             if van != None:
                 st.subheader("📊 Indicadores Financieros")
@@ -692,105 +790,250 @@ def main ():
                 col3.metric("Payback", f"Año {payback_anio}" if payback_anio is not None else "No recuperado")
                 
             ##################
-            def cobertura_solar():
-                # Convertir los valores mensuales a un diccionario: {mes: generación promedio}
-                generacion_por_mes = {i+1: val for i, val in enumerate(valores_mensuales)}
-
-                # Asignar la generación estimada por fila, según el mes correspondiente
-                df['Generacion estimada (kWh)'] = df['Mes_num'].map(generacion_por_mes) * tamano_sistema_kWp
-
-                # Calcular cobertura y excedente
-                df['Cobertura (%)'] = (df['Generacion estimada (kWh)'] / df['Consumo subtotal']) * 100
-                df['Excedente (kWh)'] = df['Generacion estimada (kWh)'] - df['Consumo subtotal']
-                df['Excedente (kWh)'] = df['Excedente (kWh)'].apply(lambda x: x if x > 0 else 0)
+            # Curva VAN vs tamaño del modo optimizador
+            def mostrar_curva_optimizacion(optimo):
+                import plotly.graph_objects as go
+                curva = optimo["curva"]
+                factible = curva[curva["Factible"]]
 
-                # Crear figura
                 fig = go.Figure()
-
-                # Cobertura mensual (%)
-                fig.add_trace(go.Bar(
-                    x=df['Fecha'],
-                    y=df['Cobertura (%)'],
-                    name='Cobertura mensual (%)',
-                    marker_color='green',
-                    text=df['Cobertura (%)'].round(1).astype(str) + '%',
-                    textposition='outside',
+                fig.add_trace(go.Scatter(
+                    x=curva["Tamaño (kWp)"],
+                    y=curva["VAN"],
+                    mode='lines',
+                    name='VAN (todos los tamaños)',
+                    line=dict(color='lightgray'),
+                    customdata=curva["Cobertura"] * 100,
+                    hovertemplate='%{x:.2f} kWp (%{customdata:.0f}%)<br>VAN: %{y:,.2f} USD<extra></extra>'
                 ))
-
-                # Excedente mensual (kWh)
-                fig.add_trace(go.Bar(
-                    x=df['Fecha'],
-                    y=df['Excedente (kWh)'],
-                    name='Excedente mensual (kWh)',
-                    marker_color='rgba(255, 100, 100, 0.7)',
-                    text=df['Excedente (kWh)'].round(1),
-                    textposition='outside',
+                fig.add_trace(go.Scatter(
+                    x=factible["Tamaño (kWp)"],
+                    y=factible["VAN"],
+                    mode='lines',
+                    name='VAN (dentro de restricciones)',
+                    line=dict(color='teal'),
+                    customdata=factible["Cobertura"] * 100,
+                    hovertemplate='%{x:.2f} kWp (%{customdata:.0f}%)<br>VAN: %{y:,.2f} USD<extra></extra>'
                 ))
+                if optimo["encontrado"]:
+                    fig.add_trace(go.Scatter(
+                        x=[optimo["tamano_sistema_kWp"]],
+                        y=[optimo["van"]],
+                        mode='markers',
+                        name=f"Óptimo: {optimo['tamano_sistema_kWp']:.2f} kWp ({optimo['cobertura']*100:.0f}%)",
+                        marker=dict(color='red', size=12, symbol='star')
+                    ))
 
-                # Diseño del gráfico
                 fig.update_layout(
-                    title='☀️ Cobertura solar y excedente mensual',
-                    xaxis_title=None,
-                    yaxis_title='Porcentaje (%) / Energía (kWh)',
-                    barmode='group',
-                    bargap=0.2,
-                    uniformtext_minsize=8,
-                    uniformtext_mode='hide',
+                    title="🎯 VAN según el tamaño del sistema",
+                    xaxis_title="Tamaño del sistema (kWp)",
+                    yaxis_title="VAN (USD)",
+                    template='plotly_white',
+                    height=400,
                     legend=dict(x=0.5, xanchor='center', orientation='h')
                 )
-                st.plotly_chart(fig, use_container_width=True, key="grafico_cobertura_solar")
-                ################### 
-            def cobertura_solar_para_pdf():
-                df = st.session_state.get("df").copy()
-                valores_mensuales = st.session_state.get("valores_mensuales")
-                tamano_sistema_kWp = st.session_state.get("tamano_sistema_kWp")
-
-                # Convertir a diccionario mes → valor
-                generacion_por_mes = {i + 1: val for i, val in enumerate(valores_mensuales)}
+                return fig
 
-                # Agregar columnas al DataFrame
-                df['Generacion estimada (kWh)'] = df['Mes_num'].map(generacion_por_mes) * tamano_sistema_kWp
-                df['Cobertura (%)'] = (df['Generacion estimada (kWh)'] / df['Consumo subtotal']) * 100
-                df['Excedente (kWh)'] = (df['Generacion estimada (kWh)'] - df['Consumo subtotal']).clip(lower=0)
+            if optimo is not None:
+                with st.container(border=True):
+                    st.subheader("🎯 Optimización del tamaño")
+                    if optimo["encontrado"]:
+                        payback_txt = f"{optimo['payback']:.1f} años" if not np.isnan(optimo['payback']) else "No recuperado"
+                        st.write(f"✅ Tamaño óptimo: {optimo['tamano_sistema_kWp']:.2f} kWp "
+                                 f"({optimo['cobertura']*100:.0f}% del consumo), VAN ${optimo['van']:,.2f}, payback {payback_txt}.")
+                    st.plotly_chart(mostrar_curva_optimizacion(optimo), use_container_width=True, key="grafico_optimizacion")
 
-                # Guardar en session_state por si hace falta
-                st.session_state["df"] = df
+            ##################
+            def cobertura_solar():
+                # Generación estimada, cobertura y excedente por mes
+                calcular_cobertura(df, valores_mensuales, tamano_sistema_kWp)
+                fig = figura_cobertura(cache, df['Fecha'], df['Cobertura (%)'], df['Excedente (kWh)'])
+                st.plotly_chart(fig, use_container_width=True, key="grafico_cobertura_solar")
+                ################### 
+            def perfil_horario():
+                import plotly.graph_objects as go
+                # Simulación 8760 h: la generación solar se compara con la carga hora a hora (Net Billing),
+                # el excedente del mediodía no compensa el déficit de la noche. Misma simulación (con
+                # pérdidas) que la batería y los esquemas, así que comparte su entrada en la caché.
+                st.subheader("⏱️ Autoconsumo horario")
+                horario = cache.obtener(
+                    "horario", huella(clave_consumo, clave_sitio, tamano_sistema_kWp, factor_perdidas),
+                    lambda: simular_horario(lat, lon, generacion_kWp, tamano_sistema_kWp,
+                                            consumo_por_mes(df), factor_perdidas)
+                )
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Autoconsumo", f"{horario['fraccion_autoconsumo'][0]*100:.1f}%",
+                            help="Parte de la generación solar que se consume en el momento.")
+                col2.metric("Autosuficiencia", f"{horario['fraccion_autosuficiencia'][0]*100:.1f}%",
+                            help="Parte del consumo cubierta directamente por la generación solar.")
+                col3.metric("Excedente inyectado", f"{horario['excedente'][0].sum():,.0f} kWh/año")
+
+                mes = st.select_slider("Mes del día típico", options=list(range(1, 13)), value=1,
+                                       format_func=lambda m: MESES_ES[m], key="mes_dia_tipico")
+                generacion = dia_tipico(horario["generacion_horaria"], mes)[0]
+                carga = dia_tipico(horario["carga_horaria"], mes)[0]
 
-                # Crear gráfico
                 fig = go.Figure()
-
-                fig.add_trace(go.Bar(
-                    x=df['Mes'],
-                    y=df['Cobertura (%)'],
-                    name='Cobertura mensual (%)',
-                    marker_color='green',
-                    text=df['Cobertura (%)'].round(1).astype(str) + '%',
-                    textposition='outside',
-                ))
-
-                fig.add_trace(go.Bar(
-                    x=df['Mes'],
-                    y=df['Excedente (kWh)'],
-                    name='Excedente mensual (kWh)',
-                    marker_color='rgba(255, 100, 100, 0.7)',
-                    text=df['Excedente (kWh)'].round(1),
-                    textposition='outside',
-                ))
-
+                fig.add_trace(go.Scatter(x=list(range(24)), y=generacion, name='Generación (kWh)',
+                                         fill='tozeroy', line=dict(color='orange')))
+                fig.add_trace(go.Scatter(x=list(range(24)), y=carga, name='Consumo (kWh)',
+                                         line=dict(color='royalblue')))
                 fig.update_layout(
-                    title='☀️ Cobertura solar y excedente mensual',
-                    xaxis_title='',
-                    yaxis_title='Porcentaje (%) / Energía (kWh)',
-                    barmode='group',
-                    bargap=0.2,
-                    height=400,
-                    margin=dict(t=40, b=40),
+                    title=f'Día típico de {MESES_ES[mes]}',
+                    xaxis_title='Hora del día',
+                    yaxis_title='Energía (kWh)',
                     legend=dict(x=0.5, xanchor='center', orientation='h')
                 )
+                st.plotly_chart(fig, use_container_width=True, key="grafico_dia_tipico")
+                ################### 
+            def factura_por_esquema():
+                # Los tres esquemas liquidados en la misma pasada (meses x años) que el flujo de caja
+                st.subheader("🧾 Factura por esquema de conexión")
+                liquidacion = proyecto["liquidacion"]
+                ahorros = ahorro_por_esquema(liquidacion)
+                flujos = np.array([[-inversion_fv] + (ahorros[e] - mantenimiento_anual).tolist() for e in ESQUEMAS])
+                van_esquemas = van_lote(flujos, tasa_descuento)
+
+                filas = []
+                for i, e in enumerate(ESQUEMAS):
+                    datos = liquidacion[e]
+                    filas.append({
+                        "Esquema": ESQUEMAS[e] + (" ⬅️" if e == esquema else ""),
+                        "Factura año 1 (USD)": datos["factura"][0].sum(),
+                        "Ahorro año 1 (USD)": ahorros[e][0],
+                        "Excedente año 1 (kWh)": datos.get("energia_exportada", datos.get("energia_vertida"))[0].sum(),
+                        "VAN (USD)": van_esquemas[i],
+                    })
+                st.caption(f"Factura anual sin sistema solar: ${liquidacion['sin_fv']['factura'][0].sum():,.2f}")
+                st.dataframe(pd.DataFrame(filas).style.format(precision=2), use_container_width=True, hide_index=True)
+                st.session_state['ahorro_esquemas'] = {ESQUEMAS[e]: ahorros[e][0] for e in ESQUEMAS}
+                ################### 
+            def almacenamiento():
+                import plotly.graph_objects as go
+                # Resultados de la batería elegida y VAN del sistema FV + batería según la capacidad
+                st.subheader("🔋 Almacenamiento")
+                simulacion = baterias["simulacion"]
+                curva = baterias["curva"]
+                col1, col2, col3 = st.columns(3)
+                i = indice_bateria
+                col1.metric("Energía entregada (año 1)", f"{simulacion['entregada'][0, i]:,.0f} kWh")
+                col2.metric("Ciclos equivalentes (año 1)", f"{simulacion['ciclos'][0, i]:,.0f}")
+                col3.metric("Exportado (año 1)", f"{simulacion['exportado'][0, i]:,.0f} kWh",
+                            delta=f"{simulacion['exportado'][0, i] - simulacion['exportado'][0, 0]:,.0f} kWh",
+                            delta_color="off")
+
+                mejor = curva.loc[curva["VAN"].idxmax()]
+                if mejor["Capacidad (kWh)"] == 0:
+                    st.info("ℹ️ Con estos precios la batería no mejora el VAN: conviene el sistema sin almacenamiento.")
+                else:
+                    st.write(f"✅ Capacidad con mayor VAN: {mejor['Capacidad (kWh)']:.1f} kWh (VAN ${mejor['VAN']:,.2f}).")
 
-                return fig
-
-
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(x=curva["Capacidad (kWh)"], y=curva["VAN"], mode='lines+markers',
+                                         name='VAN (USD)', line=dict(color='seagreen')))
+                fig.add_vline(x=capacidad_bateria, line_dash='dash', line_color='gray')
+                fig.update_layout(
+                    title='VAN del sistema FV + batería según la capacidad',
+                    xaxis_title='Capacidad de batería (kWh)',
+                    yaxis_title='VAN (USD)',
+                )
+                st.plotly_chart(fig, use_container_width=True, key="grafico_baterias")
+                ################### 
+            def incertidumbre():
+                import plotly.graph_objects as go
+                # Monte Carlo sobre la valoración simple del sistema FV (sin batería ni esquema de conexión)
+                st.subheader("🎲 Incertidumbre del proyecto (Monte Carlo)")
+                if not st.toggle("Calcular P50/P90", key="montecarlo_activo"):
+                    st.caption("Sortea el incremento de tarifa, la degradación, las pérdidas, el mantenimiento "
+                               "y la variabilidad anual de la irradiación para obtener VAN y TIR P50/P90.")
+                    return
+                col1, col2 = st.columns(2)
+                sorteos = col1.select_slider("Sorteos", options=[10_000, 100_000, 1_000_000], value=100_000)
+                semilla = int(col2.number_input("Semilla", min_value=0, value=0, step=1))
+
+                produccion_kWp_anio = produccion_anual_por_kWp(radiacion_diaria, proyecto["factores_relativos"], factor_perdidas)
+                entradas = (tamano_sistema_kWp, produccion_kWp_anio, tarifa_mas_impuestos, costo_Wp, mantenimiento_anual,
+                            años_proyecto, tasa_descuento, factor_perdidas)
+                with st.spinner("Simulando escenarios..."):
+                    mc = cache.obtener("montecarlo", huella(entradas, sorteos, semilla),
+                                       lambda: simular_montecarlo(*entradas, sorteos=sorteos, semilla=semilla))
+
+                col1, col2, col3, col4, col5 = st.columns(5)
+                col1.metric("VAN P50", f"${mc['van']['P50']:,.0f}")
+                col2.metric("VAN P90", f"${mc['van']['P90']:,.0f}")
+                col3.metric("TIR P50", f"{mc['tir']['P50']:.1%}")
+                col4.metric("TIR P90", f"{mc['tir']['P90']:.1%}")
+                col5.metric("Prob. VAN < 0", f"{mc['prob_van_negativo']:.1%}")
+                st.caption("P90 es el valor que se supera con 90% de probabilidad (percentil 10).")
+
+                centros, conteos = mc["histograma_van"]
+                fig = go.Figure(go.Bar(x=centros, y=conteos / mc["sorteos"], marker_color='teal', name='VAN',
+                                       hovertemplate='VAN: %{x:,.0f} USD<br>Frecuencia: %{y:.2%}<extra></extra>'))
+                for nombre, color in (("P90", "red"), ("P50", "black")):
+                    fig.add_vline(x=mc["van"][nombre], line_dash='dash', line_color=color,
+                                  annotation_text=nombre, annotation_position="top")
+                fig.update_layout(title=f"Distribución del VAN ({mc['sorteos']:,} escenarios)",
+                                  xaxis_title="VAN (USD)", yaxis_title="Frecuencia", bargap=0, template='plotly_white')
+                st.plotly_chart(fig, use_container_width=True, key="grafico_montecarlo")
+                ################### 
+            def sensibilidad():
+                import plotly.graph_objects as go
+                # Tornado y mapa de calor sobre la valoración simple del sistema FV; todos los
+                # escenarios de cada gráfico se evalúan en una sola pasada vectorizada
+                st.subheader("🌪️ Sensibilidad del proyecto")
+                if not st.toggle("Calcular sensibilidad", key="sensibilidad_activa"):
+                    st.caption("Varía cada parámetro ±X% para ver su efecto en el VAN y la TIR, "
+                               "y cruza dos parámetros en un mapa de calor.")
+                    return
+                base = {
+                    "consumo_promedio_kWh": consumo_promedio_kWh, "valores_mensuales": valores_mensuales,
+                    "radiacion_diaria": radiacion_diaria, "objetivo_cobertura": objetivo_cobertura,
+                    "años_proyecto": años_proyecto, "tasa_descuento": tasa_descuento, "costo_Wp": costo_Wp,
+                    "mantenimiento_anual": mantenimiento_anual, "factor_perdidas": factor_perdidas,
+                    "tarifa": tarifa_mas_impuestos,
+                }
+                col1, col2 = st.columns(2)
+                variacion = col1.slider("Variación (±%)", 5, 50, 20, step=5) / 100
+                indicador = col2.radio("Indicador", ["VAN", "TIR"], horizontal=True)
+
+                resultado = cache.obtener("sensibilidad", huella(base, variacion),
+                                          lambda: tornado(base, variacion))
+                tabla = resultado["tabla"].iloc[::-1]
+                centro = resultado["van_base"] if indicador == "VAN" else resultado["tir_base"]
+                formato = ',.0f' if indicador == "VAN" else '.2%'
+                fig = go.Figure()
+                for extremo, color in (("bajo", "indianred"), ("alto", "seagreen")):
+                    fig.add_trace(go.Bar(
+                        y=tabla["Parámetro"], x=tabla[f"{indicador} {extremo}"] - centro, base=centro,
+                        orientation='h', name=f"-{variacion:.0%}" if extremo == "bajo" else f"+{variacion:.0%}",
+                        marker_color=color, customdata=tabla[f"Valor {extremo}"],
+                        hovertemplate=f'Valor: %{{customdata:.4g}}<br>{indicador}: %{{x:{formato}}}<extra></extra>'
+                    ))
+                fig.add_vline(x=centro, line_color='black', line_dash='dash')
+                fig.update_layout(title=f"Tornado del {indicador} (caso base {centro:{formato}})", barmode='overlay',
+                                  xaxis_title=indicador + (" (USD)" if indicador == "VAN" else ""),
+                                  xaxis_tickformat=formato, template='plotly_white')
+                st.plotly_chart(fig, use_container_width=True, key="grafico_tornado")
+
+                nombres = list(PARAMETROS)
+                col1, col2 = st.columns(2)
+                eje_x = col1.selectbox("Eje X", nombres, index=nombres.index("costo_Wp"), format_func=PARAMETROS.get)
+                eje_y = col2.selectbox("Eje Y", [n for n in nombres if n != eje_x], format_func=PARAMETROS.get,
+                                       index=[n for n in nombres if n != eje_x].index("tarifa") if eje_x != "tarifa" else 0)
+                grilla = cache.obtener("sensibilidad", huella(base, variacion, eje_x, eje_y),
+                                       lambda: mapa_calor(base, eje_x, eje_y, variacion))
+                fig = go.Figure(go.Heatmap(
+                    x=grilla["x"], y=grilla["y"], z=grilla[indicador.lower()], colorscale='RdYlGn',
+                    zmid=0 if indicador == "VAN" else tasa_descuento, colorbar_title=indicador,
+                    hovertemplate=(f'{PARAMETROS[eje_x]}: %{{x:.4g}}<br>{PARAMETROS[eje_y]}: %{{y:.4g}}'
+                                   f'<br>{indicador}: %{{z:{formato}}}<extra></extra>')
+                ))
+                fig.update_layout(title=f"{indicador}: {PARAMETROS[eje_x]} × {PARAMETROS[eje_y]}",
+                                  xaxis_title=PARAMETROS[eje_x], yaxis_title=PARAMETROS[eje_y], template='plotly_white')
+                st.plotly_chart(fig, use_container_width=True, key="grafico_mapa_calor")
+                if indicador == "TIR":
+                    st.caption("El color neutro corresponde a una TIR igual a la tasa de descuento.")
+                ################### 
             ###############
             def interpretacion_tecnica():
                 cobertura = int(st.session_state.get("objetivo_cobertura", 0) * 100)
@@ -839,6 +1082,10 @@ def main ():
                 else:
                     tipo_conexion = "Autoconsumo parcial con mínima inyección"
                 frases.append(f"Recomendación técnica: se sugiere optar por <strong>{tipo_conexion}</strong> considerando el perfil de consumo y excedente estimado.")            
+                ahorro_esquemas = st.session_state.get("ahorro_esquemas")
+                if ahorro_esquemas:
+                    detalle = "; ".join(f"{nombre}: ${valor:,.2f}" for nombre, valor in ahorro_esquemas.items())
+                    frases.append(f"Ahorro del primer año según la factura liquidada con cada esquema: {detalle}.")
                 # 5. Evaluación financiera (TIR y VAN)
                 if tir is not None and van is not None:
                     tir_pct = tir * 100
@@ -875,96 +1122,69 @@ def main ():
             st.session_state['variacion'] = variacion
             
 
-            def generar_reporte_pdf_con_reportlab():
-                try:
-                    df = st.session_state.get("df")
-                    valores_mensuales = st.session_state.get("valores_mensuales", [])
-                    tamano_sistema_kWp = st.session_state.get("tamano_sistema_kWp", 0)
-                    tarifa_promedio = st.session_state.get("tarifa_promedio_usd_kWh", 0)
-                    produccion_total = tamano_sistema_kWp * sum(valores_mensuales)
-                    consumo_promedio = st.session_state.get("consumo_promedio_kWh", 0)
-                    ahorro_anual = tarifa_promedio * consumo_promedio * 12
-    
-                    lat = st.session_state.get("lat")
-                    lon = st.session_state.get("lon")
-                    interpretacion = interpretacion_tecnica()
-                    glosario = glosario_conexion_solar(interpretacion)
-                    variacion = st.session_state.get("variacion")
-    
-                    # Crear buffer para PDF
-                    buffer = io.BytesIO()
-                    
-                    # Crear documento PDF
-                    doc = SimpleDocTemplate(buffer, pagesize=A4)
-                    story = []
-                    
-                    # Estilos
-                    styles = getSampleStyleSheet()
-                    title_style = ParagraphStyle(
-                        'CustomTitle',
-                        parent=styles['Heading1'],
-                        fontSize=18,
-                        spaceAfter=30,
-                        textColor=colors.HexColor('#003366')
-                    )
-                    
-                    # Título
-                    story.append(Paragraph("Reporte Técnico - Sistema Fotovoltaico On-Grid", title_style))
-                    story.append(Spacer(1, 12))
-                    
-                    # Información básica
-                    story.append(Paragraph(f"<b>Periodo de análisis:</b> {cant_meses} meses ({año_min}-{año_max})", styles['Normal']))
-                    story.append(Paragraph(f"Consumo mensual promedio: {consumo_promedio_kWh:.2f} kWh", styles['Normal']))
-                    story.append(Paragraph(variacion, styles['Normal']))
-                    story.append(Spacer(1, 12))
-                    
-                    # Ubicación
-                    story.append(Paragraph("<b>Ubicación</b>", styles['Heading2']))
-                    story.append(Paragraph(f"Latitud: {lat}", styles['Normal']))
-                    story.append(Paragraph(f"Longitud: {lon}", styles['Normal']))
-                    story.append(Paragraph(f"Radiación solar diaria media: {radiacion_diaria:.2f} kWh/m²/día", styles['Normal']))
-                    story.append(Spacer(1, 12))
-                    
-                    # Datos de entrada
-                    story.append(Paragraph("<b>Datos de Entrada</b>", styles['Heading2']))
-                    story.append(Paragraph(f"• Consumo mensual promedio: <b>{consumo_promedio:.2f} kWh</b>", styles['Normal']))
-                    story.append(Paragraph(f"• Tarifa promedio (incl. impuestos): <b>${tarifa_promedio:.3f}/kWh</b>", styles['Normal']))
-                    story.append(Paragraph(f"• Objetivo de cobertura: <b>{int(st.session_state.get('objetivo_cobertura', 0)*100)}%</b>", styles['Normal']))
-                    story.append(Spacer(1, 12))
-                    
-                                        
-                    # Dimensionamiento
-                    story.append(Paragraph("<b>Dimensionamiento</b>", styles['Heading2']))
-                    story.append(Paragraph(f"• Tamaño del sistema: <b>{tamano_sistema_kWp:.2f} kWp</b>", styles['Normal']))
-                    story.append(Paragraph(f"• Producción mensual estimada: <b>{produccion_total:.2f} kWh</b>", styles['Normal']))
-                    story.append(Paragraph(f"• Ahorro anual estimado: <b>${ahorro_anual:.2f}</b>", styles['Normal']))
-                    story.append(Spacer(1, 12))
-                                          
-                    # Interpretación
-                    story.append(Paragraph("<b>Interpretación Técnica</b>", styles['Heading2']))
-                    story.append(Paragraph(interpretacion, styles['Normal']))
-                    story.append(Spacer(1, 12))
-                        
-                    # Glosario
-                    story.append(Paragraph("<b>Glosario</b>", styles['Heading2']))
-                    story.append(Paragraph(glosario, styles['Normal']))
-                    story.append(Spacer(1, 12))
-                        
-                    # Pie de página
-                    story.append(Paragraph("Generado automáticamente por la app <b>Solar OnGrid</b> - Alejandro H.", styles['Normal']))
-                        
-                    # Construir PDF
-                    doc.build(story)
-                        
-    
-                    # Crear enlace de descarga
-                    buffer.seek(0)
-                    b64_pdf = base64.b64encode(buffer.read()).decode("utf-8")
-                    href = f'<a href="data:application/pdf;base64,{b64_pdf}" download="reporte_solar.pdf">📄 Descargar reporte PDF</a>'
-                    st.markdown(href, unsafe_allow_html=True)
-                        
-                except Exception as e:
-                    st.error(f"❌ Error al generar el PDF: {e}")
+            def datos_reporte():
+                # Valores del reporte tomados de la sesión; la maquetación corre en reportes_fv
+                valores_mensuales = st.session_state.get("valores_mensuales", [])
+                tamano_sistema_kWp = st.session_state.get("tamano_sistema_kWp", 0)
+                tarifa_promedio = st.session_state.get("tarifa_promedio_usd_kWh", 0)
+                consumo_promedio = st.session_state.get("consumo_promedio_kWh", 0)
+                interpretacion = interpretacion_tecnica()
+                # Las figuras salen de la caché de gráficos (las mismas del panel) y viajan como JSON;
+                # la imagen se exporta en el hilo del reporte
+                cobertura = calcular_cobertura(df.copy(), valores_mensuales, tamano_sistema_kWp)
+                graficos = [
+                    ("Consumo y costo mensual por año", figura_consumo(cache, df)),
+                    ("Flujo de caja del proyecto", figura_flujo_caja(cache, flujo_de_caja, vida_util)),
+                    ("Cobertura solar y excedente mensual",
+                     figura_cobertura(cache, cobertura['Fecha'], cobertura['Cobertura (%)'], cobertura['Excedente (kWh)'])),
+                ]
+                return {
+                    "cant_meses": cant_meses,
+                    "año_min": año_min,
+                    "año_max": año_max,
+                    "consumo_promedio_kWh": consumo_promedio,
+                    "variacion": st.session_state.get("variacion"),
+                    "lat": st.session_state.get("lat"),
+                    "lon": st.session_state.get("lon"),
+                    "radiacion_diaria": radiacion_diaria,
+                    "tarifa_promedio": tarifa_promedio,
+                    "objetivo_cobertura": st.session_state.get('objetivo_cobertura', 0),
+                    "tamano_sistema_kWp": tamano_sistema_kWp,
+                    "produccion_total": tamano_sistema_kWp * sum(valores_mensuales),
+                    "ahorro_anual": tarifa_promedio * consumo_promedio * 12,
+                    "interpretacion": interpretacion,
+                    "glosario": glosario_conexion_solar(interpretacion),
+                    "graficos": [(titulo, fig.to_json()) for titulo, fig in graficos],
+                }
+
+            def reporte_pdf():
+                # El PDF se genera en el pool de cola_reportes(); aquí solo se encola y se consulta
+                # el estado del trabajo, sin bloquear el hilo del script
+                cola = cola_reportes()
+                if st.button("✅ Crear reporte técnico PDF"):
+                    st.session_state["trabajo_reporte"] = cola.enviar(datos_reporte())
+
+                trabajo = cola.estado(st.session_state.get("trabajo_reporte"))
+                pendiente = trabajo is not None and trabajo["estado"] in ("en_cola", "en_proceso")
+
+                # Mientras el trabajo no termina solo se vuelve a ejecutar este fragmento cada segundo
+                @st.fragment(run_every=1.0 if pendiente else None)
+                def estado_reporte():
+                    trabajo = cola.estado(st.session_state.get("trabajo_reporte"))
+                    if trabajo is None:
+                        return
+                    if trabajo["estado"] == "error":
+                        st.error(f"❌ Error al generar el PDF: {trabajo['error']}")
+                    elif trabajo["estado"] == "listo":
+                        st.download_button("📄 Descargar reporte PDF", trabajo["pdf"], file_name="reporte_solar.pdf",
+                                           mime="application/pdf", key="descargar_reporte")
+                    else:
+                        st.progress(trabajo["progreso"], text=f"{trabajo['mensaje']} (trabajo {trabajo['id']})")
+                        return
+                    if pendiente:
+                        st.rerun()      # detiene el sondeo
+
+                estado_reporte()
 
             ################
             
@@ -972,29 +1192,49 @@ def main ():
                 # Mostrar gráfico
                 right.markdown("## 📊 Análisis de Consumo Eléctrico Mensual")
                 with st.container():
-                    fig_consumo_energia = crear_graficos_interactivos(df)
+                    fig_consumo_energia = figura_consumo(cache, df)
                     st.plotly_chart(fig_consumo_energia, use_container_width=True, key="grafico_consumo_mensual")
 
             st.title('📈 Proyección a futuro')
             with st.container(border=True):
                 # Mostrar el gráfico
-                fig_flujo_caja=mostrar_flujo_de_caja(flujo_de_caja, vida_util)
+                fig_flujo_caja = figura_flujo_caja(cache, flujo_de_caja, vida_util)
                 # Mostrar gráfico
                 st.plotly_chart(fig_flujo_caja, use_container_width=True, key="grafico_flujo_caja_proyecto")
 
+            with st.container(border=True):
+                incertidumbre()
+
+            with st.container(border=True):
+                sensibilidad()
+
             with st.container(border=True):    
                 cobertura_solar()
 
+            with st.container(border=True):
+                perfil_horario()
+
+            if baterias is not None:
+                with st.container(border=True):
+                    almacenamiento()
+
+            if "liquidacion" in proyecto:
+                with st.container(border=True):
+                    factura_por_esquema()
+            else:
+                st.session_state.pop('ahorro_esquemas', None)
+
             with st.container(border=True):
                 st.subheader("📄 Generar Reporte en PDF")
-                if st.button("✅ Crear reporte técnico PDF"):
-                    generar_reporte_pdf_con_reportlab()
+                reporte_pdf()
 
             
         else:
             st.warning("⚠️ El archivo está vacío o no se pudo procesar.")
     else:
         st.info("📭 Aún no se han cargado datos.")
+
+    mostrar_estadisticas_cache(cache)
     
 
 
@@ -0,0 +1,157 @@
+# Simulación de almacenamiento con baterías a partir de los perfiles horarios de horario_fv
+# La recursión del estado de carga recorre las 8760 horas una sola vez; en cada paso se
+# actualizan a la vez todos los años del horizonte y todos los tamaños de batería (Y, B),
+# con operaciones NumPy sobre buffers preasignados.
+import numpy as np
+import pandas as pd
+
+from finanzas_fv import indicadores_lote
+from motor_fv import INCREMENTO_TARIFA, DEGRADACION_ANUAL
+
+
+EFICIENCIA_IDA_VUELTA = 0.90    # energía entregada / energía absorbida
+PROFUNDIDAD_DESCARGA = 0.90     # fracción utilizable de la capacidad nominal
+TASA_C = 0.5                    # potencia máxima de carga/descarga (kW) por kWh de capacidad
+DEGRADACION_BATERIA = 0.02      # pérdida anual de capacidad
+VIDA_BATERIA = 10               # años hasta el reemplazo
+COSTO_KWH_BATERIA = 400.0       # $/kWh instalado
+
+
+def simular_bateria(generacion, carga, capacidades_kWh, años=1, eficiencia=EFICIENCIA_IDA_VUELTA,
+                    profundidad_descarga=PROFUNDIDAD_DESCARGA, tasa_c=TASA_C,
+                    degradacion_pv=DEGRADACION_ANUAL, degradacion_bateria=DEGRADACION_BATERIA,
+                    vida_bateria=VIDA_BATERIA):
+    # generacion, carga: perfiles horarios del primer año (8760,) en kWh.
+    # capacidades_kWh: (B,) capacidades nominales a evaluar (0 = sin batería).
+    # Cada año arranca con la batería en su mínimo; la generación se degrada año a año y la
+    # capacidad se degrada desde el último reemplazo. Devuelve totales anuales (Y, B).
+    generacion = np.asarray(generacion, dtype=float).reshape(-1)
+    carga = np.asarray(carga, dtype=float).reshape(-1)
+    capacidades = np.atleast_1d(np.asarray(capacidades_kWh, dtype=float))
+    anio = np.arange(años)
+
+    # Autoconsumo directo, excedente y déficit por hora y año: no dependen de la batería
+    generacion_anual = generacion[:, None] * (1 - degradacion_pv) ** anio       # (8760, Y)
+    directo = np.minimum(generacion_anual, carga[:, None])
+    excedente = generacion_anual - directo
+    deficit = carga[:, None] - directo
+
+    # Capacidad útil y potencia de cada año y tamaño (Y, B)
+    capacidad = capacidades[None, :] * (1 - degradacion_bateria) ** (anio % vida_bateria)[:, None]
+    util = capacidad * profundidad_descarga
+    potencia = capacidad * tasa_c
+
+    # Eficiencias repartidas en carga y descarga; se aplican fuera del bucle
+    eficiencia_paso = np.sqrt(eficiencia)
+    excedente_almacenable = (excedente * eficiencia_paso)[:, :, None]         # (8760, Y, 1)
+    deficit_en_bateria = (deficit / eficiencia_paso)[:, :, None]
+    potencia_carga = potencia * eficiencia_paso
+    potencia_descarga = potencia / eficiencia_paso
+
+    # Horas en que hay algo que cargar o descargar en algún año
+    hay_excedente = (excedente > 0).any(axis=1).tolist()
+    hay_deficit = (deficit > 0).any(axis=1).tolist()
+
+    energia = np.zeros(util.shape)          # energía utilizable almacenada
+    paso = np.empty(util.shape)
+    cargada = np.zeros(util.shape)          # energía que entra a la batería (después de pérdidas)
+    descargada = np.zeros(util.shape)       # energía que sale de la batería (antes de pérdidas)
+
+    for h in range(generacion.size):
+        if hay_excedente[h]:
+            np.subtract(util, energia, out=paso)
+            np.minimum(paso, excedente_almacenable[h], out=paso)
+            np.minimum(paso, potencia_carga, out=paso)
+            energia += paso
+            cargada += paso
+        if hay_deficit[h]:
+            np.minimum(energia, deficit_en_bateria[h], out=paso)
+            np.minimum(paso, potencia_descarga, out=paso)
+            energia -= paso
+            descargada += paso
+
+    absorbida = cargada / eficiencia_paso   # energía solar desviada a la batería
+    entregada = descargada * eficiencia_paso
+    directo_total = directo.sum(axis=0)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ciclos = np.where(util > 0, descargada / util, 0.0)
+
+    return {
+        "capacidades_kWh": capacidades,
+        "generacion": generacion_anual.sum(axis=0)[:, None] + np.zeros_like(util),
+        "autoconsumo": directo_total + entregada,
+        "exportado": excedente.sum(axis=0)[:, None] - absorbida,
+        "importado": deficit.sum(axis=0)[:, None] - entregada,
+        "absorbida": absorbida,
+        "entregada": entregada,
+        "ciclos": ciclos,
+        "autoconsumo_directo": directo.sum(axis=0),     # (Y,) sin batería
+        "excedente_fv": excedente.sum(axis=0),
+    }
+
+
+def flujo_fv_horario(simulacion, inversion_fv, mantenimiento_anual, tarifa, tarifa_excedente,
+                     incremento_tarifa=INCREMENTO_TARIFA):
+    # Flujo de caja (Y + 1,) del sistema FV sin batería valorado hora a hora, como en
+    # horario_fv.balance_horario: el autoconsumo directo ahorra la tarifa y el excedente se paga
+    # a tarifa_excedente (la tarifa completa si es None). Es la base por defecto de
+    # evaluar_baterias; con otra base, flujo_bateria debe valorar el excedente al precio que esa
+    # base le da (la tarifa con balance mensual) o la batería se cuenta dos veces.
+    años = simulacion["autoconsumo_directo"].size
+    precio_excedente = tarifa if tarifa_excedente is None else tarifa_excedente
+    escalamiento = (1 + incremento_tarifa) ** np.arange(años)
+
+    flujo = np.empty(años + 1)
+    flujo[0] = -inversion_fv
+    flujo[1:] = ((simulacion["autoconsumo_directo"] * tarifa + simulacion["excedente_fv"] * precio_excedente)
+                 * escalamiento - mantenimiento_anual)
+    return flujo
+
+
+def flujo_bateria(simulacion, costo_kWh, tarifa, tarifa_excedente, incremento_tarifa=INCREMENTO_TARIFA,
+                  vida_bateria=VIDA_BATERIA):
+    # Flujo de caja incremental de agregar cada batería a un sistema FV existente (B, Y + 1):
+    # cada kWh entregado ahorra la tarifa, cada kWh absorbido deja de venderse a tarifa_excedente,
+    # y la batería se compra en el año 0 y se reemplaza cada vida_bateria años.
+    capacidades = simulacion["capacidades_kWh"]
+    años = simulacion["entregada"].shape[0]
+    escalamiento = (1 + incremento_tarifa) ** np.arange(años)
+
+    ahorro = (simulacion["entregada"] * tarifa - simulacion["absorbida"] * tarifa_excedente)  # (Y, B)
+    flujos = np.zeros((capacidades.size, años + 1))
+    flujos[:, 0] = -capacidades * costo_kWh
+    flujos[:, 1:] = (ahorro * escalamiento[:, None]).T
+    reemplazos = np.arange(vida_bateria, años, vida_bateria)
+    flujos[:, reemplazos] -= (capacidades * costo_kWh)[:, None]
+    return flujos
+
+
+def evaluar_baterias(generacion, carga, capacidades_kWh, inversion_fv, mantenimiento_anual, años, tarifa,
+                     tarifa_excedente, tasa_descuento, costo_kWh=COSTO_KWH_BATERIA, flujo_fv=None, **opciones):
+    # Sistema FV + batería para cada capacidad: flujo del sistema FV solo más flujo_bateria.
+    # flujo_fv: flujo (años + 1,) del sistema sin batería con el que se compara (por ejemplo el de
+    # evaluar_proyecto, calculado sobre la misma generación); por defecto la base horaria de
+    # flujo_fv_horario. Devuelve los flujos combinados (B, años + 1), el flujo FV base, la
+    # simulación y una curva de indicadores.
+    años = int(años)
+    vida_bateria = opciones.get("vida_bateria", VIDA_BATERIA)
+
+    simulacion = simular_bateria(generacion, carga, capacidades_kWh, años, **opciones)
+    if flujo_fv is None:
+        flujo_fv = flujo_fv_horario(simulacion, inversion_fv, mantenimiento_anual, tarifa, tarifa_excedente)
+    flujo_fv = np.asarray(flujo_fv, dtype=float)
+    precio_excedente = tarifa if tarifa_excedente is None else tarifa_excedente
+    flujos = flujo_fv[None, :] + flujo_bateria(simulacion, costo_kWh, tarifa, precio_excedente,
+                                               vida_bateria=vida_bateria)
+    indicadores = indicadores_lote(flujos, tasa_descuento)
+
+    curva = pd.DataFrame({
+        "Capacidad (kWh)": simulacion["capacidades_kWh"],
+        "Autoconsumo año 1 (kWh)": simulacion["autoconsumo"][0],
+        "Exportado año 1 (kWh)": simulacion["exportado"][0],
+        "Ciclos año 1": simulacion["ciclos"][0],
+        "VAN": indicadores["van"],
+        "TIR": indicadores["tir"],
+        "Payback": indicadores["payback"],
+    })
+    return {"flujos": flujos, "flujo_fv": flujo_fv, "simulacion": simulacion, "curva": curva}
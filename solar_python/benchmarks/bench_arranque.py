@@ -0,0 +1,43 @@
+# Tiempo de importación y memoria residente de analisis_fv en un proceso nuevo
+# Uso: python solar_python/benchmarks/bench_arranque.py [repeticiones]
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CARPETA_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CODIGO = """
+import json, resource, sys, time, logging
+logging.disable(logging.WARNING)
+sys.path.insert(0, {carpeta!r})
+inicio = time.perf_counter()
+import analisis_fv
+duracion = time.perf_counter() - inicio
+pesados = ["rasterio", "plotly", "folium", "streamlit_folium", "reportlab"]
+print(json.dumps({{
+    "segundos": duracion,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "cargados": [m for m in pesados if m in sys.modules],
+}}))
+"""
+
+
+def medir():
+    salida = subprocess.run([sys.executable, "-c", CODIGO.format(carpeta=CARPETA_APP)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    medidas = [medir() for _ in range(repeticiones)]
+    print(f"Importación de analisis_fv ({repeticiones} procesos nuevos)")
+    print(f"Tiempo (mediana):  {statistics.median(m['segundos'] for m in medidas):.3f} s")
+    print(f"RSS máx (mediana): {statistics.median(m['rss_mb'] for m in medidas):.1f} MB")
+    print(f"Módulos pesados cargados al inicio: {', '.join(medidas[-1]['cargados']) or 'ninguno'}")
+
+
+if __name__ == '__main__':
+    main()
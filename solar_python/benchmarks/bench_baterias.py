@@ -0,0 +1,59 @@
+# Simulación de baterías vectorizada (baterias_fv) contra un bucle Python hora por hora
+# Uso: python solar_python/benchmarks/bench_baterias.py [cantidad_de_baterias] [años]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from baterias_fv import (simular_bateria, EFICIENCIA_IDA_VUELTA, PROFUNDIDAD_DESCARGA,  # noqa: E402
+                         TASA_C)
+from horario_fv import simular_horario  # noqa: E402
+
+
+def bucle_python(generacion, carga, capacidad):
+    # Referencia: un año y una batería, sin degradación
+    eficiencia = np.sqrt(EFICIENCIA_IDA_VUELTA)
+    util = capacidad * PROFUNDIDAD_DESCARGA
+    potencia = capacidad * TASA_C
+    energia = entregada = 0.0
+    for g, c in zip(generacion.tolist(), carga.tolist()):
+        directo = min(g, c)
+        cargar = min(util - energia, (g - directo) * eficiencia, potencia * eficiencia)
+        energia += cargar
+        descargar = min(energia, (c - directo) / eficiencia, potencia / eficiencia)
+        energia -= descargar
+        entregada += descargar * eficiencia
+    return entregada
+
+
+def main():
+    baterias = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    años = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    valores_mensuales = np.array([120, 110, 125, 118, 120, 115, 125, 130, 128, 126, 120, 122.])
+    horario = simular_horario(-0.23, -78.5, valores_mensuales, 3.0, np.full(12, 300.0))
+    generacion, carga = horario["generacion_horaria"][0], horario["carga_horaria"][0]
+    capacidades = np.linspace(0, 30, baterias)
+
+    t0 = time.perf_counter()
+    simulacion = simular_bateria(generacion, carga, capacidades, años, degradacion_pv=0, degradacion_bateria=0)
+    t_vector = time.perf_counter() - t0
+
+    # El bucle se mide con algunas baterías y se extrapola a todas las corridas
+    muestra = capacidades[:: max(1, baterias // 5)]
+    t0 = time.perf_counter()
+    referencia = np.array([bucle_python(generacion, carga, c) for c in muestra])
+    t_bucle = (time.perf_counter() - t0) / muestra.size * baterias * años
+
+    diferencia = np.max(np.abs(simulacion["entregada"][0, :: max(1, baterias // 5)] - referencia))
+    print(f"Corridas:                  {baterias} baterías x {años} años x 8760 h")
+    print(f"baterias_fv (vectorizado): {t_vector:.3f} s")
+    print(f"Bucle Python (estimado):   {t_bucle:.1f} s")
+    print(f"Aceleración:               {t_bucle / t_vector:.0f}x")
+    print(f"Máx. dif. energía entregada año 1: {diferencia:.2e} kWh")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# Muestreo de sitios desde los GeoTIFF con la caché LRU de bloques (rasters_fv.CacheBloques)
+# Consultas agrupadas: varias tandas de clientes de una misma ciudad, como llegan desde la app
+# o desde lotes sucesivos. Sin caché compartida cada tanda vuelve a descomprimir sus bloques.
+# Uso: python solar_python/benchmarks/bench_bloques.py [tandas] [clientes_por_tanda]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from rasters_fv import (CacheBloques, cargar_cubo_pvout, cargar_cubo_ghi, muestrear_sitios,  # noqa: E402
+                        muestrear_sitios_archivos)
+
+
+def main():
+    tandas = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = np.random.default_rng(0)
+    # Clientes alrededor de Quito (~0.1° de dispersión)
+    consultas = [(rng.normal(-0.2, 0.1, clientes), rng.normal(-78.5, 0.1, clientes)) for _ in range(tandas)]
+
+    t0 = time.perf_counter()
+    for lat, lon in consultas:
+        muestrear_sitios_archivos(lat, lon, cache=CacheBloques())   # caché nueva en cada tanda
+    t_sin_cache = time.perf_counter() - t0
+
+    cache = CacheBloques()
+    t0 = time.perf_counter()
+    for lat, lon in consultas:
+        pvout, ghi = muestrear_sitios_archivos(lat, lon, cache=cache)
+    t_con_cache = time.perf_counter() - t0
+    estadisticas = cache.estadisticas()
+
+    esperado_pvout, esperado_ghi = muestrear_sitios(lat, lon, cargar_cubo_pvout(), cargar_cubo_ghi())
+    iguales = (np.array_equal(pvout, esperado_pvout, equal_nan=True)
+               and np.array_equal(ghi, esperado_ghi, equal_nan=True))
+
+    print(f"Tandas x clientes:      {tandas} x {clientes}")
+    print(f"Caché nueva por tanda:  {t_sin_cache * 1000:.0f} ms")
+    print(f"Caché compartida:       {t_con_cache * 1000:.0f} ms")
+    print(f"Bloques decodificados:  {estadisticas['bloques_decodificados']:,} "
+          f"({estadisticas['bytes_decodificados'] / 1e6:.1f} MB), "
+          f"tasa de aciertos {estadisticas['tasa_aciertos']:.1%}")
+    print(f"Coincide con el cubo en memoria: {iguales}")
+
+
+if __name__ == '__main__':
+    main()
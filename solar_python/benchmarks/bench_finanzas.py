@@ -0,0 +1,52 @@
+# Comparación de finanzas_fv (por lotes) contra numpy_financial fila por fila
+# Uso: python solar_python/benchmarks/bench_finanzas.py [cantidad_de_escenarios]
+import os
+import sys
+import time
+
+import numpy as np
+import numpy_financial as npf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from finanzas_fv import indicadores_lote  # noqa: E402
+from motor_fv import proyectar_escenarios  # noqa: E402
+
+
+def escenarios_aleatorios(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    resultado = proyectar_escenarios(
+        tamano_sistema_kWp=rng.uniform(0.5, 10, n),
+        produccion_kWp_anio=rng.uniform(900, 1600, n),
+        tarifa_inicial=rng.uniform(0.06, 0.20, n),
+        costo_Wp=rng.uniform(0.8, 1.8, n),
+        mantenimiento_anual=rng.uniform(0, 60, n),
+        años_proyecto=20,
+    )
+    return resultado["flujos"], rng.uniform(0.04, 0.12, n)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    flujos, tasas = escenarios_aleatorios(n)
+
+    t0 = time.perf_counter()
+    lote = indicadores_lote(flujos, tasas)
+    t_lote = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    tir_ref = np.array([npf.irr(f) for f in flujos])
+    van_ref = np.array([npf.npv(r, f) for r, f in zip(tasas, flujos)])
+    t_ref = time.perf_counter() - t0
+
+    ambos = np.isfinite(tir_ref) & lote["convergio"]
+    print(f"Escenarios: {n}")
+    print(f"finanzas_fv (lote):      {t_lote:.4f} s")
+    print(f"numpy_financial (bucle): {t_ref:.4f} s")
+    print(f"Aceleración:             {t_ref / t_lote:.1f}x")
+    print(f"Convergencia TIR:        {lote['convergio'].mean():.2%}")
+    print(f"Máx. dif. TIR:           {np.max(np.abs(lote['tir'][ambos] - tir_ref[ambos])):.2e}")
+    print(f"Máx. dif. VAN:           {np.max(np.abs(lote['van'] - van_ref)):.2e}")
+
+
+if __name__ == '__main__':
+    main()
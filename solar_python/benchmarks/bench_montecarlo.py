@@ -0,0 +1,55 @@
+# Monte Carlo por bloques con percentiles en streaming (montecarlo_fv) contra guardar todos los sorteos
+# Uso: python solar_python/benchmarks/bench_montecarlo.py [sorteos]
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from finanzas_fv import indicadores_lote  # noqa: E402
+from montecarlo_fv import (simular_montecarlo, sortear_parametros, flujos_sorteados,  # noqa: E402
+                           TAMANO_BLOQUE)
+
+
+def main():
+    sorteos = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    entradas = (3.0, 1120.0, 0.12, 1.2, 20.0, 20, 0.08, 0.8)   # tamaño, producción, tarifa, costo, mant., años, tasa, pérdidas
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resultado = simular_montecarlo(*entradas, sorteos=sorteos)
+    t_streaming = time.perf_counter() - t0
+    pico_streaming = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Referencia: mismos sorteos (misma semilla y bloques), guardando todos los VAN y TIR
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(0)
+    van, tir = [], []
+    for inicio in range(0, sorteos, TAMANO_BLOQUE):
+        n = min(TAMANO_BLOQUE, sorteos - inicio)
+        parametros = sortear_parametros(rng, n, entradas[5], entradas[7], entradas[4])
+        indicadores = indicadores_lote(flujos_sorteados(parametros, *entradas[:4], entradas[5], entradas[7]), entradas[6])
+        van.append(indicadores["van"])
+        tir.append(indicadores["tir"])
+    van, tir = np.concatenate(van), np.concatenate(tir)
+    exacto_van = np.percentile(van, [10, 50])
+    exacto_tir = np.nanpercentile(tir, [10, 50])
+    t_exacto = time.perf_counter() - t0
+    pico_exacto = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"Sorteos:                 {sorteos:,}")
+    print(f"Streaming (montecarlo_fv): {t_streaming:.2f} s, memoria pico {pico_streaming / 1e6:.1f} MB")
+    print(f"Guardando los sorteos:     {t_exacto:.2f} s, memoria pico {pico_exacto / 1e6:.1f} MB")
+    print(f"VAN P90/P50: {resultado['van']['P90']:,.2f} / {resultado['van']['P50']:,.2f} "
+          f"(exacto {exacto_van[0]:,.2f} / {exacto_van[1]:,.2f})")
+    print(f"TIR P90/P50: {resultado['tir']['P90']:.4%} / {resultado['tir']['P50']:.4%} "
+          f"(exacto {exacto_tir[0]:.4%} / {exacto_tir[1]:.4%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# Caché de escenarios por capas con expulsión LRU
+# Cada capa (archivo, consumo, muestreo, proyección, VAN, gráficos...) se indexa con una huella
+# de solo las entradas de las que depende, de modo que cambiar un parámetro financiero no
+# obliga a releer archivos ni rasters.
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+DECIMALES_CLAVE = 10    # redondeo de flotantes para que 0.1 + 0.2 y 0.3 den la misma clave
+
+
+def _normalizar(valor, h):
+    # Agrega a la huella h una representación estable de valor
+    if valor is None:
+        h.update(b'N')
+    elif isinstance(valor, pd.DataFrame):
+        h.update(b'D' + repr(list(valor.columns)).encode())
+        h.update(pd.util.hash_pandas_object(valor, index=False).to_numpy().tobytes())
+    elif isinstance(valor, pd.Series):
+        h.update(b'S')
+        h.update(pd.util.hash_pandas_object(valor, index=False).to_numpy().tobytes())
+    elif isinstance(valor, np.ndarray):
+        arreglo = np.round(valor, DECIMALES_CLAVE) if valor.dtype.kind == 'f' else valor
+        h.update(b'A' + str(arreglo.dtype).encode() + repr(arreglo.shape).encode())
+        h.update(np.ascontiguousarray(arreglo).tobytes())
+    elif isinstance(valor, (bytes, bytearray, memoryview)):
+        h.update(b'B' + bytes(valor))
+    elif isinstance(valor, (bool, np.bool_)):
+        h.update(b'b1' if valor else b'b0')
+    elif isinstance(valor, (int, np.integer)):
+        h.update(b'i' + str(int(valor)).encode())
+    elif isinstance(valor, (float, np.floating)):
+        h.update(b'f' + repr(round(float(valor), DECIMALES_CLAVE)).encode())
+    elif isinstance(valor, (list, tuple)):
+        h.update(b'L' + str(len(valor)).encode())
+        for v in valor:
+            _normalizar(v, h)
+    elif isinstance(valor, dict):
+        h.update(b'M' + str(len(valor)).encode())
+        for k in sorted(valor, key=str):
+            _normalizar(str(k), h)
+            _normalizar(valor[k], h)
+    else:
+        h.update(b'R' + repr(valor).encode())
+
+
+def huella(*partes):
+    # Hash estable (hex) de las entradas normalizadas
+    h = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        _normalizar(parte, h)
+    return h.hexdigest()
+
+
+def _tamano_bytes(valor):
+    return getattr(valor, "nbytes", 0)
+
+
+class CacheLRU:
+    # Caché acotada en número de entradas (None = sin límite) y opcionalmente en bytes
+    # (medidos con nbytes), segura entre hilos (sesiones de Streamlit)
+
+    def __init__(self, max_entradas=128, max_bytes=None):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __contains__(self, clave):
+        return clave in self._datos
+
+    def obtener(self, clave, calcular):
+        # Devuelve el valor guardado para clave o lo calcula con calcular() y lo guarda
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return self._datos[clave]
+            self.fallos += 1
+
+        # El cálculo se hace fuera del lock para no bloquear otras sesiones
+        valor = calcular()
+
+        with self._lock:
+            if clave in self._datos:
+                self.bytes -= _tamano_bytes(self._datos[clave])
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            self.bytes += _tamano_bytes(valor)
+            while (self.max_entradas is not None and len(self._datos) > self.max_entradas) or (
+                    self.max_bytes is not None and self.bytes > self.max_bytes and len(self._datos) > 1):
+                self.bytes -= _tamano_bytes(self._datos.popitem(last=False)[1])
+                self.expulsiones += 1
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.bytes = 0
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        estadisticas = {
+            "entradas": len(self._datos),
+            "max_entradas": self.max_entradas,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "expulsiones": self.expulsiones,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+        }
+        if self.max_bytes is not None:
+            estadisticas.update(bytes=self.bytes, max_bytes=self.max_bytes)
+        return estadisticas
+
+
+class CacheEscenarios:
+    # Conjunto de capas LRU independientes; cada capa se crea al primer uso
+
+    def __init__(self, max_entradas=128, max_por_capa=None):
+        self.max_entradas = max_entradas
+        self.max_por_capa = max_por_capa or {}
+        self._capas = {}
+        self._lock = threading.Lock()
+
+    def capa(self, nombre):
+        with self._lock:
+            if nombre not in self._capas:
+                self._capas[nombre] = CacheLRU(self.max_por_capa.get(nombre, self.max_entradas))
+            return self._capas[nombre]
+
+    def obtener(self, nombre, clave, calcular):
+        return self.capa(nombre).obtener(clave, calcular)
+
+    def limpiar(self):
+        with self._lock:
+            capas = list(self._capas.values())
+        for capa in capas:
+            capa.limpiar()
+
+    def estadisticas(self):
+        with self._lock:
+            capas = dict(self._capas)
+        return pd.DataFrame.from_dict(
+            {nombre: capa.estadisticas() for nombre, capa in capas.items()}, orient="index"
+        )
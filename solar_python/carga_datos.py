@@ -19,6 +19,10 @@ def subida_formato():
             )
     # uploader    
     archivo_datos = st.file_uploader("Subir tu archivo CSV o Excel:", type = ["csv", "xlsx"])
+    # Archivos con varios clientes (instaladores): columna que identifica a cada uno
+    st.text_input("Columna que identifica al cliente (opcional):", value="Cliente", key="columna_cliente",
+                  help="Si el archivo trae esta columna, cada cliente se evalúa por separado en una sola corrida. "
+                       "Columnas lat y lon opcionales dan la ubicación de cada cliente.")
     if archivo_datos:
         st.session_state["archivo_datos"] = archivo_datos
     
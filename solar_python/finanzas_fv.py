@@ -0,0 +1,113 @@
+# Indicadores financieros por lotes: TIR, VAN y payback para muchas filas de flujo de caja
+# flujos: arreglo (S, T+1) con la inversión (negativa) en la columna 0
+import numpy as np
+
+
+TIR_MIN = -0.99     # límites de búsqueda de la TIR
+TIR_MAX = 10.0
+
+
+def _como_matriz(flujos):
+    flujos = np.asarray(flujos, dtype=float)
+    return flujos[None, :] if flujos.ndim == 1 else flujos
+
+
+def van_lote(flujos, tasa_descuento):
+    # VAN de cada fila; tasa_descuento escalar o (S,)
+    flujos = _como_matriz(flujos)
+    tasa = np.broadcast_to(np.atleast_1d(np.asarray(tasa_descuento, dtype=float)), flujos.shape[:1])
+    descuento = np.power((1 + tasa)[:, None], -np.arange(flujos.shape[1], dtype=float))
+    return np.einsum('ij,ij->i', flujos, descuento)
+
+
+def _van_y_derivada(flujos, tasa):
+    t = np.arange(flujos.shape[1], dtype=float)
+    descuento = np.power((1 + tasa)[:, None], -t)
+    van = np.einsum('ij,ij->i', flujos, descuento)
+    derivada = -np.einsum('ij,ij->i', flujos * t, descuento) / (1 + tasa)
+    return van, derivada
+
+
+def tir_lote(flujos, tasa_inicial=0.1, tolerancia=1e-10, max_iter=50, iter_biseccion=200):
+    # TIR de cada fila por Newton vectorizado; las filas que no convergen pasan a
+    # bisección en [TIR_MIN, TIR_MAX]. Devuelve (tir, convergio); tir es NaN sin solución.
+    flujos = _como_matriz(flujos)
+    n = flujos.shape[0]
+    tir = np.full(n, float(tasa_inicial))
+    convergio = np.zeros(n, dtype=bool)
+    validas = np.all(np.isfinite(flujos), axis=1)
+
+    # Newton sobre las filas pendientes
+    activas = validas.copy()
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(max_iter):
+            if not activas.any():
+                break
+            idx = np.flatnonzero(activas)
+            van, derivada = _van_y_derivada(flujos[idx], tir[idx])
+            paso = van / derivada
+            nueva = tir[idx] - paso
+            fuera = ~np.isfinite(nueva) | (nueva <= TIR_MIN) | (nueva >= TIR_MAX)
+
+            listo = ~fuera & (np.abs(paso) < tolerancia * np.maximum(1.0, np.abs(nueva)))
+            tir[idx[~fuera]] = nueva[~fuera]
+            convergio[idx[listo]] = True
+            activas[idx[listo | fuera]] = False
+
+    # Bisección para las filas en las que Newton no convergió
+    pendientes = np.flatnonzero(validas & ~convergio)
+    tir[~validas] = np.nan
+    if pendientes.size:
+        sub = flujos[pendientes]
+        bajo = np.full(pendientes.size, TIR_MIN)
+        alto = np.full(pendientes.size, TIR_MAX)
+        van_bajo = van_lote(sub, bajo)
+        van_alto = van_lote(sub, alto)
+        con_raiz = np.sign(van_bajo) != np.sign(van_alto)
+
+        for _ in range(iter_biseccion):
+            medio = 0.5 * (bajo + alto)
+            van_medio = van_lote(sub, medio)
+            mismo_signo = np.sign(van_medio) == np.sign(van_bajo)
+            bajo = np.where(mismo_signo, medio, bajo)
+            van_bajo = np.where(mismo_signo, van_medio, van_bajo)
+            alto = np.where(mismo_signo, alto, medio)
+            if np.all((alto - bajo)[con_raiz] < tolerancia):
+                break
+
+        tir[pendientes] = np.where(con_raiz, 0.5 * (bajo + alto), np.nan)
+        convergio[pendientes] = con_raiz
+
+    return tir, convergio
+
+
+def payback_lote(flujos):
+    # Payback de cada fila: año fraccional (interpolando dentro del año de recuperación)
+    # y primer año entero con flujo acumulado >= 0. NaN si la inversión no se recupera.
+    flujos = _como_matriz(flujos)
+    acumulado = np.cumsum(flujos, axis=1)
+    recuperado = acumulado >= 0
+    alguno = recuperado.any(axis=1)
+
+    anio = np.argmax(recuperado, axis=1)
+    filas = np.arange(flujos.shape[0])
+    anterior = np.maximum(anio - 1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraccion = -acumulado[filas, anterior] / flujos[filas, anio]
+    fraccional = np.where(anio == 0, 0.0, anterior + fraccion)
+
+    return np.where(alguno, fraccional, np.nan), np.where(alguno, anio, np.nan)
+
+
+def indicadores_lote(flujos, tasa_descuento):
+    # Todos los indicadores de una vez, como en indicadores_financieros de motor_fv
+    flujos = _como_matriz(flujos)
+    tir, convergio = tir_lote(flujos)
+    payback, anio_payback = payback_lote(flujos)
+    return {
+        "tir": tir,
+        "convergio": convergio,
+        "van": van_lote(flujos, tasa_descuento),
+        "payback": payback,
+        "anio_payback": anio_payback,
+    }
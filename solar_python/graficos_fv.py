@@ -0,0 +1,196 @@
+# Figuras Plotly del panel, construidas por trazas y guardadas en la caché de escenarios
+# Cada traza se indexa con la huella de solo los datos que dibuja (capa "trazas") y cada figura
+# con las huellas de sus trazas y de su diseño (capa "graficos"). Al mover un parámetro solo se
+# rehacen las trazas que dependen de él; una figura sin cambios es el mismo objeto y produce el
+# mismo JSON, que Streamlit manda al navegador como referencia a su caché de mensajes.
+# Las trazas son diccionarios simples: no se valida nada hasta armar la figura.
+import importlib.util
+import threading
+
+import numpy as np
+
+from cache_fv import CacheLRU, huella
+from motor_fv import MESES_ES, anio_payback
+
+
+def figura_en_cache(cache, nombre, base, clave_base, trazas):
+    # base(): figura vacía con el diseño, clave_base: entradas de las que depende el diseño.
+    # trazas: lista de (clave, constructor, fila); fila es la fila del subplot o None.
+    claves = [huella(nombre, clave) for clave, _, _ in trazas]
+    datos = [cache.obtener("trazas", clave, constructor) for clave, (_, constructor, _) in zip(claves, trazas)]
+
+    def construir():
+        fig = base()
+        for traza, (_, _, fila) in zip(datos, trazas):
+            fig.add_trace(traza, row=fila, col=None if fila is None else 1)
+        return fig
+
+    return cache.obtener("graficos", huella(nombre, clave_base, claves), construir)
+
+
+def _serie(x, y, nombre, plantilla, modo='lines+markers', **opciones):
+    return dict(type='scatter', x=list(x), y=np.asarray(y, dtype=float).tolist(), mode=modo, name=nombre,
+                hovertemplate=plantilla, **opciones)
+
+
+##########
+# Consumo y costo mensual por año
+
+def figura_consumo(cache, df):
+    # Dos filas (costo y consumo) con una traza por año; los años salen de un solo groupby
+    meses = df['Mes'].to_numpy()
+    pagos = df['Total_pagar'].fillna(0).to_numpy(dtype=float)
+    consumo = df['Consumo subtotal'].to_numpy(dtype=float)
+    grupos = df.groupby('Año', sort=False).indices      # año -> posiciones, en orden de aparición
+    meses_unicos = list(dict.fromkeys(meses))
+    promedio_pago = pagos.mean()
+    promedio_consumo = np.nanmean(consumo)
+
+    trazas = []
+    for año, filas in grupos.items():
+        trazas.append((("costo", año, meses[filas].tolist(), pagos[filas]),
+                       lambda año=año, filas=filas: _serie(meses[filas], pagos[filas], f"Año {año} - $",
+                                                           'Mes: %{x}<br>Monto: %{y:.2f} USD'), 1))
+    trazas.append((("promedio_costo", meses_unicos, promedio_pago),
+                   lambda: _serie(meses_unicos, [promedio_pago] * len(meses_unicos),
+                                  f"Promedio: {promedio_pago:.2f} USD", None, modo='lines',
+                                  line=dict(color='gray', dash='dash')), 1))
+    for año, filas in grupos.items():
+        trazas.append((("consumo", año, meses[filas].tolist(), consumo[filas]),
+                       lambda año=año, filas=filas: _serie(meses[filas], consumo[filas], f"Año {año} - kWh",
+                                                           'Mes: %{x}<br>Consumo: %{y:.0f} kWh'), 2))
+    trazas.append((("promedio_consumo", meses_unicos, promedio_consumo),
+                   lambda: _serie(meses_unicos, [promedio_consumo] * len(meses_unicos),
+                                  f"Promedio: {promedio_consumo:.0f} kWh", None, modo='lines',
+                                  line=dict(color='gray', dash='dash')), 2))
+
+    def base():
+        from plotly.subplots import make_subplots
+        fig = make_subplots(
+            rows=2, cols=1,
+            shared_xaxes=True,
+            vertical_spacing=0.15,
+            subplot_titles=("Costo mensual por año", "Consumo mensual por año")
+        )
+        fig.update_layout(
+            height=500,
+            width=900,
+            legend=dict(orientation="h", yanchor="bottom", y=1.04, xanchor="right", x=1),
+            margin=dict(t=80, b=30),
+        )
+        fig.update_xaxes(title_text="", row=2, col=1, tickangle=45, tickvals=list(range(1, 13)),
+                         ticktext=[MESES_ES[i + 1] for i in range(12)])
+        fig.update_yaxes(title_text="Monto ($)", row=1, col=1)
+        fig.update_yaxes(title_text="Consumo (kWh)", row=2, col=1)
+        return fig
+
+    return figura_en_cache(cache, "consumo", base, None, trazas)
+
+
+##########
+# Flujo de caja del proyecto
+
+def figura_flujo_caja(cache, flujo_de_caja, vida_util):
+    años = list(range(vida_util + 1))
+    flujo = np.asarray(flujo_de_caja, dtype=float)
+    payback = anio_payback(flujo_de_caja)
+
+    trazas = [
+        (("barras", vida_util, flujo),
+         lambda: dict(type='bar', x=años, y=flujo.tolist(), name="Flujo de Caja", marker_color='teal',
+                      hovertemplate='Año %{x}<br>USD: %{y:,.2f}<extra></extra>'), None),
+        (("acumulado", vida_util, flujo),
+         lambda: _serie(años, np.cumsum(flujo), 'Flujo Acumulado', 'Año %{x}<br>Acumulado: %{y:,.2f}<extra></extra>',
+                        line=dict(color='orange', dash='dash')), None),
+    ]
+
+    def base():
+        import plotly.graph_objects as go
+        fig = go.Figure()
+        # Línea de cero
+        fig.add_shape(type='line', x0=años[0], x1=años[-1], y0=0, y1=0, line=dict(color='black', dash='dash'))
+        # Línea vertical de payback
+        if payback is not None:
+            fig.add_vline(x=payback, line_dash="dot", line_color="red",
+                          annotation_text=f"Payback Año {payback}", annotation_position="top left")
+        fig.update_layout(
+            title=f"💰 Flujo de Caja del Proyecto Fotovoltaico ({vida_util} años)",
+            xaxis_title="Año",
+            yaxis_title="USD",
+            template='plotly_white',
+            height=450
+        )
+        return fig
+
+    return figura_en_cache(cache, "flujo_caja", base, (vida_util, payback), trazas)
+
+
+##########
+# Cobertura solar y excedente por mes
+
+def figura_cobertura(cache, x, cobertura, excedente):
+    # x: Serie de fechas o meses (la huella se toma de la Serie)
+    valores_x = x.to_numpy()
+    cobertura = np.asarray(cobertura, dtype=float)
+    excedente = np.asarray(excedente, dtype=float)
+
+    trazas = [
+        (("cobertura", x, cobertura),
+         lambda: dict(type='bar', x=valores_x, y=cobertura.tolist(), name='Cobertura mensual (%)', marker_color='green',
+                      text=[f"{v}%" for v in np.round(cobertura, 1)], textposition='outside'), None),
+        (("excedente", x, excedente),
+         lambda: dict(type='bar', x=valores_x, y=excedente.tolist(), name='Excedente mensual (kWh)',
+                      marker_color='rgba(255, 100, 100, 0.7)', text=np.round(excedente, 1).tolist(),
+                      textposition='outside'), None),
+    ]
+
+    def base():
+        import plotly.graph_objects as go
+        fig = go.Figure()
+        fig.update_layout(
+            title='☀️ Cobertura solar y excedente mensual',
+            xaxis_title=None,
+            yaxis_title='Porcentaje (%) / Energía (kWh)',
+            barmode='group',
+            bargap=0.2,
+            uniformtext_minsize=8,
+            uniformtext_mode='hide',
+            legend=dict(x=0.5, xanchor='center', orientation='h')
+        )
+        return fig
+
+    return figura_en_cache(cache, "cobertura", base, None, trazas)
+
+
+##########
+# Exportación a PNG para los reportes PDF
+# kaleido mantiene vivo su proceso de exportación entre llamadas: solo la primera imagen paga el
+# arranque. Las imágenes se guardan por la huella del JSON de la figura y del tamaño pedido.
+
+_IMAGENES = CacheLRU(128)
+_EXPORTADOR = threading.Lock()      # el proceso de kaleido atiende un pedido a la vez
+
+
+def exportador_disponible():
+    return importlib.util.find_spec("kaleido") is not None
+
+
+def imagen_png(spec, ancho=900, alto=450, escala=2):
+    # spec: figura o su JSON. Devuelve los bytes PNG, o None si kaleido no está instalado
+    if not exportador_disponible():
+        return None
+    if not isinstance(spec, str):
+        spec = spec.to_json()
+
+    def exportar():
+        import plotly.io as pio
+        with _EXPORTADOR:
+            return pio.to_image(pio.from_json(spec), format="png", width=ancho, height=alto, scale=escala)
+
+    return _IMAGENES.obtener(huella(spec, ancho, alto, escala), exportar)
+
+
+def precalentar_exportador():
+    # Arranca el proceso de kaleido con una figura vacía, para que el primer reporte no lo espere
+    if exportador_disponible():
+        imagen_png('{"data": [], "layout": {}}', 10, 10, 1)
@@ -0,0 +1,145 @@
+# Grilla binaria precalculada de PVOUT mensual + GHI para consultas sin rasterio
+#
+# Construcción (una sola vez, requiere rasterio):
+#   python solar_python/grilla_fv.py --salida solar_python/grilla_fv.bin [--float16]
+#
+# Formato del archivo:
+#   8 bytes   firma b'FVGRID01'
+#   4 bytes   largo del encabezado JSON (uint32, little-endian)
+#   JSON      alto, ancho, bandas, dtype, transform, offsets de datos y máscara
+#   datos     arreglo (alto, ancho, 13) intercalado por celda: 12 meses + GHI, NaN sin datos
+#   máscara   bits empaquetados (alto * ancho) con 1 en las celdas válidas
+# Los bloques de datos y máscara están alineados a 64 bytes para abrirlos con np.memmap.
+import argparse
+import json
+import struct
+
+import numpy as np
+
+
+FIRMA = b'FVGRID01'
+ALINEACION = 64
+NOMBRES_BANDAS = [f"PVOUT_{m:02d}" for m in range(1, 13)] + ["GHI"]
+
+
+def _alinear(n):
+    return (n + ALINEACION - 1) // ALINEACION * ALINEACION
+
+
+##########
+# Construcción
+
+def construir_grilla(ruta_salida, ruta_rasters=None, ruta_ghi=None, dtype="float32"):
+    # Convierte los GeoTIFF mensuales y el GHI en un único archivo binario
+    from rasters_fv import RUTA_PVOUT, RUTA_GHI, cargar_cubo_pvout, cargar_cubo_ghi
+
+    cubo = cargar_cubo_pvout(ruta_rasters or RUTA_PVOUT)
+    ghi = cargar_cubo_ghi(ruta_ghi or RUTA_GHI)
+    if ghi.transform != cubo.transform or ghi.datos.shape[1:] != cubo.datos.shape[1:]:
+        raise ValueError("El raster GHI no comparte la grilla de los PVOUT mensuales.")
+
+    # (bandas, alto, ancho) -> (alto, ancho, bandas): los 13 valores de una celda quedan contiguos
+    datos = np.concatenate([cubo.datos, ghi.datos]).transpose(1, 2, 0).astype(dtype)
+    mascara = np.all(np.isfinite(datos), axis=2)
+
+    encabezado = {
+        "alto": cubo.alto,
+        "ancho": cubo.ancho,
+        "bandas": NOMBRES_BANDAS,
+        "dtype": np.dtype(dtype).name,
+        "transform": [cubo.transform.a, cubo.transform.b, cubo.transform.c,
+                      cubo.transform.d, cubo.transform.e, cubo.transform.f],
+        "crs": str(cubo.crs) if cubo.crs else None,
+    }
+    # Los offsets dependen del largo del encabezado, que a su vez los incluye
+    offset_datos = 0
+    while True:
+        encabezado["offset_datos"] = offset_datos
+        encabezado["offset_mascara"] = _alinear(offset_datos + datos.nbytes)
+        json_bytes = json.dumps(encabezado).encode()
+        nuevo_offset = _alinear(len(FIRMA) + 4 + len(json_bytes))
+        if nuevo_offset == offset_datos:
+            break
+        offset_datos = nuevo_offset
+
+    mascara_bits = np.packbits(mascara.ravel())
+    with open(ruta_salida, "wb") as f:
+        f.write(FIRMA)
+        f.write(struct.pack("<I", len(json_bytes)))
+        f.write(json_bytes)
+        f.write(b"\0" * (offset_datos - f.tell()))
+        f.write(np.ascontiguousarray(datos).tobytes())
+        f.write(b"\0" * (encabezado["offset_mascara"] - f.tell()))
+        f.write(mascara_bits.tobytes())
+
+    return encabezado
+
+
+##########
+# Consulta
+
+class GrillaFV:
+    # Grilla abierta en modo memmap; las consultas son indexación NumPy pura
+
+    def __init__(self, ruta):
+        with open(ruta, "rb") as f:
+            if f.read(len(FIRMA)) != FIRMA:
+                raise ValueError(f"{ruta} no es una grilla FV válida.")
+            largo = struct.unpack("<I", f.read(4))[0]
+            self.encabezado = json.loads(f.read(largo))
+
+        e = self.encabezado
+        self.alto, self.ancho = e["alto"], e["ancho"]
+        self.bandas = len(e["bandas"])
+        self.datos = np.memmap(ruta, dtype=e["dtype"], mode="r", offset=e["offset_datos"],
+                               shape=(self.alto, self.ancho, self.bandas))
+        self._mascara_bits = np.memmap(ruta, dtype=np.uint8, mode="r", offset=e["offset_mascara"],
+                                       shape=((self.alto * self.ancho + 7) // 8,))
+
+        # Transformación inversa (lon, lat) -> (col, fila) precalculada
+        a, b, c, d, e_, f = e["transform"]
+        det = a * e_ - b * d
+        self._inversa = (e_ / det, -b / det, (b * f - e_ * c) / det,
+                         -d / det, a / det, (d * c - a * f) / det)
+
+    @property
+    def mascara(self):
+        # Celdas con datos válidos (alto, ancho)
+        bits = np.unpackbits(self._mascara_bits)[:self.alto * self.ancho]
+        return bits.reshape(self.alto, self.ancho).astype(bool)
+
+    def filas_columnas(self, lat, lon):
+        ia, ib, ic, id_, ie, if_ = self._inversa
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        col = np.floor(ia * lon + ib * lat + ic).astype(np.int64)
+        fila = np.floor(id_ * lon + ie * lat + if_).astype(np.int64)
+        return fila, col
+
+    def consultar(self, lat, lon):
+        # Celda más cercana (la que contiene al punto). Devuelve PVOUT (N, 12) y GHI (N,)
+        # en float32, con NaN para puntos fuera de la grilla o sin datos.
+        fila, col = self.filas_columnas(np.atleast_1d(lat), np.atleast_1d(lon))
+        dentro = (fila >= 0) & (fila < self.alto) & (col >= 0) & (col < self.ancho)
+
+        valores = np.full((fila.size, self.bandas), np.nan, dtype=np.float32)
+        valores[dentro] = self.datos[fila[dentro], col[dentro]]
+        return valores[:, :12], valores[:, 12]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construye la grilla binaria de PVOUT mensual + GHI.")
+    parser.add_argument("--salida", default="solar_python/grilla_fv.bin", help="Archivo de salida")
+    parser.add_argument("--rasters", default=None, help="Carpeta con los PVOUT mensuales")
+    parser.add_argument("--ghi", default=None, help="Raster GHI")
+    parser.add_argument("--float16", action="store_true", help="Guardar en float16 (mitad de tamaño)")
+    args = parser.parse_args(argv)
+
+    encabezado = construir_grilla(args.salida, args.rasters, args.ghi,
+                                  "float16" if args.float16 else "float32")
+    print(f"✅ Grilla {encabezado['alto']}x{encabezado['ancho']}x{len(encabezado['bandas'])} "
+          f"({encabezado['dtype']}) escrita en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
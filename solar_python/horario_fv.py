@@ -0,0 +1,122 @@
+# Simulación horaria (8760 h) a partir de los valores mensuales de PVOUT
+# Genera perfiles sintéticos de producción con geometría solar del sitio, los combina con
+# perfiles de carga horarios y calcula autoconsumo, excedente y déficit. Todo vectorizado
+# sobre (sitios, horas).
+import numpy as np
+
+
+HORAS_ANIO = 8760
+DIAS_MES = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+INICIO_MES = np.concatenate([[0], np.cumsum(DIAS_MES * 24)[:-1]])   # primera hora de cada mes
+ZONA_HORARIA = -5   # Ecuador continental (UTC-5)
+
+# Forma típica del consumo residencial durante el día (hora 0 a 23), se normaliza al usarla
+PERFIL_RESIDENCIAL = np.array([
+    0.45, 0.40, 0.38, 0.37, 0.38, 0.50, 0.80, 1.00, 0.85, 0.70, 0.65, 0.70,
+    0.80, 0.75, 0.65, 0.62, 0.68, 0.90, 1.30, 1.50, 1.40, 1.10, 0.80, 0.55,
+])
+
+
+def _tiempo_anual():
+    # Día del año (1-365) y hora del día (0-23) de cada una de las 8760 horas
+    hora = np.arange(HORAS_ANIO)
+    return hora // 24 + 1, hora % 24
+
+
+def mes_de_hora():
+    # Mes (0-11) de cada hora del año
+    return np.repeat(np.arange(12), DIAS_MES * 24)
+
+
+def sumar_por_mes(horario):
+    # Suma (..., 8760) -> (..., 12)
+    return np.add.reduceat(horario, INICIO_MES, axis=-1)
+
+
+def perfil_solar(lat, lon, zona_horaria=ZONA_HORARIA):
+    # Forma relativa de la irradiancia horizontal (N, 8760) para cada sitio, a partir de la
+    # altura solar en el centro de cada hora y una atenuación atmosférica simple por masa de aire
+    lat = np.atleast_1d(np.asarray(lat, dtype=float))[:, None]
+    lon = np.atleast_1d(np.asarray(lon, dtype=float))[:, None]
+    dia, hora = _tiempo_anual()
+
+    b = np.radians(360 / 365 * (dia - 81))
+    ecuacion_tiempo = 9.87 * np.sin(2 * b) - 7.53 * np.cos(b) - 1.5 * np.sin(b)      # minutos
+    declinacion = np.radians(23.45) * np.sin(np.radians(360 / 365 * (284 + dia)))
+
+    hora_solar = hora + 0.5 + (lon - 15 * zona_horaria) / 15 + ecuacion_tiempo / 60
+    angulo_horario = np.radians(15 * (hora_solar - 12))
+    phi = np.radians(lat)
+    cos_cenit = np.sin(phi) * np.sin(declinacion) + np.cos(phi) * np.cos(declinacion) * np.cos(angulo_horario)
+    cos_cenit = np.clip(cos_cenit, 0, None)
+
+    with np.errstate(divide='ignore'):
+        masa_aire = np.where(cos_cenit > 0.01, 1 / cos_cenit, np.inf)
+    return cos_cenit * 0.7 ** (masa_aire ** 0.678)
+
+
+def escalar_a_meses(perfil, energia_mensual):
+    # Reparte la energía de cada mes (N, 12) según la forma horaria (N, 8760)
+    energia_mensual = np.atleast_2d(np.asarray(energia_mensual, dtype=float))
+    suma = sumar_por_mes(perfil)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.where(suma > 0, energia_mensual / suma, 0.0)
+    return perfil * factor[:, mes_de_hora()]
+
+
+def generacion_horaria(lat, lon, generacion_mensual, zona_horaria=ZONA_HORARIA):
+    # Producción horaria (N, 8760) en kWh cuya suma mensual coincide con generacion_mensual (N, 12)
+    return escalar_a_meses(perfil_solar(lat, lon, zona_horaria), generacion_mensual)
+
+
+def carga_horaria(consumo_mensual, perfil_diario=PERFIL_RESIDENCIAL):
+    # Consumo horario (N, 8760) en kWh repitiendo la forma diaria y escalando a cada mes
+    consumo_mensual = np.atleast_2d(np.asarray(consumo_mensual, dtype=float))
+    perfil = np.tile(np.asarray(perfil_diario, dtype=float), 365)[None, :]
+    return escalar_a_meses(np.broadcast_to(perfil, (consumo_mensual.shape[0], HORAS_ANIO)), consumo_mensual)
+
+
+def balance_horario(generacion, carga, tarifa=None, tarifa_excedente=None):
+    # Balance hora a hora (Net Billing): la energía solar cubre primero la carga del momento
+    # y el resto se inyecta. Devuelve totales mensuales (N, 12) y, si se dan las tarifas,
+    # el ahorro mensual valorando el autoconsumo a tarifa y el excedente a tarifa_excedente.
+    autoconsumo = np.minimum(generacion, carga)
+    resultado = {
+        "generacion": sumar_por_mes(generacion),
+        "consumo": sumar_por_mes(carga),
+        "autoconsumo": sumar_por_mes(autoconsumo),
+        "excedente": sumar_por_mes(generacion - autoconsumo),
+        "deficit": sumar_por_mes(carga - autoconsumo),
+    }
+    with np.errstate(divide='ignore', invalid='ignore'):
+        generacion_anual = resultado["generacion"].sum(axis=-1)
+        consumo_anual = resultado["consumo"].sum(axis=-1)
+        resultado["fraccion_autoconsumo"] = resultado["autoconsumo"].sum(axis=-1) / generacion_anual
+        resultado["fraccion_autosuficiencia"] = resultado["autoconsumo"].sum(axis=-1) / consumo_anual
+
+    if tarifa is not None:
+        tarifa = np.atleast_1d(np.asarray(tarifa, dtype=float))[:, None]
+        excedente = tarifa if tarifa_excedente is None else np.atleast_1d(np.asarray(tarifa_excedente, dtype=float))[:, None]
+        resultado["ahorro"] = resultado["autoconsumo"] * tarifa + resultado["excedente"] * excedente
+    return resultado
+
+
+def dia_tipico(horario, mes):
+    # Promedio por hora del día (N, 24) para un mes (1-12)
+    inicio = INICIO_MES[mes - 1]
+    horas = horario[..., inicio:inicio + DIAS_MES[mes - 1] * 24]
+    return horas.reshape(*horas.shape[:-1], DIAS_MES[mes - 1], 24).mean(axis=-2)
+
+
+def simular_horario(lat, lon, valores_mensuales, tamano_sistema_kWp, consumo_mensual, factor_perdidas=1.0,
+                    tarifa=None, tarifa_excedente=None, perfil_diario=PERFIL_RESIDENCIAL):
+    # Cadena completa para uno o N sitios: valores_mensuales (N, 12) en kWh/kWp, tamaño (N,),
+    # consumo_mensual (N, 12). Con factor_perdidas=1 la generación coincide con calcular_cobertura.
+    valores_mensuales = np.atleast_2d(np.asarray(valores_mensuales, dtype=float))
+    tamano = np.atleast_1d(np.asarray(tamano_sistema_kWp, dtype=float))[:, None]
+    generacion = generacion_horaria(lat, lon, valores_mensuales * tamano * factor_perdidas)
+    carga = carga_horaria(consumo_mensual, perfil_diario)
+    resultado = balance_horario(generacion, carga, tarifa, tarifa_excedente)
+    resultado["generacion_horaria"] = generacion
+    resultado["carga_horaria"] = carga
+    return resultado
@@ -0,0 +1,299 @@
+# Ingesta por bloques de exportaciones de facturación (CSV o Excel) con memoria acotada
+# Cada bloque se lee con tipos fijos, se limpia con una sola pasada por columna, se valida
+# y se reduce a consumo mensual por cliente; al final se combinan los parciales. El resultado
+# tiene la misma forma que produce preparar_consumo (Fecha, Consumo subtotal, Monto,
+# Total_pagar, Año, Mes_num, Mes) con una fila por cliente y mes.
+import io
+
+import numpy as np
+import pandas as pd
+
+from motor_fv import MESES_ES
+
+
+COLUMNAS = ["Fecha", "Consumo subtotal", "Monto", "Total_pagar"]
+COLUMNAS_MONTO = ["Monto", "Total_pagar"]
+COLUMNAS_TEXTO = ["Fecha"] + COLUMNAS_MONTO     # se leen como texto y se limpian después
+COLUMNAS_NUMERICAS = ["Consumo subtotal"]       # siempre float: un bloque de enteros no fija el tipo
+TAMANO_BLOQUE = 100_000     # filas por bloque
+
+
+def _tipo_archivo(fuente, tipo):
+    # "csv" o "excel" a partir del tipo MIME, la extensión o el nombre del archivo
+    tipo = (tipo or getattr(fuente, "name", None) or (fuente if isinstance(fuente, str) else "")).lower()
+    if "csv" in tipo or tipo.endswith(".txt"):
+        return "csv"
+    if "spreadsheet" in tipo or "excel" in tipo or tipo.endswith((".xlsx", ".xlsm", ".xls")):
+        return "excel"
+    raise ValueError(f"Formato de archivo no compatible: {tipo}")
+
+
+def _fuente_binaria(fuente):
+    if isinstance(fuente, (bytes, bytearray)):
+        return io.BytesIO(fuente)
+    return fuente
+
+
+##########
+# Lectura por bloques
+
+def _encabezado_csv(fuente):
+    # Nombres de columna tal como están en el archivo (sin recortar espacios)
+    encabezado = list(pd.read_csv(fuente, nrows=0).columns)
+    if hasattr(fuente, "seek"):
+        fuente.seek(0)
+    return encabezado
+
+
+def _tipos_csv(encabezado, columnas, columnas_texto):
+    # Tipos fijos por nombre original de columna. Los tipos no se infieren del primer bloque:
+    # un archivo con consumos enteros y luego "123.5", o con identificadores numéricos y luego
+    # "ABC", rompería la conversión de los bloques siguientes.
+    texto = set(COLUMNAS_TEXTO) | set(columnas_texto)
+    tipos = {}
+    for c in encabezado:
+        if c.strip() in columnas and c.strip() in texto:
+            tipos[c] = "string"
+        elif c.strip() in columnas and c.strip() in COLUMNAS_NUMERICAS:
+            tipos[c] = "float64"
+    return tipos
+
+
+def _bloques_csv(fuente, tamano_bloque, columnas, usar_pyarrow, columnas_texto=()):
+    encabezado = _encabezado_csv(fuente)
+    incluidas = [c for c in encabezado if c.strip() in columnas]
+    tipos = _tipos_csv(encabezado, columnas, columnas_texto)
+    if usar_pyarrow is not False:
+        try:
+            import pyarrow.csv as pacsv
+        except ImportError:
+            if usar_pyarrow:
+                raise
+        else:
+            # Lector en streaming de pyarrow, solo con las columnas pedidas
+            lector = pacsv.open_csv(
+                fuente,
+                read_options=pacsv.ReadOptions(block_size=max(tamano_bloque * 64, 1 << 20)),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=incluidas,
+                    column_types=tipos,
+                    strings_can_be_null=True,
+                ),
+            )
+            for lote in lector:
+                bloque = lote.to_pandas()
+                bloque.columns = bloque.columns.str.strip()
+                yield bloque
+            return
+
+    tipos = {c: ("string" if t == "string" else float) for c, t in tipos.items()}
+    for bloque in pd.read_csv(fuente, chunksize=tamano_bloque, dtype=tipos, usecols=incluidas):
+        bloque.columns = bloque.columns.str.strip()
+        yield bloque
+
+
+def _bloques_excel(fuente, tamano_bloque, columnas):
+    # openpyxl en modo solo lectura recorre las filas sin cargar la hoja completa
+    import openpyxl
+
+    libro = openpyxl.load_workbook(fuente, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = [str(c).strip() if c is not None else "" for c in next(filas, [])]
+        indices = [i for i, c in enumerate(encabezado) if c in columnas]
+        nombres = [encabezado[i] for i in indices]
+
+        lote = []
+        for fila in filas:
+            lote.append([fila[i] if i < len(fila) else None for i in indices])
+            if len(lote) >= tamano_bloque:
+                yield pd.DataFrame(lote, columns=nombres)
+                lote = []
+        if lote or not nombres:
+            yield pd.DataFrame(lote, columns=nombres)
+    finally:
+        libro.close()
+
+
+def leer_bloques(fuente, tipo=None, tamano_bloque=TAMANO_BLOQUE, columnas=None, usar_pyarrow=None,
+                 columnas_texto=()):
+    # Genera DataFrames de hasta tamano_bloque filas con solo las columnas pedidas.
+    # usar_pyarrow: None = si está instalado, True = obligatorio, False = lector de pandas.
+    # columnas_texto: columnas que se leen siempre como texto (por ejemplo el identificador).
+    columnas = set(columnas or COLUMNAS)
+    fuente = _fuente_binaria(fuente)
+    if _tipo_archivo(fuente, tipo) == "csv":
+        return _bloques_csv(fuente, tamano_bloque, columnas, usar_pyarrow, columnas_texto)
+    return _bloques_excel(fuente, tamano_bloque, columnas)
+
+
+def columnas_archivo(fuente, tipo=None):
+    # Encabezado del archivo sin leer los datos
+    fuente = _fuente_binaria(fuente)
+    if _tipo_archivo(fuente, tipo) == "csv":
+        columnas = list(pd.read_csv(fuente, nrows=0).columns.str.strip())
+    else:
+        import openpyxl
+        libro = openpyxl.load_workbook(fuente, read_only=True, data_only=True)
+        try:
+            fila = next(libro.worksheets[0].iter_rows(values_only=True, max_row=1), ())
+        finally:
+            libro.close()
+        columnas = [str(c).strip() for c in fila if c is not None]
+    if hasattr(fuente, "seek"):
+        fuente.seek(0)
+    return columnas
+
+
+##########
+# Limpieza y agregación
+
+def _por_valores_unicos(serie, convertir):
+    # Los montos y fechas se repiten mucho: se convierten solo los valores distintos y se
+    # expanden con los códigos de factorize
+    codigos, unicos = pd.factorize(serie)
+    convertidos = np.asarray(convertir(pd.Series(unicos, dtype=object)))
+    resultado = np.empty(len(codigos), dtype=convertidos.dtype)
+    resultado[:] = convertidos[codigos] if len(convertidos) else resultado
+    if (codigos < 0).any():
+        resultado[codigos < 0] = np.datetime64("NaT") if resultado.dtype.kind == 'M' else np.nan
+    return pd.Series(resultado, index=serie.index)
+
+
+def _limpiar_montos(unicos):
+    texto = unicos.astype(str).str.replace(r'[\$,\s]', '', regex=True)
+    return pd.to_numeric(texto, errors='coerce').to_numpy(dtype=float, na_value=np.nan).round(2)
+
+
+def _convertir_fechas(unicos):
+    # ISO primero; solo los valores que no calzan pasan por el parser 'mixed'
+    fechas = pd.to_datetime(unicos, format="ISO8601", errors='coerce')
+    pendientes = fechas.isna() & unicos.notna()
+    if pendientes.any():
+        fechas[pendientes] = pd.to_datetime(unicos[pendientes].astype(str), format='mixed', errors='coerce')
+    return fechas.to_numpy(dtype="datetime64[ns]")
+
+
+def _montos(serie):
+    # Una sola pasada: quitar "$" y separadores de miles y convertir a número
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.astype(float).round(2)
+    return _por_valores_unicos(serie, _limpiar_montos)
+
+
+def _fechas(serie):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    return _por_valores_unicos(serie, _convertir_fechas)
+
+
+def limpiar_bloque(bloque, columna_id=None):
+    # Tipos limpios y filas válidas. Devuelve el bloque limpio y la cantidad de filas descartadas
+    faltantes = [c for c in COLUMNAS + ([columna_id] if columna_id else []) if c not in bloque.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+
+    limpio = pd.DataFrame({
+        "Fecha": _fechas(bloque["Fecha"]),
+        "Consumo subtotal": pd.to_numeric(bloque["Consumo subtotal"], errors='coerce'),
+        **{c: _montos(bloque[c]) for c in COLUMNAS_MONTO},
+    })
+    for c in bloque.columns:
+        if c not in limpio.columns:
+            limpio[c] = bloque[c].to_numpy()
+
+    validas = limpio["Fecha"].notna() & limpio["Consumo subtotal"].ge(0)
+    if columna_id:
+        validas &= limpio[columna_id].notna()
+    return limpio[validas], int((~validas).sum())
+
+
+SUMAS = ["Consumo subtotal", "Monto", "Total_pagar"]
+DESPLAZAMIENTO_PERIODO = 50_000     # los periodos (meses desde 1970) se guardan desplazados y positivos
+MULTIPLICADOR_CLIENTE = 2 * DESPLAZAMIENTO_PERIODO
+
+
+def _agregar(agrupado, columnas_extra, parcial=False):
+    # Sumas con min_count=1: un mes sin montos válidos queda en NaN (como en el promedio de main)
+    # en lugar de sumar 0
+    otras = {"Fecha": "min", "Facturas": "sum" if parcial else "count"}
+    otras.update({c: "first" for c in columnas_extra})
+    return pd.concat([agrupado[SUMAS].sum(min_count=1), agrupado.agg(otras)], axis=1)
+
+
+def agregar_bloque(limpio, columna_id=None, columnas_extra=(), catalogo=None):
+    # Consumo mensual (suma de facturas del mes) por cliente y periodo. Los identificadores se
+    # traducen a enteros con catalogo (dict compartido entre bloques) y cliente y periodo se
+    # combinan en una sola clave int64, mucho más liviana de agrupar que el texto.
+    periodo = limpio["Fecha"].to_numpy().astype("datetime64[M]").astype(np.int64) + DESPLAZAMIENTO_PERIODO
+    clave = periodo
+    if columna_id:
+        catalogo = {} if catalogo is None else catalogo
+        codigos, unicos = pd.factorize(limpio[columna_id])
+        globales = np.fromiter((catalogo.setdefault(u, len(catalogo)) for u in unicos), dtype=np.int64,
+                               count=len(unicos))
+        clave = globales[codigos] * MULTIPLICADOR_CLIENTE + periodo
+
+    datos = limpio.drop(columns=[columna_id] if columna_id else []).assign(Facturas=limpio["Consumo subtotal"])
+    extras = [c for c in columnas_extra if c in limpio.columns]
+    return _agregar(datos.groupby(pd.Series(clave, index=limpio.index, name="Clave"), sort=False), extras)
+
+
+def _compactar(parciales, columnas_extra):
+    # Une los agregados parciales de varios bloques en uno solo
+    total = pd.concat(parciales)
+    if len(parciales) == 1:
+        return total
+    extras = [c for c in columnas_extra if c in total.columns]
+    return _agregar(total.groupby(level=0, sort=False), extras, parcial=True)
+
+
+def _combinar(parciales, columna_id, columnas_extra, catalogo):
+    claves = [columna_id] if columna_id else []
+    if not parciales:
+        return pd.DataFrame(columns=claves + COLUMNAS + ["Facturas", "Año", "Mes_num", "Mes"])
+
+    total = _compactar(parciales, columnas_extra).sort_index()
+    clave = total.index.to_numpy()
+    total = total.reset_index(drop=True)
+    periodo = clave % MULTIPLICADOR_CLIENTE - DESPLAZAMIENTO_PERIODO
+    if columna_id:
+        identificadores = np.empty(len(catalogo), dtype=object)
+        identificadores[:] = list(catalogo)
+        total[columna_id] = identificadores[clave // MULTIPLICADOR_CLIENTE]
+
+    total["Año"] = (periodo // 12 + 1970).astype(np.int32)
+    total["Mes_num"] = (periodo % 12 + 1).astype(np.int32)
+    total["Mes"] = total["Mes_num"].map(MESES_ES)
+    total["Facturas"] = total["Facturas"].astype(int)
+    extras = [c for c in columnas_extra if c in total.columns]
+    # Filas ordenadas por cliente (en orden de aparición) y luego cronológicamente
+    return total[claves + COLUMNAS + ["Facturas"] + extras + ["Año", "Mes_num", "Mes"]]
+
+
+def ingerir(fuente, tipo=None, columna_id=None, columnas_extra=(), tamano_bloque=TAMANO_BLOQUE,
+            usar_pyarrow=None):
+    # Pipeline completo. fuente: ruta, bytes o archivo abierto (por ejemplo el de st.file_uploader).
+    # columnas_extra: columnas a conservar por cliente (primer valor del mes), si existen.
+    # Devuelve (DataFrame mensual, resumen con filas leídas, descartadas y bloques).
+    columnas = set(COLUMNAS) | set(columnas_extra) | ({columna_id} if columna_id else set())
+    catalogo = {}
+    parciales = []
+    filas_parciales = filas_compactadas = 0
+    resumen = {"filas": 0, "filas_descartadas": 0, "bloques": 0}
+    for bloque in leer_bloques(fuente, tipo, tamano_bloque, columnas, usar_pyarrow,
+                               [columna_id] if columna_id else ()):
+        limpio, descartadas = limpiar_bloque(bloque, columna_id)
+        resumen["filas"] += len(bloque)
+        resumen["filas_descartadas"] += descartadas
+        resumen["bloques"] += 1
+        if len(limpio):
+            parciales.append(agregar_bloque(limpio, columna_id, columnas_extra, catalogo))
+            filas_parciales += len(parciales[-1])
+        # Los parciales se compactan periódicamente: la memoria queda acotada por el resultado
+        # (clientes x meses) más unos pocos bloques; el umbral crece con lo ya compactado
+        if len(parciales) > 1 and filas_parciales > max(4 * tamano_bloque, 2 * filas_compactadas):
+            parciales = [_compactar(parciales, columnas_extra)]
+            filas_parciales = filas_compactadas = len(parciales[0])
+
+    return _combinar(parciales, columna_id, columnas_extra, catalogo), resumen
@@ -0,0 +1,235 @@
+# Ejecución por lotes (sin Streamlit) para estudios de factibilidad de un portafolio de sitios
+#
+# Uso (desde la raíz del repositorio):
+#   python solar_python/lote_fv.py sitios.csv resultados.csv --procesos 8
+#
+# El archivo de entrada (CSV o Parquet) tiene una fila por factura, con las columnas del
+# formato_ingreso_datos.xlsx (Fecha, Consumo subtotal, Monto, Total_pagar) más:
+#   Sitio     identificador del sitio (si falta se agrupa por lat/lon)
+#   lat, lon  coordenadas del sitio
+#   Tarifa    opcional, $/kWh con impuestos (si falta se calcula como Total_pagar / consumo)
+#   Costo_Wp  opcional, costo por Wp del sitio (si falta se usa --costo-wp)
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from finanzas_fv import indicadores_lote
+from ingesta_fv import ingerir
+from motor_fv import (preparar_consumo, dimensionar_sistema, produccion_anual_por_kWp,
+                      proyectar_escenarios)
+
+
+TAMANO_BLOQUE = 5000    # sitios por bloque enviado a cada proceso
+COLUMNAS_SITIO = ("lat", "lon", "Tarifa", "Costo_Wp")
+
+
+##########
+# Lectura y agregación de la entrada
+
+def leer_sitios(ruta, columna_id="Sitio"):
+    if ruta.lower().endswith(('.parquet', '.pq')):
+        return pd.read_parquet(ruta)
+    # CSV con identificador de sitio: lectura por bloques y agregación mensual (ingesta_fv),
+    # sin cargar todas las facturas en memoria
+    if columna_id in pd.read_csv(ruta, nrows=0).columns.str.strip():
+        return ingerir(ruta, "csv", columna_id, COLUMNAS_SITIO)[0]
+    return pd.read_csv(ruta)
+
+
+def agregar_por_sitio(df, columna_id="Sitio"):
+    # Un registro por sitio: coordenadas, consumo promedio mensual y tarifa
+    df = df.copy()
+    df.columns = df.columns.str.strip()
+    if columna_id not in df.columns:
+        df[columna_id] = df["lat"].astype(str) + "," + df["lon"].astype(str)
+    df = preparar_consumo(df)
+
+    columnas = {
+        "lat": ("lat", "first"),
+        "lon": ("lon", "first"),
+        "meses": ("Consumo subtotal", "count"),
+        "consumo_promedio_kWh": ("Consumo subtotal", "mean"),
+        "pago_total_promedio": ("Total_pagar", "mean"),
+    }
+    if "Tarifa" in df.columns:
+        columnas["tarifa_entrada"] = ("Tarifa", "mean")
+    if "Costo_Wp" in df.columns:
+        columnas["costo_Wp"] = ("Costo_Wp", "first")
+    sitios = df.groupby(columna_id, sort=False).agg(**columnas)
+
+    # Igual que en main(): tarifa con impuestos = pago total promedio / consumo promedio
+    sitios["tarifa_mas_impuestos"] = sitios["pago_total_promedio"] / sitios["consumo_promedio_kWh"]
+    if "tarifa_entrada" in sitios.columns:
+        sitios["tarifa_mas_impuestos"] = sitios["tarifa_entrada"].fillna(sitios["tarifa_mas_impuestos"])
+        sitios = sitios.drop(columns="tarifa_entrada")
+    return sitios.drop(columns="pago_total_promedio").reset_index()
+
+
+##########
+# Evaluación de un bloque de sitios (se ejecuta en los procesos del pool)
+
+def evaluar_bloque(bloque, pvout, ghi, parametros):
+    # bloque: DataFrame de sitios agregados, pvout (N, 12), ghi (N,)
+    factor_perdidas = parametros["factor_perdidas"]
+    costo_Wp = bloque["costo_Wp"].fillna(parametros["costo_Wp"]).to_numpy() if "costo_Wp" in bloque else parametros["costo_Wp"]
+
+    dimension = dimensionar_sistema(
+        bloque["consumo_promedio_kWh"].to_numpy(), pvout, factor_perdidas, parametros["objetivo_cobertura"]
+    )
+    tamano = dimension["tamano_sistema_kWp"]
+    produccion_kWp_anio = produccion_anual_por_kWp(ghi, dimension["factores_relativos"], factor_perdidas)
+
+    proyeccion = proyectar_escenarios(
+        tamano, produccion_kWp_anio, bloque["tarifa_mas_impuestos"].to_numpy(), costo_Wp,
+        parametros["mantenimiento_anual"], parametros["años_proyecto"]
+    )
+    indicadores = indicadores_lote(proyeccion["flujos"], parametros["tasa_descuento"])
+
+    resultado = bloque.copy()
+    resultado["radiacion_diaria"] = ghi
+    resultado["pvout_promedio"] = dimension["promedio_anual"]
+    resultado["tamano_sistema_kWp"] = tamano
+    resultado["inversion_usd"] = -proyeccion["flujos"][:, 0]
+    resultado["ahorro_total_usd"] = proyeccion["flujos"][:, 1:].sum(axis=1)
+    resultado["van"] = indicadores["van"]
+    resultado["tir"] = indicadores["tir"]
+    resultado["tir_convergio"] = indicadores["convergio"]
+    resultado["payback"] = indicadores["payback"]
+    resultado["anio_payback"] = indicadores["anio_payback"]
+
+    validos = np.isfinite(ghi) & np.all(np.isfinite(pvout), axis=1)
+    resultado["estado"] = np.where(validos, "ok", "fuera_del_raster")
+    return resultado
+
+
+def _evaluar_bloque_args(args):
+    return evaluar_bloque(*args)
+
+
+##########
+# Ejecución completa
+
+def muestrear(lat, lon, usar_cubo=True, ruta_rasters=None, ruta_ghi=None, ruta_grilla=None,
+              bilineal=False, max_distancia=0):
+    # Con una grilla precalculada (grilla_fv) no se importa rasterio. La interpolación bilineal y
+    # el pixel válido más cercano (rasters_fv.consultar_cubo) requieren el cubo en memoria.
+    if (bilineal or max_distancia) and (ruta_grilla or not usar_cubo):
+        raise ValueError("La interpolación bilineal y max_distancia requieren el cubo en memoria.")
+    if ruta_grilla:
+        from grilla_fv import GrillaFV
+        return GrillaFV(ruta_grilla).consultar(lat, lon)
+
+    from rasters_fv import (RUTA_PVOUT, RUTA_GHI, cargar_cubo_pvout, cargar_cubo_ghi,
+                            muestrear_sitios, muestrear_sitios_archivos)
+    ruta_rasters = ruta_rasters or RUTA_PVOUT
+    ruta_ghi = ruta_ghi or RUTA_GHI
+    if usar_cubo:
+        return muestrear_sitios(lat, lon, cargar_cubo_pvout(ruta_rasters), cargar_cubo_ghi(ruta_ghi),
+                                bilineal, max_distancia)
+    return muestrear_sitios_archivos(lat, lon, ruta_rasters, ruta_ghi)
+
+
+def ejecutar_lote(ruta_entrada, ruta_salida, parametros, procesos=1, tamano_bloque=TAMANO_BLOQUE,
+                  columna_id="Sitio", usar_cubo=True, ruta_rasters=None, ruta_ghi=None, ruta_grilla=None,
+                  bilineal=False, max_distancia=0):
+    # Devuelve la cantidad de sitios procesados; los resultados se escriben por bloques
+    sitios = agregar_por_sitio(leer_sitios(ruta_entrada, columna_id), columna_id)
+    lat = sitios["lat"].to_numpy(dtype=float)
+    lon = sitios["lon"].to_numpy(dtype=float)
+
+    # Muestreo de todos los sitios en una sola pasada
+    pvout, ghi = muestrear(lat, lon, usar_cubo, ruta_rasters, ruta_ghi, ruta_grilla, bilineal, max_distancia)
+    pvout = pvout.astype(float)
+    ghi = ghi.astype(float)
+
+    tareas = (
+        (sitios.iloc[i:i + tamano_bloque], pvout[i:i + tamano_bloque], ghi[i:i + tamano_bloque], parametros)
+        for i in range(0, len(sitios), tamano_bloque)
+    )
+
+    es_parquet = ruta_salida.lower().endswith(('.parquet', '.pq'))
+
+    def escribir(resultados):
+        # Cada bloque se escribe apenas termina (en el orden de la entrada)
+        escritor = None
+        primero = True
+        try:
+            for resultado in resultados:
+                if es_parquet:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                    tabla = pa.Table.from_pandas(resultado, preserve_index=False)
+                    if escritor is None:
+                        escritor = pq.ParquetWriter(ruta_salida, tabla.schema)
+                    escritor.write_table(tabla)
+                else:
+                    resultado.to_csv(ruta_salida, mode='w' if primero else 'a', header=primero, index=False)
+                primero = False
+        finally:
+            if escritor is not None:
+                escritor.close()
+
+    if procesos > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            escribir(pool.map(_evaluar_bloque_args, tareas))
+    else:
+        escribir(map(_evaluar_bloque_args, tareas))
+
+    return len(sitios)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Factibilidad fotovoltaica on-grid por lotes de sitios.")
+    parser.add_argument("entrada", help="CSV o Parquet con las facturas de cada sitio")
+    parser.add_argument("salida", help="CSV o Parquet de resultados (una fila por sitio)")
+    parser.add_argument("--columna-id", default="Sitio", help="Columna que identifica al sitio")
+    parser.add_argument("--cobertura", type=float, default=75, help="Objetivo de cobertura (%%)")
+    parser.add_argument("--perdidas", type=float, default=20, help="Factor de pérdidas (%%)")
+    parser.add_argument("--costo-wp", type=float, default=1.2, help="Costo por Wp si no viene en la entrada")
+    parser.add_argument("--mantenimiento", type=float, default=20, help="Mantenimiento anual ($)")
+    parser.add_argument("--tasa", type=float, default=0.08, help="Tasa de descuento")
+    parser.add_argument("--anios", type=int, default=20, help="Horizonte financiero (años)")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos en paralelo (0 = todos los núcleos)")
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE, help="Sitios por bloque")
+    parser.add_argument("--sin-cubo", action="store_true",
+                        help="Leer los GeoTIFF por bloques en lugar de cargar el cubo completo")
+    parser.add_argument("--rasters", default=None, help="Carpeta con los PVOUT mensuales")
+    parser.add_argument("--ghi", default=None, help="Raster GHI")
+    parser.add_argument("--grilla", default=None, help="Grilla binaria de grilla_fv.py (no requiere rasterio)")
+    parser.add_argument("--bilineal", action="store_true", help="Interpolar entre los 4 pixeles vecinos")
+    parser.add_argument("--max-distancia", type=float, default=0,
+                        help="Pixeles hasta el pixel válido más cercano para sitios sin datos (0 = no corregir)")
+    args = parser.parse_args(argv)
+    if (args.bilineal or args.max_distancia) and (args.sin_cubo or args.grilla):
+        parser.error("--bilineal y --max-distancia requieren el cubo en memoria (sin --sin-cubo ni --grilla)")
+
+    parametros = {
+        "objetivo_cobertura": args.cobertura / 100,
+        "factor_perdidas": (100 - args.perdidas) / 100,
+        "costo_Wp": args.costo_wp,
+        "mantenimiento_anual": args.mantenimiento,
+        "tasa_descuento": args.tasa,
+        "años_proyecto": args.anios,
+    }
+    procesos = args.procesos or os.cpu_count()
+
+    inicio = time.perf_counter()
+    cantidad = ejecutar_lote(args.entrada, args.salida, parametros, procesos, args.tamano_bloque,
+                             args.columna_id, not args.sin_cubo, args.rasters, args.ghi, args.grilla,
+                             args.bilineal, args.max_distancia)
+    duracion = time.perf_counter() - inicio
+    print(f"✅ {cantidad} sitios procesados en {duracion:.2f} s ({cantidad / max(duracion, 1e-9):,.0f} sitios/s) -> {args.salida}")
+    if args.sin_cubo and not args.grilla:
+        from rasters_fv import BLOQUES
+        bloques = BLOQUES.estadisticas()
+        print(f"   Caché de bloques: {bloques['tasa_aciertos']:.1%} de aciertos, "
+              f"{bloques['bytes_decodificados'] / 1e6:.1f} MB decodificados")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
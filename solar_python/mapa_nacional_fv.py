@@ -0,0 +1,231 @@
+# Mapas nacionales de factibilidad: tamaño del sistema, VAN y payback en cada pixel del PVOUT
+#
+# Uso (desde la raíz del repositorio):
+#   python solar_python/mapa_nacional_fv.py --consumo 150 --tarifa 0.117 --procesos 8
+#
+# Todo salvo el consumo y la tarifa es espacial, así que para un hogar tipo se evalúa el mismo
+# dimensionamiento y flujo de caja que main() en cada celda válida de monthly_pvout. La grilla
+# se recorre por teselas (ventanas de rasterio) repartidas entre procesos; cada tesela se
+# evalúa vectorizada con lote_fv.evaluar_bloque. Las salidas son GeoTIFF optimizados para la
+# nube (COG) con overviews, que la app puede superponer en los mapas de folium.
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lote_fv import evaluar_bloque
+
+
+RUTA_MAPA_NACIONAL = 'solar_python/mapa_nacional'
+TAMANO_TESELA = 256         # lado de las teselas evaluadas y de los bloques internos del COG
+NIVELES_OVERVIEW = (2, 4, 8, 16)
+
+# Capa -> (archivo, leyenda)
+CAPAS = {
+    "tamano_sistema_kWp": ("kwp.tif", "Tamaño del sistema (kWp)"),
+    "van": ("van.tif", "VAN (USD)"),
+    "payback": ("payback.tif", "Payback (años)"),
+}
+
+
+##########
+# Evaluación de una tesela (se ejecuta en los procesos del pool)
+
+def teselas(alto, ancho, tamano=TAMANO_TESELA):
+    # Ventanas (fila, columna, alto, ancho) que cubren la grilla
+    return [(fila, col, min(tamano, alto - fila), min(tamano, ancho - col))
+            for fila in range(0, alto, tamano) for col in range(0, ancho, tamano)]
+
+
+def _leer_ventana(src, ventana, transform=None, forma=None):
+    # Banda 1 en la ventana como float32 con NaN donde no hay datos. Si el raster no comparte
+    # la grilla (transform, forma) de los PVOUT, se remuestrea por vecino más cercano a la tesela.
+    from rasterio.windows import Window, bounds, from_bounds
+
+    fila, col, alto, ancho = ventana
+    ventana = Window(col, fila, ancho, alto)
+    if transform is not None and (src.transform != transform or src.shape != forma):
+        ventana = from_bounds(*bounds(ventana, transform), transform=src.transform)
+        banda = src.read(1, window=ventana, out_shape=(alto, ancho), boundless=True,
+                         fill_value=src.nodata if src.nodata is not None else np.nan)
+    else:
+        banda = src.read(1, window=ventana)
+    banda = banda.astype(np.float32, copy=False)
+    if src.nodata is not None:
+        banda[banda == np.float32(src.nodata)] = np.nan
+    return banda
+
+
+def evaluar_tesela(ventana, ruta_rasters, ruta_ghi, parametros):
+    # Devuelve la ventana y un arreglo (alto, ancho) por capa, con NaN fuera de las celdas válidas
+    import rasterio
+    from rasters_fv import verificar_ghi
+
+    archivos_raster = sorted(glob.glob(os.path.join(ruta_rasters, '*.tif')))
+    bandas = []
+    for ruta in archivos_raster:
+        with rasterio.open(ruta) as src:
+            transform, forma = src.transform, src.shape
+            bandas.append(_leer_ventana(src, ventana))
+    with rasterio.open(ruta_ghi) as src:
+        ghi = verificar_ghi(_leer_ventana(src, ventana, transform, forma), ruta_ghi)
+
+    pvout = np.stack(bandas, axis=-1)
+    validos = np.isfinite(ghi) & np.all(np.isfinite(pvout), axis=-1) & (pvout.mean(axis=-1) > 0)
+    capas = {nombre: np.full(ghi.shape, np.nan, dtype=np.float32) for nombre in CAPAS}
+    n = int(validos.sum())
+    if n:
+        bloque = pd.DataFrame({
+            "consumo_promedio_kWh": np.full(n, parametros["consumo_promedio_kWh"]),
+            "tarifa_mas_impuestos": np.full(n, parametros["tarifa_mas_impuestos"]),
+        })
+        resultado = evaluar_bloque(bloque, pvout[validos].astype(float), ghi[validos].astype(float), parametros)
+        for nombre, capa in capas.items():
+            capa[validos] = resultado[nombre].to_numpy()
+    return ventana, capas
+
+
+def _evaluar_tesela_args(args):
+    return evaluar_tesela(*args)
+
+
+##########
+# Escritura de los COG
+
+def _perfil_salida(perfil):
+    return dict(perfil, driver='GTiff', count=1, dtype='float32', nodata=np.nan, tiled=True,
+                blockxsize=TAMANO_TESELA, blockysize=TAMANO_TESELA, compress='deflate', predictor=3)
+
+
+def _convertir_cog(ruta_tmp, ruta):
+    # Overviews promediadas y copia a COG (o a un GeoTIFF con bloques y overviews si la versión
+    # de GDAL no trae el driver COG)
+    import rasterio
+    from rasterio.enums import Resampling
+    from rasterio.shutil import copy
+
+    with rasterio.open(ruta_tmp, 'r+') as dst:
+        niveles = [n for n in NIVELES_OVERVIEW if max(dst.shape) // n >= TAMANO_TESELA // 2] or [2]
+        dst.build_overviews(niveles, Resampling.average)
+        dst.update_tags(ns='rio_overview', resampling='average')
+    with rasterio.Env() as entorno:
+        if 'COG' in entorno.drivers():
+            copy(ruta_tmp, ruta, driver='COG', compress='deflate', predictor=3,
+                 blocksize=TAMANO_TESELA, overview_resampling='average')
+        else:
+            copy(ruta_tmp, ruta, driver='GTiff', copy_src_overviews=True, tiled=True,
+                 blockxsize=TAMANO_TESELA, blockysize=TAMANO_TESELA, compress='deflate')
+    os.remove(ruta_tmp)
+
+
+def generar_mapa_nacional(destino, parametros, procesos=1, tamano_tesela=TAMANO_TESELA,
+                          ruta_rasters=None, ruta_ghi=None):
+    # Escribe un COG por capa en la carpeta destino y devuelve la cantidad de celdas evaluadas
+    import rasterio
+    from rasters_fv import RUTA_PVOUT, RUTA_GHI, verificar_ruta_ghi
+
+    ruta_rasters = ruta_rasters or RUTA_PVOUT
+    ruta_ghi = verificar_ruta_ghi(ruta_ghi or RUTA_GHI)
+    archivos_raster = sorted(glob.glob(os.path.join(ruta_rasters, '*.tif')))
+    if not archivos_raster:
+        raise FileNotFoundError("No se encontraron archivos raster para cargar.")
+    with rasterio.open(archivos_raster[0]) as src:
+        perfil = _perfil_salida(src.profile)
+        alto, ancho = src.shape
+
+    os.makedirs(destino, exist_ok=True)
+    rutas = {nombre: os.path.join(destino, archivo) for nombre, (archivo, _) in CAPAS.items()}
+    etiquetas = {clave: str(valor) for clave, valor in parametros.items()}
+    tareas = ((ventana, ruta_rasters, ruta_ghi, parametros) for ventana in teselas(alto, ancho, tamano_tesela))
+
+    salidas = {nombre: rasterio.open(ruta + '.tmp', 'w', **perfil) for nombre, ruta in rutas.items()}
+    celdas = 0
+    try:
+        # Cada tesela se escribe apenas termina (en el orden de la grilla)
+        def escribir(resultados):
+            nonlocal celdas
+            for (fila, col, alto_v, ancho_v), capas in resultados:
+                for nombre, capa in capas.items():
+                    salidas[nombre].write(capa, 1, window=((fila, fila + alto_v), (col, col + ancho_v)))
+                celdas += int(np.isfinite(capas["tamano_sistema_kWp"]).sum())
+
+        if procesos > 1:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                escribir(pool.map(_evaluar_tesela_args, tareas))
+        else:
+            escribir(map(_evaluar_tesela_args, tareas))
+
+        for nombre, dst in salidas.items():
+            dst.update_tags(capa=nombre, leyenda=CAPAS[nombre][1], **etiquetas)
+    finally:
+        for dst in salidas.values():
+            dst.close()
+
+    for nombre, ruta in rutas.items():
+        _convertir_cog(ruta + '.tmp', ruta)
+    return celdas
+
+
+def capas_disponibles(ruta=RUTA_MAPA_NACIONAL):
+    # {leyenda: ruta} de los COG ya generados, con el consumo y la tarifa con que se calcularon
+    existentes = [(nombre, os.path.join(ruta, archivo)) for nombre, (archivo, _) in CAPAS.items()
+                  if os.path.exists(os.path.join(ruta, archivo))]
+    if not existentes:
+        return {}
+
+    import rasterio
+
+    capas = {}
+    for nombre, ruta_capa in existentes:
+        with rasterio.open(ruta_capa) as src:
+            etiquetas = src.tags()
+        leyenda = CAPAS[nombre][1]
+        if "consumo_promedio_kWh" in etiquetas and "tarifa_mas_impuestos" in etiquetas:
+            leyenda += (f" · {float(etiquetas['consumo_promedio_kWh']):g} kWh/mes,"
+                        f" {float(etiquetas['tarifa_mas_impuestos']):g} $/kWh")
+        capas[leyenda] = ruta_capa
+    return capas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mapas nacionales de tamaño, VAN y payback por pixel.")
+    parser.add_argument("--destino", default=RUTA_MAPA_NACIONAL, help="Carpeta de salida de los COG")
+    parser.add_argument("--consumo", type=float, default=150, help="Consumo promedio mensual (kWh)")
+    parser.add_argument("--tarifa", type=float, default=0.117, help="Tarifa con impuestos ($/kWh)")
+    parser.add_argument("--cobertura", type=float, default=75, help="Objetivo de cobertura (%%)")
+    parser.add_argument("--perdidas", type=float, default=20, help="Factor de pérdidas (%%)")
+    parser.add_argument("--costo-wp", type=float, default=1.2, help="Costo por Wp")
+    parser.add_argument("--mantenimiento", type=float, default=20, help="Mantenimiento anual ($)")
+    parser.add_argument("--tasa", type=float, default=0.08, help="Tasa de descuento")
+    parser.add_argument("--anios", type=int, default=20, help="Horizonte financiero (años)")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos en paralelo (0 = todos los núcleos)")
+    parser.add_argument("--tamano-tesela", type=int, default=TAMANO_TESELA, help="Lado de las teselas (pixeles)")
+    parser.add_argument("--rasters", default=None, help="Carpeta con los PVOUT mensuales")
+    parser.add_argument("--ghi", default=None, help="Raster GHI")
+    args = parser.parse_args(argv)
+
+    parametros = {
+        "consumo_promedio_kWh": args.consumo,
+        "tarifa_mas_impuestos": args.tarifa,
+        "objetivo_cobertura": args.cobertura / 100,
+        "factor_perdidas": (100 - args.perdidas) / 100,
+        "costo_Wp": args.costo_wp,
+        "mantenimiento_anual": args.mantenimiento,
+        "tasa_descuento": args.tasa,
+        "años_proyecto": args.anios,
+    }
+    procesos = args.procesos or os.cpu_count()
+
+    inicio = time.perf_counter()
+    celdas = generar_mapa_nacional(args.destino, parametros, procesos, args.tamano_tesela, args.rasters, args.ghi)
+    duracion = time.perf_counter() - inicio
+    print(f"✅ {celdas:,} celdas evaluadas en {duracion:.1f} s ({celdas / max(duracion, 1e-9):,.0f} celdas/s) -> {args.destino}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
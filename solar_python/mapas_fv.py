@@ -0,0 +1,117 @@
+# Mapas folium del panel
+# El mapa base (teselas, captura de clics y capa raster opcional: PVOUT anual
+# o un mapa nacional de mapa_nacional_fv) no depende de la coordenada
+# ni de los resultados: se arma y se renderiza una sola vez. En cada rerun solo cambia el grupo
+# de marcadores (posición y popup), que st_folium agrega con feature_group_to_add sin volver a
+# montar el mapa. folium se importa dentro de las funciones, como en analisis_fv.
+import numpy as np
+
+
+CENTRO_ECUADOR = (-1.5, -78.5)
+MAX_PIXELES_CAPA = 1024     # lado máximo de la imagen de PVOUT que se envía al navegador
+
+# Escala de color (amarillo -> rojo) para el PVOUT anual, de menor a mayor
+COLORES_PVOUT = np.array([
+    [255, 255, 178],
+    [254, 204, 92],
+    [253, 141, 60],
+    [240, 59, 32],
+    [189, 0, 38],
+], dtype=float)
+
+
+##########
+# Capas raster (PVOUT anual o mapas nacionales)
+
+def _tabla_colores(colores=COLORES_PVOUT, niveles=256):
+    # Interpolación lineal de la escala a una tabla (niveles, 3) en uint8
+    paradas = np.linspace(0, 1, len(colores))
+    t = np.linspace(0, 1, niveles)
+    return np.stack([np.interp(t, paradas, colores[:, c]) for c in range(3)], axis=1).astype(np.uint8)
+
+
+def _imagen_rgba(valores, opacidad):
+    # Valores (alto, ancho) con NaN sin datos -> imagen RGBA con la escala entre los percentiles 2 y 98
+    validos = np.isfinite(valores)
+    if validos.any():
+        vmin, vmax = np.percentile(valores[validos], [2, 98])
+    else:
+        vmin, vmax = 0.0, 1.0
+    escala = np.clip((valores - vmin) / max(vmax - vmin, 1e-9), 0, 1)
+    indice = np.where(validos, np.round(escala * 255), 0).astype(np.uint8)
+
+    imagen = np.zeros(valores.shape + (4,), dtype=np.uint8)
+    imagen[..., :3] = _tabla_colores()[indice]
+    imagen[..., 3] = np.where(validos, round(255 * opacidad), 0)
+    return imagen, (float(vmin), float(vmax))
+
+
+def imagen_pvout(cubo, max_pixeles=MAX_PIXELES_CAPA, opacidad=0.6):
+    # PVOUT anual (suma de las 12 bandas) como imagen RGBA (alto, ancho, 4) submuestreada a
+    # max_pixeles de lado, con transparencia donde no hay datos. Devuelve la imagen, los
+    # límites [[lat_sur, lon_oeste], [lat_norte, lon_este]] y el rango de la escala (kWh/kWp).
+    paso = max(1, -(-max(cubo.alto, cubo.ancho) // max_pixeles))
+    anual = cubo.datos[:, ::paso, ::paso].sum(axis=0)      # NaN si falta algún mes
+    imagen, rango = _imagen_rgba(anual, opacidad)
+
+    t = cubo.transform
+    limites = [[t.f + t.e * cubo.alto, t.c], [t.f, t.c + t.a * cubo.ancho]]
+    return imagen, limites, rango
+
+
+def imagen_raster(ruta, max_pixeles=MAX_PIXELES_CAPA, opacidad=0.6):
+    # Igual que imagen_pvout para un GeoTIFF de una banda (p. ej. los COG de mapa_nacional_fv);
+    # la lectura submuestreada usa las overviews del archivo en lugar de la resolución completa
+    import rasterio
+
+    with rasterio.open(ruta) as src:
+        paso = max(1, -(-max(src.height, src.width) // max_pixeles))
+        valores = src.read(1, out_shape=(-(-src.height // paso), -(-src.width // paso)), masked=True)
+        valores = valores.astype(np.float32).filled(np.nan)
+        izquierda, abajo, derecha, arriba = src.bounds
+    imagen, rango = _imagen_rgba(valores, opacidad)
+    return imagen, [[abajo, izquierda], [arriba, derecha]], rango
+
+
+def agregar_capa(mapa, capa, leyenda='PVOUT anual (kWh/kWp)'):
+    # capa: resultado de imagen_pvout o imagen_raster. La imagen se codifica en PNG una sola
+    # vez, al armar el mapa base
+    import folium
+    from branca.colormap import LinearColormap
+
+    imagen, limites, (vmin, vmax) = capa
+    folium.raster_layers.ImageOverlay(image=imagen, bounds=limites, origin='upper',
+                                      name=leyenda, interactive=False).add_to(mapa)
+    LinearColormap([tuple(int(v) for v in c) for c in COLORES_PVOUT], vmin=vmin, vmax=vmax,
+                   caption=leyenda).add_to(mapa)
+    return mapa
+
+
+##########
+# Mapas base y marcadores
+
+def mapa_base(zoom=7, capturar_clics=False, capa=None, leyenda='PVOUT anual (kWh/kWp)'):
+    # Mapa sin marcadores, ya renderizado; st_folium lo centra en cada rerun con center/zoom
+    import folium
+
+    mapa = folium.Map(location=list(CENTRO_ECUADOR), tiles='OpenStreetMap', zoom_start=zoom)
+    if capa is not None:
+        agregar_capa(mapa, capa, leyenda)
+    if capturar_clics:
+        mapa.add_child(folium.LatLngPopup())
+    mapa.get_root().render()
+    return mapa
+
+
+def marcador(lat, lon, popup_html=None, tooltip=None):
+    # Grupo con el único marcador que cambia entre reruns
+    import folium
+
+    grupo = folium.FeatureGroup(name='Ubicación')
+    folium.Marker(
+        location=[lat, lon],
+        popup=folium.Popup(popup_html, max_width=1000) if popup_html else None,
+        tooltip=tooltip,
+        icon=folium.Icon(color="blue")
+    ).add_to(grupo)
+    return grupo
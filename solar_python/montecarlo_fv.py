@@ -0,0 +1,151 @@
+# Análisis de incertidumbre por Monte Carlo del flujo de caja (VAN, TIR y payback)
+# Se sortean el incremento de la tarifa, la degradación, las pérdidas, el mantenimiento y la
+# variabilidad interanual de la irradiación. Los sorteos se evalúan por bloques como arreglos
+# (S, años) con proyectar_escenarios e indicadores_lote, y cada bloque solo se acumula en
+# histogramas de tamaño fijo: la memoria no depende de la cantidad de sorteos.
+# P50 es la mediana y P90 el valor superado con 90% de probabilidad (percentil 10).
+import numpy as np
+
+from finanzas_fv import indicadores_lote
+from motor_fv import INCREMENTO_TARIFA, DEGRADACION_ANUAL, proyectar_escenarios
+
+
+SORTEOS = 100_000
+TAMANO_BLOQUE = 20_000      # sorteos evaluados a la vez
+BINS = 4096                 # resolución de los histogramas de percentiles
+
+# Incertidumbre por defecto: desviación estándar de cada parámetro
+# (mantenimiento y pérdidas relativas a su valor base)
+INCERTIDUMBRE = {
+    "incremento_tarifa": 0.01,      # puntos de tasa anual alrededor de INCREMENTO_TARIFA
+    "degradacion": 0.002,           # alrededor de DEGRADACION_ANUAL
+    "factor_perdidas": 0.03,        # fracción del factor de pérdidas base
+    "mantenimiento": 0.25,          # fracción del mantenimiento base
+    "irradiacion_anual": 0.05,      # variación de un año a otro de la producción
+}
+PERCENTILES = {"P90": 10, "P50": 50, "P10": 90}
+
+
+class HistogramaStreaming:
+    # Histograma de rango fijo (tomado del primer bloque con margen) para estimar percentiles
+    # sin guardar las muestras; los valores fuera de rango caen en los bins extremos
+
+    def __init__(self, bins=BINS, margen=1.0):
+        self.bins = bins
+        self.margen = margen
+        self.bordes = None
+        self.conteos = np.zeros(bins, dtype=np.int64)
+        self.n = 0
+        self.suma = 0.0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+
+    def agregar(self, valores):
+        valores = np.asarray(valores, dtype=float)
+        valores = valores[np.isfinite(valores)]
+        if not valores.size:
+            return
+        if self.bordes is None:
+            bajo, alto = valores.min(), valores.max()
+            ancho = max(alto - bajo, 1e-9 * max(abs(bajo), 1.0))
+            self.bordes = np.linspace(bajo - self.margen * ancho, alto + self.margen * ancho, self.bins + 1)
+        indice = np.searchsorted(self.bordes, valores, side='right') - 1
+        self.conteos += np.bincount(np.clip(indice, 0, self.bins - 1), minlength=self.bins)
+        self.n += valores.size
+        self.suma += valores.sum()
+        self.minimo = min(self.minimo, valores.min())
+        self.maximo = max(self.maximo, valores.max())
+
+    def percentil(self, q):
+        # Interpolación lineal dentro del bin que contiene el percentil q (0-100)
+        if not self.n:
+            return np.nan
+        acumulado = np.cumsum(self.conteos)
+        objetivo = q / 100 * self.n
+        i = min(int(np.searchsorted(acumulado, objetivo, side='left')), self.bins - 1)
+        previo = acumulado[i - 1] if i else 0
+        fraccion = (objetivo - previo) / self.conteos[i] if self.conteos[i] else 0.0
+        valor = self.bordes[i] + fraccion * (self.bordes[i + 1] - self.bordes[i])
+        return float(np.clip(valor, self.minimo, self.maximo))
+
+    def resumen(self):
+        resumen = {nombre: self.percentil(q) for nombre, q in PERCENTILES.items()}
+        resumen.update({"media": float(self.suma / self.n) if self.n else np.nan,
+                        "minimo": float(self.minimo), "maximo": float(self.maximo), "n": self.n})
+        return resumen
+
+    def agrupado(self, bins=60):
+        # Histograma reducido (centros, conteos) para graficar
+        if self.bordes is None:
+            return np.array([]), np.array([])
+        desde = max(int(np.searchsorted(self.bordes, self.minimo, side='right')) - 1, 0)
+        hasta = min(int(np.searchsorted(self.bordes, self.maximo, side='right')), self.bins)
+        conteos = self.conteos[desde:hasta]
+        paso = max(1, -(-conteos.size // bins))
+        inicios = np.arange(0, conteos.size, paso)
+        bordes = self.bordes[desde + np.append(inicios, conteos.size)]
+        return 0.5 * (bordes[:-1] + bordes[1:]), np.add.reduceat(conteos, inicios)
+
+
+def sortear_parametros(rng, n, años, factor_perdidas, mantenimiento_anual, incertidumbre=INCERTIDUMBRE):
+    # Parámetros de n escenarios; la irradiación es un multiplicador por año (n, años)
+    return {
+        "incremento_tarifa": rng.normal(INCREMENTO_TARIFA, incertidumbre["incremento_tarifa"], n),
+        "degradacion": np.clip(rng.normal(DEGRADACION_ANUAL, incertidumbre["degradacion"], n), 0, None),
+        "factor_perdidas": np.clip(factor_perdidas * rng.normal(1, incertidumbre["factor_perdidas"], n), 0, 1),
+        "mantenimiento": np.clip(mantenimiento_anual * rng.normal(1, incertidumbre["mantenimiento"], n), 0, None),
+        "irradiacion": np.clip(rng.normal(1, incertidumbre["irradiacion_anual"], (n, años)), 0, None),
+    }
+
+
+def flujos_sorteados(parametros, tamano_sistema_kWp, produccion_kWp_anio, tarifa, costo_Wp, años,
+                     factor_perdidas):
+    # Flujos (n, años + 1). produccion_kWp_anio corresponde al factor_perdidas base y se escala
+    # con el factor sorteado; la irradiación multiplica la parte de energía de cada año
+    produccion = produccion_kWp_anio * parametros["factor_perdidas"] / factor_perdidas
+    flujos = proyectar_escenarios(
+        tamano_sistema_kWp, produccion, tarifa, costo_Wp, 0.0, años,
+        incremento_tarifa=parametros["incremento_tarifa"], degradacion=parametros["degradacion"]
+    )["flujos"]
+    flujos[:, 1:] *= parametros["irradiacion"]
+    flujos[:, 1:] -= parametros["mantenimiento"][:, None]
+    return flujos
+
+
+def simular_montecarlo(tamano_sistema_kWp, produccion_kWp_anio, tarifa, costo_Wp, mantenimiento_anual,
+                       años_proyecto, tasa_descuento, factor_perdidas, sorteos=SORTEOS,
+                       tamano_bloque=TAMANO_BLOQUE, semilla=0, incertidumbre=INCERTIDUMBRE):
+    # Un sitio: sorteos del flujo de caja evaluados por bloques con un generador sembrado
+    # (el resultado depende de semilla y tamano_bloque). Devuelve percentiles y media de VAN,
+    # TIR y payback, la probabilidad de VAN negativo y los histogramas de VAN y TIR.
+    rng = np.random.default_rng(semilla)
+    años = int(años_proyecto)
+    histogramas = {"van": HistogramaStreaming(), "tir": HistogramaStreaming(), "payback": HistogramaStreaming()}
+    van_negativo = 0
+    sin_tir = 0
+    sin_payback = 0
+
+    for inicio in range(0, sorteos, tamano_bloque):
+        n = min(tamano_bloque, sorteos - inicio)
+        parametros = sortear_parametros(rng, n, años, factor_perdidas, mantenimiento_anual, incertidumbre)
+        flujos = flujos_sorteados(parametros, tamano_sistema_kWp, produccion_kWp_anio, tarifa, costo_Wp,
+                                  años, factor_perdidas)
+        indicadores = indicadores_lote(flujos, tasa_descuento)
+
+        for nombre, histograma in histogramas.items():
+            histograma.agregar(indicadores[nombre])
+        van_negativo += int((indicadores["van"] < 0).sum())
+        sin_tir += int(np.isnan(indicadores["tir"]).sum())
+        sin_payback += int(np.isnan(indicadores["payback"]).sum())
+
+    return {
+        "sorteos": sorteos,
+        "van": histogramas["van"].resumen(),
+        "tir": histogramas["tir"].resumen(),
+        "payback": histogramas["payback"].resumen(),
+        "prob_van_negativo": van_negativo / sorteos,
+        "fraccion_sin_tir": sin_tir / sorteos,
+        "fraccion_sin_payback": sin_payback / sorteos,
+        "histograma_van": histogramas["van"].agrupado(),
+        "histograma_tir": histogramas["tir"].agrupado(),
+    }
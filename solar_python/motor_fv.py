@@ -0,0 +1,272 @@
+# Motor de cálculo del sistema fotovoltaico (sin Streamlit ni librerías gráficas)
+# Dimensionamiento, proyección de flujo de caja, indicadores financieros y cobertura.
+import numpy as np
+import pandas as pd
+
+from finanzas_fv import indicadores_lote, payback_lote
+from tarifas_fv import liquidar_esquemas, ahorro_por_esquema
+
+
+# Parámetros por defecto de la proyección
+INCREMENTO_TARIFA = 0.02    # incremento anual de la tarifa eléctrica
+DEGRADACION_ANUAL = 0.005   # pérdida anual de rendimiento de los paneles
+DIAS_POR_MES = 30
+
+# Diccionario de meses en español (completos)
+MESES_ES = {
+    1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril',
+    5: 'Mayo', 6: 'Junio', 7: 'Julio', 8: 'Agosto',
+    9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
+}
+
+
+##########
+# Datos de consumo
+
+def preparar_consumo(df):
+    # Limpia el DataFrame de facturas (columnas Fecha, Consumo subtotal, Monto, Total_pagar),
+    # agrega Año, Mes_num y Mes, y lo ordena cronológicamente
+    df['Fecha'] = pd.to_datetime(df['Fecha'], format='mixed')
+
+    # Limpieza de caracteres y redondeo a 2 decimales (las columnas ya numéricas, por ejemplo
+    # las que entrega ingesta_fv, no pasan por la expresión regular)
+    for col in ["Monto", "Total_pagar"]:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].replace(r'[\$,]', '', regex=True)
+        df[col] = df[col].astype(float).round(2)
+
+    df['Año'] = df['Fecha'].dt.year
+    df['Mes_num'] = df['Fecha'].dt.month
+    df['Mes'] = df['Mes_num'].map(MESES_ES)
+
+    return df.sort_values(by=['Año', 'Mes_num'])
+
+
+def tarifas_consumo(df):
+    # Consumo promedio mensual y tarifas promedio ($/kWh) sin y con impuestos
+    consumo_promedio_kWh = df["Consumo subtotal"].mean()
+    tarifa_promedio_usd_kWh = df["Monto"].mean() / consumo_promedio_kWh
+    tarifa_mas_impuestos = df["Total_pagar"].mean() / consumo_promedio_kWh
+    return consumo_promedio_kWh, tarifa_promedio_usd_kWh, tarifa_mas_impuestos
+
+
+def consumo_por_mes(df):
+    # Consumo promedio de cada mes calendario (12 valores); los meses sin datos usan el promedio general
+    consumo = df.groupby('Mes_num')["Consumo subtotal"].mean().reindex(range(1, 13))
+    return consumo.fillna(df["Consumo subtotal"].mean()).to_numpy(dtype=float)
+
+
+##########
+# Dimensionamiento
+
+def dimensionar_sistema(consumo_promedio_kWh, valores_mensuales, factor_perdidas, objetivo_cobertura):
+    # valores_mensuales: PVOUT mensual del sitio (kWh/kWp), factor_perdidas: eficiencia (0-1).
+    # También acepta N sitios: valores_mensuales (N, 12) y consumo/cobertura escalares o (N,).
+    valores_mensuales = np.asarray(valores_mensuales, dtype=float)
+    promedio_anual = valores_mensuales.mean(axis=-1)
+
+    # Producción mensual esperada por cada kWp instalado
+    produccion_por_kWp = promedio_anual * factor_perdidas
+
+    # Tamaño del sistema para el 100% y para el porcentaje deseado
+    tamano_sistema_kWp_completo = consumo_promedio_kWh / produccion_por_kWp
+    tamano_sistema_kWp = tamano_sistema_kWp_completo * objetivo_cobertura
+
+    return {
+        "promedio_anual": promedio_anual,
+        "factores_relativos": valores_mensuales / promedio_anual[..., None],
+        "produccion_por_kWp": produccion_por_kWp,
+        "tamano_sistema_kWp_completo": tamano_sistema_kWp_completo,
+        "tamano_sistema_kWp": tamano_sistema_kWp,
+        "produccion_mensual_prom": tamano_sistema_kWp * promedio_anual,
+    }
+
+
+def inversion_inicial(tamano_sistema_kWp, costo_Wp):
+    return tamano_sistema_kWp * 1000 * costo_Wp
+
+
+##########
+# Proyección a largo plazo
+
+def produccion_anual_por_kWp(radiacion_diaria, factores_relativos, factor_perdidas):
+    # Producción del primer año por kWp instalado (kWh/kWp), repartida según los factores mensuales
+    produccion_prom_kWp_mes = np.asarray(radiacion_diaria, dtype=float) * DIAS_POR_MES * factor_perdidas
+    return produccion_prom_kWp_mes * np.sum(factores_relativos, axis=-1)
+
+
+def generacion_mensual_por_kWp(radiacion_diaria, factores_relativos):
+    # Generación de cada mes por kWp antes de pérdidas (..., 12) con la misma base de radiación que
+    # produccion_anual_por_kWp: es la entrada de la simulación horaria que acompaña al flujo de caja
+    return (np.asarray(radiacion_diaria, dtype=float)[..., None] * DIAS_POR_MES
+            * np.asarray(factores_relativos, dtype=float))
+
+
+def proyectar_escenarios(tamano_sistema_kWp, produccion_kWp_anio, tarifa_inicial, costo_Wp,
+                         mantenimiento_anual, años_proyecto, tasa_descuento=None,
+                         incremento_tarifa=INCREMENTO_TARIFA, degradacion=DEGRADACION_ANUAL):
+    # Flujo de caja de S escenarios en una sola pasada. Todos los parámetros pueden ser
+    # escalares o arreglos de forma (S,); se combinan por broadcasting.
+    # Devuelve "flujos" (S, años_max + 1) con la inversión en la columna 0 y ceros
+    # después del horizonte de cada escenario, y "van" (S,) si se pasa tasa_descuento.
+    tamano, produccion, tarifa, costo, mantenimiento, horizonte, incremento, deg = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(x, dtype=float)) for x in (
+            tamano_sistema_kWp, produccion_kWp_anio, tarifa_inicial, costo_Wp,
+            mantenimiento_anual, años_proyecto, incremento_tarifa, degradacion)]
+    )
+    años_max = int(horizonte.max()) if horizonte.size else 0
+    t = np.arange(años_max, dtype=float)  # exponente (anio - 1)
+
+    # Matriz degradación x escalamiento de tarifa (S, años_max)
+    factor_anual = np.power((1 - deg)[:, None], t) * np.power((1 + incremento)[:, None], t)
+
+    flujos = np.empty((tamano.size, años_max + 1))
+    flujos[:, 0] = -inversion_inicial(tamano, costo)
+    ahorros = flujos[:, 1:]
+    np.multiply((tamano * produccion * tarifa)[:, None], factor_anual, out=ahorros)
+    ahorros -= mantenimiento[:, None]
+    ahorros[t[None, :] >= horizonte[:, None]] = 0.0
+
+    resultado = {"flujos": flujos, "van": None}
+    if tasa_descuento is not None:
+        tasa = np.broadcast_to(np.atleast_1d(np.asarray(tasa_descuento, dtype=float)), tamano.shape)
+        descuento = np.power((1 + tasa)[:, None], -np.arange(años_max + 1, dtype=float))
+        resultado["van"] = np.einsum('ij,ij->i', flujos, descuento)
+    return resultado
+
+
+def tarifa_efectiva(tamano_sistema_kWp, produccion_kWp_anio, factores_relativos, consumo_mensual,
+                    tarifa, tarifa_excedente):
+    # Valor promedio ($/kWh) de la energía generada cuando el excedente mensual sobre el
+    # consumo se paga a tarifa_excedente en lugar de a la tarifa completa.
+    # tamano_sistema_kWp puede ser un arreglo (S,); devuelve (S,).
+    tamano = np.atleast_1d(np.asarray(tamano_sistema_kWp, dtype=float))
+    factores = np.asarray(factores_relativos, dtype=float)
+    generacion = tamano[:, None] * (produccion_kWp_anio / factores.sum()) * factores  # (S, 12)
+
+    autoconsumo = np.minimum(generacion, np.asarray(consumo_mensual, dtype=float)).sum(axis=1)
+    total = generacion.sum(axis=1)
+    excedente = total - autoconsumo
+    with np.errstate(divide='ignore', invalid='ignore'):
+        efectiva = (autoconsumo * tarifa + excedente * tarifa_excedente) / total
+    return np.where(total > 0, efectiva, tarifa)
+
+
+def proyectar_ahorros(tamano_sistema_kWp, radiacion_diaria, factores_relativos, factor_perdidas,
+                      tarifa_inicial, mantenimiento_anual, años_proyecto,
+                      incremento_tarifa=INCREMENTO_TARIFA, degradacion=DEGRADACION_ANUAL):
+    # Ahorro neto de cada año (producción valorada a la tarifa menos mantenimiento)
+    produccion_kWp_anio = produccion_anual_por_kWp(radiacion_diaria, factores_relativos, factor_perdidas)
+    flujos = proyectar_escenarios(
+        tamano_sistema_kWp, produccion_kWp_anio, tarifa_inicial, 0, mantenimiento_anual,
+        años_proyecto, incremento_tarifa=incremento_tarifa, degradacion=degradacion
+    )["flujos"]
+    return flujos[0, 1:].tolist()
+
+
+def proyectar_mensual(valores_mensuales, años_proyecto, tasa_anual):
+    # (..., 12) -> (..., años, 12) multiplicando cada año por (1 + tasa_anual) ** (anio - 1)
+    factor = (1 + tasa_anual) ** np.arange(años_proyecto, dtype=float)
+    return np.asarray(valores_mensuales, dtype=float)[..., None, :] * factor[:, None]
+
+
+def comparar_esquemas(tamano_sistema_kWp, produccion_kWp_anio, factores_relativos, consumo_mensual,
+                      tarifa, años_proyecto, tarifa_excedente=None, fraccion_autoconsumo=None,
+                      incremento_tarifa=INCREMENTO_TARIFA, degradacion=DEGRADACION_ANUAL):
+    # Factura mensual de todos los años bajo cada esquema de conexión (ver tarifas_fv).
+    # fraccion_autoconsumo (12,): parte de la generación de cada mes consumida en el momento,
+    # por ejemplo autoconsumo / generacion de horario_fv.balance_horario.
+    factores = np.asarray(factores_relativos, dtype=float)
+    generacion_mes = (np.asarray(tamano_sistema_kWp, dtype=float)[..., None] * produccion_kWp_anio
+                      / factores.sum(axis=-1, keepdims=True) * factores)
+    generacion = proyectar_mensual(generacion_mes, años_proyecto, -degradacion)
+    consumo = proyectar_mensual(consumo_mensual, años_proyecto, 0.0)
+    escalamiento = proyectar_mensual(np.ones(12), años_proyecto, incremento_tarifa)
+
+    autoconsumo = None if fraccion_autoconsumo is None else generacion * fraccion_autoconsumo
+    excedente = None if tarifa_excedente is None else tarifa_excedente * escalamiento
+    return liquidar_esquemas(generacion, consumo, tarifa * escalamiento, excedente, autoconsumo)
+
+
+def anio_payback(flujo_de_caja):
+    # Primer año en que el flujo acumulado deja de ser negativo (None si no se recupera)
+    anio = payback_lote(flujo_de_caja)[1][0]
+    return None if np.isnan(anio) else int(anio)
+
+
+def indicadores_financieros(flujo_de_caja, tasa_descuento):
+    # TIR, VAN y payback; None si el flujo contiene valores inválidos (NaN o Inf)
+    flujo = np.asarray(flujo_de_caja, dtype=float)
+    if not np.all(np.isfinite(flujo)):
+        return {"valido": False, "tir": None, "van": None, "payback_anio": None, "payback": None}
+
+    indicadores = indicadores_lote(flujo, tasa_descuento)
+    anio = indicadores["anio_payback"][0]
+    return {
+        "valido": True,
+        "tir": indicadores["tir"][0],
+        "van": indicadores["van"][0],
+        "payback_anio": None if np.isnan(anio) else int(anio),
+        "payback": indicadores["payback"][0],
+    }
+
+
+##########
+# Cobertura solar
+
+def calcular_cobertura(df, valores_mensuales, tamano_sistema_kWp):
+    # Agrega al DataFrame de consumo la generación estimada, la cobertura y el excedente de cada mes
+    generacion_por_mes = {i + 1: val for i, val in enumerate(valores_mensuales)}
+
+    df['Generacion estimada (kWh)'] = df['Mes_num'].map(generacion_por_mes) * tamano_sistema_kWp
+    df['Cobertura (%)'] = (df['Generacion estimada (kWh)'] / df['Consumo subtotal']) * 100
+    df['Excedente (kWh)'] = (df['Generacion estimada (kWh)'] - df['Consumo subtotal']).clip(lower=0)
+    return df
+
+
+##########
+# Evaluación completa de un proyecto
+
+def evaluar_proyecto(consumo_promedio_kWh, tarifa_mas_impuestos, valores_mensuales, radiacion_diaria,
+                     factor_perdidas, objetivo_cobertura, costo_Wp, mantenimiento_anual,
+                     años_proyecto, tasa_descuento, consumo_mensual=None, tarifa_excedente=None,
+                     esquema=None, fraccion_autoconsumo=None):
+    # Ejecuta la misma cadena que main(): dimensionamiento -> inversión -> proyección -> indicadores.
+    # Con consumo_mensual y tarifa_excedente el excedente se valora aparte (ver tarifa_efectiva).
+    # Con esquema (clave de tarifas_fv.ESQUEMAS) y consumo_mensual, el ahorro de cada año es la
+    # diferencia entre la factura sin sistema y la factura liquidada con ese esquema.
+    resultado = dimensionar_sistema(consumo_promedio_kWh, valores_mensuales, factor_perdidas, objetivo_cobertura)
+    tamano_sistema_kWp = resultado["tamano_sistema_kWp"]
+    factores_relativos = resultado["factores_relativos"]
+
+    tarifa = tarifa_mas_impuestos
+    if consumo_mensual is not None and tarifa_excedente is not None:
+        produccion_kWp_anio = produccion_anual_por_kWp(radiacion_diaria, factores_relativos, factor_perdidas)
+        tarifa = tarifa_efectiva(
+            tamano_sistema_kWp, produccion_kWp_anio, factores_relativos, consumo_mensual,
+            tarifa_mas_impuestos, tarifa_excedente
+        )[0]
+
+    inversion_usd = inversion_inicial(tamano_sistema_kWp, costo_Wp)
+    if esquema is not None and consumo_mensual is not None:
+        liquidacion = comparar_esquemas(
+            tamano_sistema_kWp, produccion_anual_por_kWp(radiacion_diaria, factores_relativos, factor_perdidas),
+            factores_relativos, consumo_mensual, tarifa_mas_impuestos, años_proyecto,
+            tarifa_excedente, fraccion_autoconsumo
+        )
+        ahorros = (ahorro_por_esquema(liquidacion)[esquema] - mantenimiento_anual).tolist()
+        resultado["liquidacion"] = liquidacion
+    else:
+        ahorros = proyectar_ahorros(
+            tamano_sistema_kWp, radiacion_diaria, factores_relativos, factor_perdidas,
+            tarifa, mantenimiento_anual, años_proyecto
+        )
+    flujo_de_caja = [-inversion_usd] + ahorros
+
+    resultado.update(indicadores_financieros(flujo_de_caja, tasa_descuento))
+    resultado.update({
+        "inversion_usd": inversion_usd,
+        "ahorros_anuales": ahorros,
+        "flujo_de_caja": flujo_de_caja,
+    })
+    return resultado
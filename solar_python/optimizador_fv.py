@@ -0,0 +1,82 @@
+# Optimizador del tamaño del sistema: barre la cobertura (y por lo tanto los kWp) en una
+# sola evaluación vectorizada y elige el tamaño con mayor VAN o menor payback
+import numpy as np
+import pandas as pd
+
+from finanzas_fv import indicadores_lote
+from motor_fv import (dimensionar_sistema, produccion_anual_por_kWp, proyectar_escenarios,
+                      tarifa_efectiva, inversion_inicial)
+
+
+M2_POR_KWP = 5.0    # área de techo aproximada por kWp instalado (paneles de ~400 Wp)
+COBERTURAS = np.round(np.arange(0.01, 1.51, 0.01), 2)   # 1% a 150% del consumo
+CRITERIOS = ("van", "payback")
+
+
+def optimizar_tamano(consumo_promedio_kWh, consumo_mensual, valores_mensuales, radiacion_diaria,
+                     factor_perdidas, tarifa, costo_Wp, mantenimiento_anual, años_proyecto, tasa_descuento,
+                     tarifa_excedente=None, criterio="van", area_max_m2=None, presupuesto_max=None,
+                     coberturas=COBERTURAS, m2_por_kWp=M2_POR_KWP):
+    # consumo_mensual: 12 valores de consumo (kWh) por mes calendario.
+    # Devuelve el mejor punto y la curva completa VAN/TIR/payback vs tamaño.
+    if criterio not in CRITERIOS:
+        raise ValueError(f"Criterio desconocido: {criterio}. Opciones: {CRITERIOS}")
+
+    consumo_mensual = np.asarray(consumo_mensual, dtype=float)
+    coberturas = np.asarray(coberturas, dtype=float)
+
+    base = dimensionar_sistema(consumo_promedio_kWh, valores_mensuales, factor_perdidas, 1.0)
+    factores_relativos = base["factores_relativos"]
+    tamanos = base["tamano_sistema_kWp_completo"] * coberturas
+
+    # Tarifa con la que se valora cada kWh generado en cada tamaño
+    produccion_kWp_anio = produccion_anual_por_kWp(radiacion_diaria, factores_relativos, factor_perdidas)
+    if tarifa_excedente is None:
+        tarifas = np.full(tamanos.shape, float(tarifa))
+    else:
+        tarifas = tarifa_efectiva(tamanos, produccion_kWp_anio, factores_relativos,
+                                  consumo_mensual, tarifa, tarifa_excedente)
+
+    flujos = proyectar_escenarios(tamanos, produccion_kWp_anio, tarifas, costo_Wp,
+                                  mantenimiento_anual, años_proyecto)["flujos"]
+    indicadores = indicadores_lote(flujos, tasa_descuento)
+
+    # Restricciones de techo y presupuesto
+    inversiones = inversion_inicial(tamanos, costo_Wp)
+    factible = np.ones(tamanos.shape, dtype=bool)
+    if area_max_m2:
+        factible &= tamanos * m2_por_kWp <= area_max_m2
+    if presupuesto_max:
+        factible &= inversiones <= presupuesto_max
+
+    curva = pd.DataFrame({
+        "Cobertura": coberturas,
+        "Tamaño (kWp)": tamanos,
+        "Área (m²)": tamanos * m2_por_kWp,
+        "Inversión (USD)": inversiones,
+        "VAN": indicadores["van"],
+        "TIR": indicadores["tir"],
+        "Payback": indicadores["payback"],
+        "Factible": factible,
+    })
+
+    if not factible.any():
+        return {"encontrado": False, "curva": curva}
+
+    if criterio == "van":
+        puntaje = np.where(factible, indicadores["van"], -np.inf)
+        mejor = int(np.argmax(puntaje))
+    else:
+        payback = np.where(np.isnan(indicadores["payback"]), np.inf, indicadores["payback"])
+        puntaje = np.where(factible, payback, np.inf)
+        mejor = int(np.argmin(puntaje))
+
+    return {
+        "encontrado": True,
+        "cobertura": coberturas[mejor],
+        "tamano_sistema_kWp": tamanos[mejor],
+        "van": indicadores["van"][mejor],
+        "tir": indicadores["tir"][mejor],
+        "payback": indicadores["payback"][mejor],
+        "curva": curva,
+    }
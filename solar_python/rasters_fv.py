@@ -0,0 +1,293 @@
+# Acceso a los rasters de radiación (PVOUT mensual y GHI)
+import glob
+import os
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+
+from cache_fv import CacheLRU
+
+
+# Rutas por defecto (relativas a la raíz del repositorio, igual que en analisis_fv.py)
+RUTA_PVOUT = 'solar_python/monthly_pvout'
+RUTA_GHI = 'solar_python/ghi/GHI.tif'
+MAX_BYTES_BLOQUES = 256 * 2**20     # memoria de la caché de bloques decodificados
+MAX_DISTANCIA_PIXELES = 10          # radio de búsqueda del pixel válido más cercano (~9 km a 30")
+GHI_MAXIMO_DIARIO = 12.0            # kWh/m²/día; un valor mayor indica otro raster (por ejemplo un PVOUT mensual)
+KM_POR_GRADO = 111.32
+
+
+@dataclass(frozen=True)
+class CuboRaster:
+    # datos: arreglo (bandas, alto, ancho) en float32, con NaN donde no hay datos
+    datos: np.ndarray
+    transform: object
+    crs: object = None
+
+    @property
+    def bandas(self):
+        return self.datos.shape[0]
+
+    @property
+    def alto(self):
+        return self.datos.shape[1]
+
+    @property
+    def ancho(self):
+        return self.datos.shape[2]
+
+    @cached_property
+    def indice_validos(self):
+        # KD-tree de los centros (fila, columna) de las celdas con datos en todas las bandas,
+        # construido la primera vez que se necesita y reutilizado en cada consulta del cubo
+        from scipy.spatial import cKDTree
+
+        celdas = np.argwhere(np.all(np.isfinite(self.datos), axis=0))
+        return cKDTree(celdas + 0.5), celdas
+
+
+def _leer_banda(src, ventana=None):
+    # Lee la primera banda (o una ventana de ella) y reemplaza el valor nodata por NaN
+    banda = src.read(1, window=ventana).astype(np.float32, copy=False)
+    if src.nodata is not None:
+        banda[banda == np.float32(src.nodata)] = np.nan
+    return banda
+
+
+def cargar_cubo(rutas):
+    # Abre cada raster una sola vez y los apila en un único cubo (bandas, alto, ancho)
+    if not rutas:
+        raise FileNotFoundError("No se encontraron archivos raster para cargar.")
+
+    import rasterio  # solo se necesita al construir el cubo
+
+    bandas = []
+    transform = None
+    crs = None
+    forma = None
+    for ruta in rutas:
+        with rasterio.open(ruta) as src:
+            if transform is None:
+                transform, crs, forma = src.transform, src.crs, src.shape
+            elif src.transform != transform or src.shape != forma:
+                raise ValueError(f"El raster {ruta} no comparte la grilla de {rutas[0]}.")
+            bandas.append(_leer_banda(src))
+
+    return CuboRaster(datos=np.stack(bandas), transform=transform, crs=crs)
+
+
+def cargar_cubo_pvout(ruta_rasters=RUTA_PVOUT):
+    # Los 12 GeoTIFF mensuales ordenados por nombre (PVOUT_01 ... PVOUT_12)
+    archivos_raster = sorted(glob.glob(os.path.join(ruta_rasters, '*.tif')))
+    return cargar_cubo(archivos_raster)
+
+
+def verificar_ruta_ghi(ruta_ghi=RUTA_GHI):
+    # El GHI no viene con el repositorio: sin él no se puede calcular la producción
+    if not os.path.isfile(ruta_ghi):
+        raise FileNotFoundError(
+            f"No se encontró el raster GHI en {ruta_ghi}. Descarga el GHI promedio diario (kWh/m²/día, "
+            f"LTAy_AvgDailyTotals) del Global Solar Atlas y guárdalo en esa ruta."
+        )
+    return ruta_ghi
+
+
+def verificar_ghi(valores, ruta_ghi=RUTA_GHI):
+    # La radiación diaria se multiplica por 30 días: un raster mensual en su lugar infla la producción
+    maximo = np.nanmax(valores) if np.size(valores) and np.isfinite(valores).any() else 0.0
+    if maximo > GHI_MAXIMO_DIARIO:
+        raise ValueError(
+            f"El raster {ruta_ghi} no parece un GHI diario: tiene valores de hasta {maximo:.1f} y se esperan "
+            f"kWh/m²/día (menos de {GHI_MAXIMO_DIARIO:g})."
+        )
+    return valores
+
+
+def cargar_cubo_ghi(ruta_ghi=RUTA_GHI):
+    cubo = cargar_cubo([verificar_ruta_ghi(ruta_ghi)])
+    verificar_ghi(cubo.datos, ruta_ghi)
+    return cubo
+
+
+def coordenadas_pixel(transform, lat, lon):
+    # Posición continua (fila, columna) de (lon, lat) en la grilla; el pixel i cubre [i, i + 1)
+    inversa = ~transform
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    col = inversa.a * lon + inversa.b * lat + inversa.c
+    fila = inversa.d * lon + inversa.e * lat + inversa.f
+    return fila, col
+
+
+def filas_columnas(transform, lat, lon):
+    # Conversión vectorizada de coordenadas (lon, lat) a índices de pixel
+    fila, col = coordenadas_pixel(transform, lat, lon)
+    return np.floor(fila).astype(np.int64), np.floor(col).astype(np.int64)
+
+
+def _valores_pixeles(cubo, fila, col):
+    # (N, bandas) en los pixeles dados; NaN fuera del raster
+    dentro = (fila >= 0) & (fila < cubo.alto) & (col >= 0) & (col < cubo.ancho)
+    valores = np.full((fila.size, cubo.bandas), np.nan, dtype=np.float32)
+    valores[dentro] = cubo.datos[:, fila[dentro], col[dentro]].T
+    return valores
+
+
+def _interpolar_bilineal(cubo, fila, col):
+    # Interpolación entre los centros de los 4 pixeles vecinos; los vecinos sin datos o fuera del
+    # raster se descartan y los pesos se renormalizan, así que junto al borde de la máscara se
+    # usan solo los vecinos válidos
+    fila = fila - 0.5
+    col = col - 0.5
+    f0 = np.floor(fila).astype(np.int64)
+    c0 = np.floor(col).astype(np.int64)
+    df = (fila - f0)[:, None]
+    dc = (col - c0)[:, None]
+
+    suma = np.zeros((fila.size, cubo.bandas))
+    pesos = np.zeros((fila.size, cubo.bandas))
+    for desplazamiento_f, desplazamiento_c, peso in ((0, 0, (1 - df) * (1 - dc)), (0, 1, (1 - df) * dc),
+                                                     (1, 0, df * (1 - dc)), (1, 1, df * dc)):
+        valores = _valores_pixeles(cubo, f0 + desplazamiento_f, c0 + desplazamiento_c)
+        validos = np.isfinite(valores)
+        suma += np.where(validos, valores * peso, 0.0)
+        pesos += np.where(validos, peso, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(pesos > 0, suma / pesos, np.nan).astype(np.float32)
+
+
+def consultar_cubo(cubo, lat, lon, bilineal=False, max_distancia=0):
+    # Valores (N, bandas) en N puntos y desplazamiento (N,) en km hasta el pixel usado.
+    # bilineal: interpola entre los 4 pixeles vecinos en lugar de tomar el pixel que contiene al punto.
+    # max_distancia > 0: los puntos sin datos (fuera de la máscara o del raster) toman el pixel
+    # válido más cercano dentro de ese radio en pixeles, buscado en cubo.indice_validos.
+    # El desplazamiento es 0 en los puntos con datos propios y NaN donde no se encontró valor.
+    fila, col = coordenadas_pixel(cubo.transform, np.atleast_1d(lat), np.atleast_1d(lon))
+    if bilineal:
+        valores = _interpolar_bilineal(cubo, fila, col)
+    else:
+        valores = _valores_pixeles(cubo, np.floor(fila).astype(np.int64), np.floor(col).astype(np.int64))
+
+    desplazamiento = np.zeros(fila.size)
+    faltantes = np.flatnonzero(~np.all(np.isfinite(valores), axis=1))
+    if faltantes.size and max_distancia > 0:
+        arbol, celdas = cubo.indice_validos
+        if celdas.size:
+            distancia, vecino = arbol.query(np.stack([fila[faltantes], col[faltantes]], axis=1),
+                                            distance_upper_bound=max_distancia)
+            encontrados = np.isfinite(distancia)
+            puntos = faltantes[encontrados]
+            valores[puntos] = _valores_pixeles(cubo, celdas[vecino[encontrados], 0], celdas[vecino[encontrados], 1])
+            desplazamiento[puntos] = distancia[encontrados] * abs(cubo.transform.e) * KM_POR_GRADO
+            faltantes = faltantes[~encontrados]
+    desplazamiento[faltantes] = np.nan
+    return valores, desplazamiento
+
+
+def muestrear_cubo(cubo, lat, lon, bilineal=False, max_distancia=0):
+    # Valores de todas las bandas en los puntos dados, en una sola indexación.
+    # Para un punto escalar devuelve (bandas,), para N puntos devuelve (N, bandas).
+    # Los puntos fuera del raster devuelven NaN (salvo que los corrija max_distancia).
+    escalar = np.ndim(lat) == 0 and np.ndim(lon) == 0
+    valores = consultar_cubo(cubo, lat, lon, bilineal, max_distancia)[0]
+    return valores[0] if escalar else valores
+
+
+##########
+# Muestreo por lotes de sitios leyendo los GeoTIFF por bloques
+
+class CacheBloques:
+    # Bloques internos ya decodificados (float32, NaN sin datos), compartidos por los 12 PVOUT
+    # mensuales y el GHI, en una caché LRU acotada en bytes: consultas agrupadas (los clientes
+    # de una misma ciudad) descomprimen cada bloque una sola vez mientras siga en la caché
+
+    def __init__(self, max_bytes=MAX_BYTES_BLOQUES):
+        self._cache = CacheLRU(max_entradas=None, max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self.bloques_decodificados = 0
+        self.bytes_decodificados = 0
+
+    def bloque(self, src, bloque_fila, bloque_col):
+        # Devuelve el bloque (bloque_fila, bloque_col) de la banda 1 y su ventana
+        ventana = src.block_window(1, bloque_fila, bloque_col)
+
+        def decodificar():
+            bloque = _leer_banda(src, ventana)
+            with self._lock:
+                self.bloques_decodificados += 1
+                self.bytes_decodificados += bloque.nbytes
+            return bloque
+
+        return self._cache.obtener((os.path.abspath(src.name), bloque_fila, bloque_col), decodificar), ventana
+
+    def limpiar(self):
+        self._cache.limpiar()
+
+    def estadisticas(self):
+        estadisticas = self._cache.estadisticas()
+        estadisticas.update(bloques_decodificados=self.bloques_decodificados,
+                            bytes_decodificados=self.bytes_decodificados)
+        return estadisticas
+
+
+# Caché de bloques del proceso, usada por muestrear_sitios_archivos
+BLOQUES = CacheBloques()
+
+
+def _muestrear_por_bloques(src, fila, col, cache=BLOQUES):
+    # Agrupa los puntos por bloque interno del raster y toma cada bloque de la caché
+    # (que lo decodifica solo la primera vez), sin importar cuántos puntos caigan en él
+    valores = np.full(fila.size, np.nan, dtype=np.float32)
+    dentro = (fila >= 0) & (fila < src.height) & (col >= 0) & (col < src.width)
+    if not dentro.any():
+        return valores
+
+    alto_bloque, ancho_bloque = src.block_shapes[0]
+    idx = np.flatnonzero(dentro)
+    bloque_fila = fila[idx] // alto_bloque
+    bloque_col = col[idx] // ancho_bloque
+    claves, grupo = np.unique(np.stack([bloque_fila, bloque_col], axis=1), axis=0, return_inverse=True)
+    grupo = grupo.ravel()
+
+    for g, (bf, bc) in enumerate(claves):
+        bloque, ventana = cache.bloque(src, int(bf), int(bc))
+        puntos = idx[grupo == g]
+        valores[puntos] = bloque[fila[puntos] - ventana.row_off, col[puntos] - ventana.col_off]
+    return valores
+
+
+def muestrear_sitios_archivos(lat, lon, ruta_rasters=RUTA_PVOUT, ruta_ghi=RUTA_GHI, cache=BLOQUES):
+    # Igual que muestrear_sitios, pero leyendo directamente de los GeoTIFF por bloques
+    # (útil en procesos que no quieren cargar el cubo completo en memoria)
+    import rasterio
+
+    lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+    archivos_raster = sorted(glob.glob(os.path.join(ruta_rasters, '*.tif')))
+
+    pvout = np.empty((lat.size, len(archivos_raster)), dtype=np.float32)
+    for m, ruta in enumerate(archivos_raster):
+        with rasterio.open(ruta) as src:
+            fila, col = filas_columnas(src.transform, lat, lon)
+            pvout[:, m] = _muestrear_por_bloques(src, fila, col, cache)
+
+    with rasterio.open(verificar_ruta_ghi(ruta_ghi)) as src:
+        fila, col = filas_columnas(src.transform, lat, lon)
+        ghi = verificar_ghi(_muestrear_por_bloques(src, fila, col, cache), ruta_ghi)
+
+    return pvout, ghi
+
+
+def muestrear_sitios(lat, lon, cubo_pvout, cubo_ghi, bilineal=False, max_distancia=0):
+    # Muestreo de N sitios a partir de los cubos en memoria (modos como en consultar_cubo).
+    # Devuelve una matriz (N, 12) de PVOUT mensual y un vector (N,) de GHI diario.
+    lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+    lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+    if lat.shape != lon.shape:
+        raise ValueError("Las latitudes y longitudes deben tener la misma longitud.")
+
+    pvout = muestrear_cubo(cubo_pvout, lat, lon, bilineal, max_distancia)
+    ghi = muestrear_cubo(cubo_ghi, lat, lon, bilineal, max_distancia)[:, 0]
+    return pvout, ghi
@@ -0,0 +1,372 @@
+# Reporte técnico en PDF (ReportLab), sin Streamlit
+# generar_pdf recibe un diccionario con los valores ya calculados y devuelve los bytes del PDF.
+# ColaReportes lo ejecuta en un pool de hilos: cada pedido recibe un id con su estado y progreso,
+# y los reportes terminados se guardan por la huella de sus datos, de modo que un pedido idéntico
+# se resuelve al instante y dos pedidos iguales en curso comparten el mismo trabajo.
+#
+# Reportes de un portafolio completo (desde la raíz del repositorio), a partir de los
+# resultados de lote_fv.py:
+#   python solar_python/reportes_fv.py resultados.csv reportes.zip --procesos 8
+import argparse
+import io
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cache_fv import CacheLRU, huella
+
+
+TITULO = "Reporte Técnico - Sistema Fotovoltaico On-Grid"
+PIE = "Generado automáticamente por la app <b>Solar OnGrid</b> - Alejandro H."
+MAX_HILOS = 2
+MAX_TRABAJOS = 256      # trabajos terminados que se recuerdan por id
+TAMANO_BLOQUE = 100     # reportes por tarea enviada a cada proceso en los lotes
+ANCHO_GRAFICO, ALTO_GRAFICO = 900, 450      # píxeles de la exportación (a escala 2)
+
+
+@lru_cache(maxsize=1)
+def estilos_reporte():
+    # Estilos creados una sola vez por proceso y compartidos (solo lectura) entre reportes
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+
+    styles = getSampleStyleSheet()
+    return {
+        "titulo": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            spaceAfter=30,
+            textColor=colors.HexColor('#003366')
+        ),
+        "seccion": styles['Heading2'],
+        "normal": styles['Normal'],
+    }
+
+
+def contenido_reporte(datos, imagenes=()):
+    # Lista de flowables del reporte a partir de los valores de datos.
+    # imagenes: lista de (título, PNG o None) de los gráficos ya exportados
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Image, Paragraph, Spacer
+
+    estilos = estilos_reporte()
+    normal, seccion = estilos["normal"], estilos["seccion"]
+    story = []
+
+    # Título
+    story.append(Paragraph(TITULO, estilos["titulo"]))
+    story.append(Spacer(1, 12))
+
+    # Información básica
+    periodo = f"{datos['cant_meses']} meses"
+    if datos.get('año_min') is not None:
+        periodo += f" ({datos['año_min']}-{datos['año_max']})"
+    story.append(Paragraph(f"<b>Periodo de análisis:</b> {periodo}", normal))
+    story.append(Paragraph(f"Consumo mensual promedio: {datos['consumo_promedio_kWh']:.2f} kWh", normal))
+    if datos.get('variacion'):
+        story.append(Paragraph(datos['variacion'], normal))
+    story.append(Spacer(1, 12))
+
+    # Ubicación
+    story.append(Paragraph("<b>Ubicación</b>", seccion))
+    if datos.get('sitio') is not None:
+        story.append(Paragraph(f"Sitio: {datos['sitio']}", normal))
+    story.append(Paragraph(f"Latitud: {datos['lat']}", normal))
+    story.append(Paragraph(f"Longitud: {datos['lon']}", normal))
+    story.append(Paragraph(f"Radiación solar diaria media: {datos['radiacion_diaria']:.2f} kWh/m²/día", normal))
+    story.append(Spacer(1, 12))
+
+    # Datos de entrada
+    story.append(Paragraph("<b>Datos de Entrada</b>", seccion))
+    story.append(Paragraph(f"• Consumo mensual promedio: <b>{datos['consumo_promedio_kWh']:.2f} kWh</b>", normal))
+    story.append(Paragraph(f"• Tarifa promedio (incl. impuestos): <b>${datos['tarifa_promedio']:.3f}/kWh</b>", normal))
+    story.append(Paragraph(f"• Objetivo de cobertura: <b>{int(datos['objetivo_cobertura']*100)}%</b>", normal))
+    story.append(Spacer(1, 12))
+
+    # Dimensionamiento
+    story.append(Paragraph("<b>Dimensionamiento</b>", seccion))
+    story.append(Paragraph(f"• Tamaño del sistema: <b>{datos['tamano_sistema_kWp']:.2f} kWp</b>", normal))
+    story.append(Paragraph(f"• Producción mensual estimada: <b>{datos['produccion_total']:.2f} kWh</b>", normal))
+    story.append(Paragraph(f"• Ahorro anual estimado: <b>${datos['ahorro_anual']:.2f}</b>", normal))
+    story.append(Spacer(1, 12))
+
+    # Indicadores financieros (los reportes por lote los traen de lote_fv)
+    if 'van' in datos:
+        story.append(Paragraph("<b>Indicadores Financieros</b>", seccion))
+        story.append(Paragraph(f"• Inversión inicial: <b>${datos['inversion_usd']:,.2f}</b>", normal))
+        story.append(Paragraph(f"• VAN: <b>${datos['van']:,.2f}</b>", normal))
+        story.append(Paragraph(f"• TIR: <b>{datos['tir']*100:.1f}%</b>" if np.isfinite(datos['tir']) else "• TIR: no definida", normal))
+        story.append(Paragraph(f"• Payback: <b>{datos['payback']:.1f} años</b>" if np.isfinite(datos['payback'])
+                               else "• Payback: no se recupera en el horizonte", normal))
+        story.append(Spacer(1, 12))
+
+    # Gráficos
+    if imagenes:
+        story.append(Paragraph("<b>Gráficos</b>", seccion))
+        if any(png is None for _, png in imagenes):
+            story.append(Paragraph("Gráficos no incluidos: instala el paquete kaleido para exportarlos.", normal))
+        for titulo, png in imagenes:
+            if png is not None:
+                story.append(Paragraph(titulo, normal))
+                story.append(Image(io.BytesIO(png), width=17 * cm, height=17 * cm * ALTO_GRAFICO / ANCHO_GRAFICO))
+                story.append(Spacer(1, 12))
+
+    # Interpretación
+    story.append(Paragraph("<b>Interpretación Técnica</b>", seccion))
+    story.append(Paragraph(datos['interpretacion'], normal))
+    story.append(Spacer(1, 12))
+
+    # Glosario
+    if datos.get('glosario'):
+        story.append(Paragraph("<b>Glosario</b>", seccion))
+        story.append(Paragraph(datos['glosario'], normal))
+        story.append(Spacer(1, 12))
+
+    # Pie de página
+    story.append(Paragraph(PIE, normal))
+    return story
+
+
+def generar_pdf(datos, progreso=None):
+    # Bytes del PDF; progreso(fraccion, mensaje) se llama en cada etapa si se da
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    avisar = progreso or (lambda fraccion, mensaje: None)
+
+    # datos["graficos"]: lista de (título, JSON de la figura Plotly)
+    graficos = datos.get("graficos", ())
+    imagenes = []
+    if graficos:
+        from graficos_fv import imagen_png
+        for i, (titulo, spec) in enumerate(graficos):
+            avisar(0.05 + 0.3 * i / len(graficos), f"Exportando gráfico: {titulo}")
+            imagenes.append((titulo, imagen_png(spec, ANCHO_GRAFICO, ALTO_GRAFICO)))
+
+    avisar(0.35, "Armando el contenido")
+    story = contenido_reporte(datos, imagenes)
+
+    avisar(0.4, "Maquetando el documento")
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    doc.build(story, onFirstPage=lambda canvas, doc: avisar(0.6, "Escribiendo páginas"))
+    avisar(1.0, "Listo")
+    return buffer.getvalue()
+
+
+##########
+# Cola de trabajos en segundo plano
+
+class ColaReportes:
+    # Pool de hilos compartido entre sesiones; los estados se consultan por id de trabajo
+
+    def __init__(self, max_hilos=MAX_HILOS, max_reportes=64, generar=generar_pdf, al_primer_pedido=None):
+        # al_primer_pedido: tarea opcional que corre en el pool una sola vez, junto con el primer
+        # reporte que hay que generar (p. ej. arrancar kaleido); crear la cola no la ejecuta
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="reporte_fv")
+        self._terminados = CacheLRU(max_reportes)       # huella de los datos -> bytes del PDF
+        self._trabajos = OrderedDict()                  # id -> estado
+        self._en_curso = {}                             # huella -> id
+        self._lock = threading.Lock()
+        self._generar = generar
+        self._al_primer_pedido = al_primer_pedido
+
+    def enviar(self, datos):
+        # Encola un reporte y devuelve su id. Si el mismo reporte ya está hecho o en curso,
+        # no se genera de nuevo.
+        clave = huella(datos)
+        with self._lock:
+            if clave in self._en_curso:
+                return self._en_curso[clave]
+            id_trabajo = uuid.uuid4().hex[:12]
+            trabajo = {"id": id_trabajo, "clave": clave, "estado": "en_cola", "progreso": 0.0,
+                       "mensaje": "En cola", "pdf": None, "error": None}
+            self._trabajos[id_trabajo] = trabajo
+            self._podar()
+            if clave in self._terminados:
+                trabajo.update(estado="listo", progreso=1.0, mensaje="Listo (reporte en caché)",
+                               pdf=self._terminados.obtener(clave, lambda: self._generar(datos)))
+                return id_trabajo
+            self._en_curso[clave] = id_trabajo
+            preparar, self._al_primer_pedido = self._al_primer_pedido, None
+
+        if preparar is not None:
+            self._pool.submit(preparar)
+        self._pool.submit(self._ejecutar, trabajo, datos)
+        return id_trabajo
+
+    def _ejecutar(self, trabajo, datos):
+        def progreso(fraccion, mensaje):
+            with self._lock:
+                trabajo.update(progreso=fraccion, mensaje=mensaje)
+
+        with self._lock:
+            trabajo["estado"] = "en_proceso"
+        try:
+            pdf = self._terminados.obtener(trabajo["clave"], lambda: self._generar(datos, progreso))
+            cambios = {"estado": "listo", "progreso": 1.0, "mensaje": "Listo", "pdf": pdf}
+        except Exception as e:
+            cambios = {"estado": "error", "mensaje": "Error", "error": str(e)}
+        with self._lock:
+            trabajo.update(cambios)
+            self._en_curso.pop(trabajo["clave"], None)
+
+    def _podar(self):
+        # Olvida los trabajos terminados más antiguos (se llama con el lock tomado)
+        sobrantes = len(self._trabajos) - MAX_TRABAJOS
+        for id_trabajo in [i for i, t in self._trabajos.items() if t["estado"] in ("listo", "error")][:max(sobrantes, 0)]:
+            del self._trabajos[id_trabajo]
+
+    def estado(self, id_trabajo):
+        # Copia del estado del trabajo (None si el id no existe)
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            return dict(trabajo) if trabajo is not None else None
+
+
+##########
+# Reportes por lote (portafolio de sitios)
+
+def interpretacion_sitio(fila):
+    # Texto breve a partir de los indicadores del sitio
+    frases = [f"Se dimensiona un sistema de {fila['tamano_sistema_kWp']:.2f} kWp para un consumo promedio de "
+              f"{fila['consumo_promedio_kWh']:.0f} kWh/mes."]
+    if fila['van'] > 0:
+        frases.append("El proyecto es rentable: el valor actual de los ahorros supera la inversión.")
+    else:
+        frases.append("Con los parámetros usados el proyecto no recupera su costo en valor actual.")
+    if np.isfinite(fila['payback']):
+        frases.append(f"La inversión se recupera en aproximadamente {fila['payback']:.1f} años.")
+    return " ".join(frases)
+
+
+def datos_sitio(fila, objetivo_cobertura, columna_id="Sitio"):
+    # Diccionario de generar_pdf a partir de una fila de resultados de lote_fv
+    return {
+        "sitio": fila[columna_id],
+        "cant_meses": int(fila['meses']),
+        "año_min": fila.get('año_min'),
+        "año_max": fila.get('año_max'),
+        "consumo_promedio_kWh": fila['consumo_promedio_kWh'],
+        "lat": fila['lat'],
+        "lon": fila['lon'],
+        "radiacion_diaria": fila['radiacion_diaria'],
+        "tarifa_promedio": fila['tarifa_mas_impuestos'],
+        "objetivo_cobertura": objetivo_cobertura,
+        "tamano_sistema_kWp": fila['tamano_sistema_kWp'],
+        "produccion_total": fila['tamano_sistema_kWp'] * fila['pvout_promedio'] * 12,
+        "ahorro_anual": fila['tarifa_mas_impuestos'] * fila['consumo_promedio_kWh'] * 12,
+        "inversion_usd": fila['inversion_usd'],
+        "van": fila['van'],
+        "tir": fila['tir'],
+        "payback": fila['payback'],
+        "interpretacion": interpretacion_sitio(fila),
+    }
+
+
+def nombre_reporte(sitio):
+    # Nombre de archivo seguro para el identificador del sitio
+    return "reporte_" + re.sub(r'[^\w.-]+', '_', str(sitio)).strip('_') + ".pdf"
+
+
+def _generar_bloque(args):
+    # Se ejecuta en los procesos del pool; los estilos se crean una vez por proceso
+    filas, objetivo_cobertura, columna_id = args
+    return [(nombre_reporte(fila[columna_id]), generar_pdf(datos_sitio(fila, objetivo_cobertura, columna_id)))
+            for fila in filas]
+
+
+def generar_lote(resultados, destino, objetivo_cobertura, procesos=1, tamano_bloque=TAMANO_BLOQUE,
+                 columna_id="Sitio"):
+    # Un PDF por sitio con estado "ok". destino es un .zip o una carpeta; cada reporte se escribe
+    # apenas llega, con a lo sumo 2 bloques por proceso en vuelo. Devuelve la cantidad de reportes.
+    # Ids distintos pueden dar el mismo nombre ("A/1" y "A_1"): los repetidos llevan un sufijo _2, _3...
+    if "estado" in resultados.columns:
+        resultados = resultados[resultados["estado"] == "ok"]
+    filas = resultados.to_dict("records")
+    tareas = ((filas[i:i + tamano_bloque], objetivo_cobertura, columna_id)
+              for i in range(0, len(filas), tamano_bloque))
+
+    if destino.lower().endswith(".zip"):
+        archivo = zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED)
+        escribir = archivo.writestr
+    else:
+        archivo = None
+        os.makedirs(destino, exist_ok=True)
+
+        def escribir(nombre, pdf):
+            with open(os.path.join(destino, nombre), "wb") as f:
+                f.write(pdf)
+
+    usados = set()
+
+    def guardar(nombre, pdf):
+        base, extension = os.path.splitext(nombre)
+        candidato, n = nombre, 2
+        while candidato in usados:
+            candidato, n = f"{base}_{n}{extension}", n + 1
+        usados.add(candidato)
+        escribir(candidato, pdf)
+
+    cantidad = 0
+    try:
+        if procesos > 1:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                en_vuelo = []
+                for tarea in tareas:
+                    en_vuelo.append(pool.submit(_generar_bloque, tarea))
+                    if len(en_vuelo) >= 2 * procesos:
+                        for nombre, pdf in en_vuelo.pop(0).result():
+                            guardar(nombre, pdf)
+                            cantidad += 1
+                for futuro in en_vuelo:
+                    for nombre, pdf in futuro.result():
+                        guardar(nombre, pdf)
+                        cantidad += 1
+        else:
+            for tarea in tareas:
+                for nombre, pdf in _generar_bloque(tarea):
+                    guardar(nombre, pdf)
+                    cantidad += 1
+    finally:
+        if archivo is not None:
+            archivo.close()
+    return cantidad
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reportes PDF por sitio a partir de los resultados de lote_fv.py.")
+    parser.add_argument("resultados", help="CSV o Parquet de resultados de lote_fv.py")
+    parser.add_argument("destino", help="Archivo .zip o carpeta de salida")
+    parser.add_argument("--columna-id", default="Sitio", help="Columna que identifica al sitio")
+    parser.add_argument("--cobertura", type=float, default=75, help="Objetivo de cobertura usado en el lote (%%)")
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos en paralelo (0 = todos los núcleos)")
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE, help="Reportes por tarea")
+    args = parser.parse_args(argv)
+
+    if args.resultados.lower().endswith(('.parquet', '.pq')):
+        resultados = pd.read_parquet(args.resultados)
+    else:
+        resultados = pd.read_csv(args.resultados)
+    procesos = args.procesos or os.cpu_count()
+
+    inicio = time.perf_counter()
+    cantidad = generar_lote(resultados, args.destino, args.cobertura / 100, procesos, args.tamano_bloque,
+                            args.columna_id)
+    duracion = time.perf_counter() - inicio
+    print(f"✅ {cantidad} reportes generados en {duracion:.2f} s ({cantidad / max(duracion, 1e-9):,.1f} reportes/s) -> {args.destino}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
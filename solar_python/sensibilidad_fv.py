@@ -0,0 +1,99 @@
+# Análisis de sensibilidad: tornado de VAN/TIR y mapas de calor de dos parámetros
+# Todos los escenarios (variaciones de cada parámetro o celdas de la grilla) se evalúan en una
+# sola llamada vectorizada a la misma cadena que evaluar_proyecto: dimensionamiento ->
+# proyectar_escenarios -> indicadores_lote, con cada parámetro como arreglo (S,).
+import numpy as np
+import pandas as pd
+
+from finanzas_fv import indicadores_lote
+from motor_fv import (INCREMENTO_TARIFA, dimensionar_sistema, produccion_anual_por_kWp,
+                      proyectar_escenarios)
+
+
+# Parámetros que se pueden variar y su nombre en pantalla
+PARAMETROS = {
+    "tasa_descuento": "Tasa de descuento",
+    "costo_Wp": "Costo por Wp",
+    "mantenimiento_anual": "Mantenimiento anual",
+    "factor_perdidas": "Eficiencia (factor de pérdidas)",
+    "tarifa": "Tarifa eléctrica",
+    "incremento_tarifa": "Incremento anual de tarifa",
+}
+VARIACION = 0.2     # ±20% por defecto
+
+
+def evaluar_escenarios(base, **cambios):
+    # base: diccionario con consumo_promedio_kWh, valores_mensuales (12,), radiacion_diaria,
+    # objetivo_cobertura, años_proyecto y los valores de PARAMETROS. cambios: arreglos (S,) o
+    # de cualquier forma común que reemplazan parámetros de base. Devuelve VAN, TIR, payback,
+    # tamaño e inversión con esa forma.
+    valores = {p: base.get(p, INCREMENTO_TARIFA if p == "incremento_tarifa" else None) for p in PARAMETROS}
+    valores.update(cambios)
+    arreglos = np.broadcast_arrays(*[np.asarray(valores[p], dtype=float) for p in PARAMETROS])
+    forma = arreglos[0].shape
+    p = {nombre: a.ravel() for nombre, a in zip(PARAMETROS, arreglos)}
+
+    # Igual que en la app: el tamaño del sistema depende del factor de pérdidas
+    dimension = dimensionar_sistema(base["consumo_promedio_kWh"], base["valores_mensuales"],
+                                    p["factor_perdidas"], base["objetivo_cobertura"])
+    produccion_kWp_anio = produccion_anual_por_kWp(base["radiacion_diaria"], dimension["factores_relativos"],
+                                                   p["factor_perdidas"])
+    proyeccion = proyectar_escenarios(
+        dimension["tamano_sistema_kWp"], produccion_kWp_anio, p["tarifa"], p["costo_Wp"],
+        p["mantenimiento_anual"], base["años_proyecto"], incremento_tarifa=p["incremento_tarifa"]
+    )
+    indicadores = indicadores_lote(proyeccion["flujos"], p["tasa_descuento"])
+
+    tamano = np.broadcast_to(dimension["tamano_sistema_kWp"], p["tarifa"].shape)
+    return {
+        "van": indicadores["van"].reshape(forma),
+        "tir": indicadores["tir"].reshape(forma),
+        "payback": indicadores["payback"].reshape(forma),
+        "tamano_sistema_kWp": tamano.reshape(forma),
+        "inversion_usd": -proyeccion["flujos"][:, 0].reshape(forma),
+    }
+
+
+def tornado(base, variacion=VARIACION, parametros=tuple(PARAMETROS)):
+    # Cada parámetro a base * (1 - variacion) y base * (1 + variacion) con el resto fijo:
+    # 2 * P escenarios + el caso base en una sola evaluación. Filas ordenadas por impacto en el VAN.
+    n = len(parametros)
+    cambios = {}
+    for i, parametro in enumerate(parametros):
+        valor = base.get(parametro, INCREMENTO_TARIFA if parametro == "incremento_tarifa" else None)
+        columna = np.full(2 * n + 1, float(valor))
+        columna[2 * i] = valor * (1 - variacion)
+        columna[2 * i + 1] = valor * (1 + variacion)
+        if parametro == "factor_perdidas":
+            columna = np.clip(columna, 1e-6, 1.0)
+        cambios[parametro] = columna
+    resultado = evaluar_escenarios(base, **cambios)
+
+    filas = []
+    for i, parametro in enumerate(parametros):
+        filas.append({
+            "parametro": parametro,
+            "Parámetro": PARAMETROS[parametro],
+            "Valor bajo": cambios[parametro][2 * i],
+            "Valor alto": cambios[parametro][2 * i + 1],
+            "VAN bajo": resultado["van"][2 * i],
+            "VAN alto": resultado["van"][2 * i + 1],
+            "TIR bajo": resultado["tir"][2 * i],
+            "TIR alto": resultado["tir"][2 * i + 1],
+        })
+    tabla = pd.DataFrame(filas)
+    tabla["Impacto VAN"] = (tabla["VAN alto"] - tabla["VAN bajo"]).abs()
+    tabla = tabla.sort_values("Impacto VAN", ascending=False).reset_index(drop=True)
+    return {"tabla": tabla, "van_base": resultado["van"][-1], "tir_base": resultado["tir"][-1]}
+
+
+def mapa_calor(base, parametro_x="costo_Wp", parametro_y="tarifa", variacion=0.3, puntos=21):
+    # Grilla puntos x puntos alrededor de los valores base de dos parámetros, evaluada de una vez
+    def eje(parametro):
+        valor = base.get(parametro, INCREMENTO_TARIFA if parametro == "incremento_tarifa" else None)
+        valores = np.linspace(valor * (1 - variacion), valor * (1 + variacion), puntos)
+        return np.clip(valores, 1e-6, 1.0) if parametro == "factor_perdidas" else valores
+
+    x, y = eje(parametro_x), eje(parametro_y)
+    resultado = evaluar_escenarios(base, **{parametro_x: x[None, :], parametro_y: y[:, None]})
+    return {"x": x, "y": y, "van": resultado["van"], "tir": resultado["tir"], "payback": resultado["payback"]}
@@ -0,0 +1,106 @@
+# Liquidación de la factura eléctrica mensual bajo cada esquema de conexión
+# Todas las funciones trabajan sobre arreglos (..., años, 12): los meses consecutivos de
+# todos los años forman la serie sobre la que se arrastra el saldo a favor, y las
+# dimensiones previas (escenarios, sitios) se procesan a la vez por broadcasting.
+import numpy as np
+
+
+ESQUEMAS = {
+    "inyeccion_cero": "Autoconsumo simple (inyección cero)",
+    "net_billing": "Net Billing (facturación neta)",
+    "net_metering": "Net Metering (medición neta)",
+}
+PERIODO_CREDITO = 12    # meses tras los cuales vence el saldo a favor acumulado
+
+
+def _serie_mensual(x):
+    # (..., años, 12) -> (..., años * 12)
+    x = np.asarray(x, dtype=float)
+    if x.ndim == 1:
+        x = x[None, :]
+    return x.reshape(*x.shape[:-2], x.shape[-2] * x.shape[-1])
+
+
+def _saldo_rodante(saldo, periodo=PERIODO_CREDITO):
+    # saldo (..., M): positivo = por pagar, negativo = genera saldo a favor.
+    # Recursión credito[m] = max(0, credito[m-1] - saldo[m]) resuelta en forma cerrada
+    # (recurrencia de Lindley: suma acumulada menos su mínimo acumulado) y reiniciada cada
+    # periodo meses. Devuelve lo pagado (..., M), el saldo a favor al cierre de cada mes y el
+    # saldo que vence sin usarse al final de cada periodo.
+    meses = saldo.shape[-1]
+    periodos = -(-meses // periodo)
+    relleno = periodos * periodo - meses
+    if relleno:
+        saldo = np.concatenate([saldo, np.zeros(saldo.shape[:-1] + (relleno,))], axis=-1)
+    bloques = saldo.reshape(*saldo.shape[:-1], periodos, periodo)
+
+    acumulado = np.cumsum(-bloques, axis=-1)
+    credito = acumulado - np.minimum(np.minimum.accumulate(acumulado, axis=-1), 0)
+    anterior = np.concatenate([np.zeros(credito.shape[:-1] + (1,)), credito[..., :-1]], axis=-1)
+    pagado = bloques + credito - anterior
+
+    vencido = np.zeros_like(credito)
+    vencido[..., -1] = credito[..., -1]
+    forma = saldo.shape
+    return (pagado.reshape(forma)[..., :meses], credito.reshape(forma)[..., :meses],
+            vencido.reshape(forma)[..., :meses])
+
+
+def liquidar_esquemas(generacion, consumo, tarifa, precio_excedente=None, autoconsumo=None,
+                      cargo_fijo=0.0, periodo_credito=PERIODO_CREDITO):
+    # generacion, consumo: energía mensual (..., años, 12) en kWh; tarifa y precio_excedente ($/kWh)
+    # se combinan por broadcasting (por ejemplo (años, 1) para una tarifa que sube cada año).
+    # autoconsumo: energía solar consumida en el momento (..., años, 12); por defecto el mínimo
+    # mensual entre generación y consumo (cota superior, conviene pasarlo desde horario_fv).
+    # Devuelve un diccionario por esquema (y "sin_fv") con arreglos (..., años, 12).
+    generacion = np.asarray(generacion, dtype=float)
+    consumo = np.asarray(consumo, dtype=float)
+    generacion, consumo = np.broadcast_arrays(generacion, consumo)
+    forma = generacion.shape if generacion.ndim > 1 else (1,) + generacion.shape
+    tarifa = np.broadcast_to(np.asarray(tarifa, dtype=float), forma)
+    precio = tarifa if precio_excedente is None else np.broadcast_to(np.asarray(precio_excedente, dtype=float), forma)
+
+    if autoconsumo is None:
+        autoconsumo = np.minimum(generacion, consumo)
+    autoconsumo = np.minimum(np.broadcast_to(np.asarray(autoconsumo, dtype=float), generacion.shape),
+                             np.minimum(generacion, consumo))
+    importada = (consumo - autoconsumo).reshape(forma)
+    excedente = (generacion - autoconsumo).reshape(forma)
+
+    resultado = {
+        "sin_fv": {"factura": np.broadcast_to(consumo, forma) * tarifa + cargo_fijo,
+                   "energia_importada": np.broadcast_to(consumo, forma)},
+        # Inyección cero: el excedente se recorta (no se inyecta ni se paga)
+        "inyeccion_cero": {"factura": importada * tarifa + cargo_fijo,
+                           "energia_importada": importada,
+                           "energia_vertida": excedente},
+    }
+
+    # Net Billing: el excedente se valora a precio_excedente y el saldo en $ pasa al mes siguiente
+    saldo_usd = _serie_mensual(importada * tarifa - excedente * precio)
+    pagado, credito, vencido = _saldo_rodante(saldo_usd, periodo_credito)
+    resultado["net_billing"] = {
+        "factura": pagado.reshape(forma) + cargo_fijo,
+        "energia_importada": importada,
+        "energia_exportada": excedente,
+        "credito_usd": credito.reshape(forma),
+        "credito_vencido_usd": vencido.reshape(forma),
+    }
+
+    # Net Metering: se factura la energía neta del medidor y el excedente queda como saldo en kWh
+    saldo_kWh = _serie_mensual((consumo - generacion).reshape(forma))
+    pagado, credito, vencido = _saldo_rodante(saldo_kWh, periodo_credito)
+    resultado["net_metering"] = {
+        "factura": pagado.reshape(forma) * tarifa + cargo_fijo,
+        "energia_importada": pagado.reshape(forma),
+        "energia_exportada": excedente,
+        "credito_kWh": credito.reshape(forma),
+        "credito_vencido_kWh": vencido.reshape(forma),
+    }
+    return resultado
+
+
+def ahorro_por_esquema(liquidacion):
+    # Ahorro anual (..., años) de cada esquema frente a la factura sin sistema FV
+    sin_fv = liquidacion["sin_fv"]["factura"].sum(axis=-1)
+    return {esquema: sin_fv - liquidacion[esquema]["factura"].sum(axis=-1) for esquema in ESQUEMAS}
@@ -0,0 +1,52 @@
+# Los módulos de la app se importan planos (como desde analisis_fv.py): se agrega solar_python al path
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+import pytest
+
+# Rasters sintéticos con la estructura de los reales (12 PVOUT mensuales + GHI diario) sobre una
+# grilla pequeña de 0.05° en la costa de Ecuador; las primeras COLUMNAS_MAR columnas son nodata
+ALTO, ANCHO, PASO = 40, 48, 0.05
+OESTE, NORTE = -81.0, 0.5
+COLUMNAS_MAR = 5
+NODATA = -9999.0
+
+
+def _escribir_tif(ruta, banda, bloque=16):
+    import rasterio
+    from rasterio.transform import from_origin
+
+    datos = np.where(np.isfinite(banda), banda, NODATA).astype(np.float32)
+    with rasterio.open(ruta, "w", driver="GTiff", width=ANCHO, height=ALTO, count=1, dtype="float32",
+                       crs="EPSG:4326", transform=from_origin(OESTE, NORTE, PASO, PASO), nodata=NODATA,
+                       tiled=True, blockxsize=bloque, blockysize=bloque) as dst:
+        dst.write(datos, 1)
+
+
+@pytest.fixture(scope="session")
+def rasters(tmp_path_factory):
+    # {"pvout": carpeta, "ghi": ruta, "datos_pvout": (12, alto, ancho), "datos_ghi": (alto, ancho),
+    #  "centro": (fila, col) -> (lat, lon) del centro del pixel}
+    pytest.importorskip("rasterio")
+    carpeta = tmp_path_factory.mktemp("rasters")
+    filas, cols = np.mgrid[0:ALTO, 0:ANCHO].astype(np.float32)
+    mar = cols < COLUMNAS_MAR
+    pvout = np.stack([100 + 2 * m + 10 * cols / ANCHO + 5 * filas / ALTO for m in range(12)])
+    pvout[:, mar] = np.nan
+    ghi = 4 + cols / ANCHO
+    ghi[mar] = np.nan
+
+    (carpeta / "pvout").mkdir()
+    for m in range(12):
+        _escribir_tif(carpeta / "pvout" / f"PVOUT_{m + 1:02d}.tif", pvout[m])
+    _escribir_tif(carpeta / "GHI.tif", ghi)
+    return {"pvout": str(carpeta / "pvout"), "ghi": str(carpeta / "GHI.tif"),
+            "datos_pvout": pvout.astype(np.float32), "datos_ghi": ghi.astype(np.float32), "centro": centro_pixel}
+
+
+def centro_pixel(fila, col):
+    # (lat, lon) del centro de un pixel de los rasters sintéticos
+    return NORTE - (np.asarray(fila) + 0.5) * PASO, OESTE + (np.asarray(col) + 0.5) * PASO
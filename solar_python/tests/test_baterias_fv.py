@@ -0,0 +1,98 @@
+# simular_bateria y evaluar_baterias contra un bucle Python hora por hora
+import numpy as np
+import pytest
+
+from baterias_fv import (DEGRADACION_BATERIA, EFICIENCIA_IDA_VUELTA, PROFUNDIDAD_DESCARGA, TASA_C,
+                         VIDA_BATERIA, evaluar_baterias, flujo_bateria, simular_bateria)
+from motor_fv import DEGRADACION_ANUAL, INCREMENTO_TARIFA
+
+
+def perfiles():
+    # Año sintético: generación de campana al mediodía con nubosidad al azar, carga con pico nocturno
+    rng = np.random.default_rng(1)
+    hora = np.arange(8760) % 24
+    sol = np.clip(np.sin((hora - 6) / 12 * np.pi), 0, None)
+    generacion = 3.0 * sol * rng.uniform(0.2, 1.0, 8760)
+    carga = 0.4 + 0.8 * ((hora >= 18) & (hora <= 22)) + rng.uniform(0, 0.3, 8760)
+    return generacion, carga
+
+
+def bucle_python(generacion, carga, capacidad, años):
+    # Referencia (como benchmarks/bench_baterias.py) con degradación de la generación y de la
+    # batería; cada año arranca vacío. Devuelve absorbida y entregada por año.
+    eficiencia = np.sqrt(EFICIENCIA_IDA_VUELTA)
+    absorbida, entregada = np.zeros(años), np.zeros(años)
+    for anio in range(años):
+        nominal = capacidad * (1 - DEGRADACION_BATERIA) ** (anio % VIDA_BATERIA)
+        util = nominal * PROFUNDIDAD_DESCARGA
+        potencia = nominal * TASA_C
+        energia = 0.0
+        for g, c in zip((generacion * (1 - DEGRADACION_ANUAL) ** anio).tolist(), carga.tolist()):
+            directo = min(g, c)
+            cargar = min(util - energia, (g - directo) * eficiencia, potencia * eficiencia)
+            energia += cargar
+            absorbida[anio] += cargar / eficiencia
+            descargar = min(energia, (c - directo) / eficiencia, potencia / eficiencia)
+            energia -= descargar
+            entregada[anio] += descargar * eficiencia
+    return absorbida, entregada
+
+
+def test_simular_bateria_igual_a_bucle():
+    generacion, carga = perfiles()
+    capacidades = np.array([0.0, 2.5, 10.0])
+    años = 12   # incluye un reemplazo
+    simulacion = simular_bateria(generacion, carga, capacidades, años)
+    for b, capacidad in enumerate(capacidades):
+        absorbida, entregada = bucle_python(generacion, carga, capacidad, años)
+        np.testing.assert_allclose(simulacion["absorbida"][:, b], absorbida, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(simulacion["entregada"][:, b], entregada, rtol=1e-9, atol=1e-9)
+
+
+def test_simular_bateria_balances():
+    generacion, carga = perfiles()
+    simulacion = simular_bateria(generacion, carga, [0.0, 5.0], 3)
+    # La energía solar se autoconsume, se exporta o se pierde en la batería
+    perdidas = simulacion["absorbida"] - simulacion["entregada"]
+    np.testing.assert_allclose(simulacion["autoconsumo"] + simulacion["exportado"] + perdidas,
+                               simulacion["generacion"])
+    np.testing.assert_allclose(simulacion["autoconsumo"] + simulacion["importado"], carga.sum())
+    # Sin batería el autoconsumo es el directo y se exporta todo el excedente
+    np.testing.assert_allclose(simulacion["autoconsumo"][:, 0], simulacion["autoconsumo_directo"])
+    np.testing.assert_allclose(simulacion["exportado"][:, 0], simulacion["excedente_fv"])
+
+
+def test_evaluar_baterias_igual_a_valoracion_horaria():
+    # Flujo combinado = autoconsumo (directo + batería) a tarifa + exportado a tarifa_excedente,
+    # menos mantenimiento y compras de batería: la batería no se cuenta dos veces
+    generacion, carga = perfiles()
+    capacidades = np.array([0.0, 4.0])
+    años, tarifa, tarifa_excedente, costo_kWh = 15, 0.12, 0.05, 300.0
+    resultado = evaluar_baterias(generacion, carga, capacidades, 3000.0, 20.0, años, tarifa, tarifa_excedente,
+                                 0.08, costo_kWh=costo_kWh)
+    for b, capacidad in enumerate(capacidades):
+        absorbida, entregada = bucle_python(generacion, carga, capacidad, años)
+        esperado = [-3000.0 - capacidad * costo_kWh]
+        for anio in range(años):
+            g = generacion * (1 - DEGRADACION_ANUAL) ** anio
+            directo = np.minimum(g, carga).sum()
+            excedente = g.sum() - directo
+            ahorro = (directo + entregada[anio]) * tarifa + (excedente - absorbida[anio]) * tarifa_excedente
+            reemplazo = capacidad * costo_kWh if anio + 1 == VIDA_BATERIA else 0.0
+            esperado.append(ahorro * (1 + INCREMENTO_TARIFA) ** anio - 20.0 - reemplazo)
+        np.testing.assert_allclose(resultado["flujos"][b], esperado, rtol=1e-9)
+    np.testing.assert_allclose(resultado["flujos"][0], resultado["flujo_fv"])
+
+
+def test_evaluar_baterias_sobre_el_flujo_fv_dado():
+    # Con el flujo FV del proyecto como base, sin batería se reproduce ese flujo y con batería solo
+    # se agrega el flujo incremental de la batería
+    generacion, carga = perfiles()
+    base = np.concatenate([[-3000.0], np.linspace(400, 520, 10)])
+    resultado = evaluar_baterias(generacion, carga, [0.0, 2.0, 6.0], 3000.0, 20.0, 10, 0.12, 0.05, 0.08,
+                                 flujo_fv=base)
+    np.testing.assert_array_equal(resultado["flujo_fv"], base)
+    np.testing.assert_allclose(resultado["flujos"][0], base)
+    incremental = flujo_bateria(resultado["simulacion"], 400.0, 0.12, 0.05)
+    np.testing.assert_allclose(resultado["flujos"] - base, incremental)
+    assert resultado["curva"]["VAN"][0] == pytest.approx(np.sum(base / 1.08 ** np.arange(11)))
@@ -0,0 +1,114 @@
+# huella y cachés LRU por capas
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cache_fv import CacheEscenarios, CacheLRU, huella
+
+
+def test_huella_normaliza_flotantes_y_tipos():
+    assert huella(0.1 + 0.2) == huella(0.3)
+    assert huella(np.float64(0.5)) == huella(0.5)
+    assert huella(np.int64(3)) == huella(3)
+    assert huella(1) != huella(1.0)
+    assert huella(True) != huella(1)
+    assert huella([1, 2]) != huella([[1, 2]])
+    assert huella({"a": 1, "b": 2}) == huella({"b": 2, "a": 1})
+    assert huella("ab", "c") != huella("a", "bc")
+
+
+def test_huella_arreglos_y_tablas():
+    a = np.array([1.0, 2.0, 3.0])
+    assert huella(a) == huella(a.copy())
+    assert huella(a) != huella(a.reshape(3, 1))
+    assert huella(a) != huella(a.astype(np.float32))
+    assert huella(a) != huella(a + 1e-6)
+
+    df = pd.DataFrame({"x": [1, 2], "y": [3.0, 4.0]})
+    assert huella(df) == huella(df.copy())
+    assert huella(df) != huella(df.rename(columns={"y": "z"}))
+    assert huella(df) != huella(df.assign(y=[3.0, 5.0]))
+
+
+def test_lru_expulsa_la_menos_usada():
+    cache = CacheLRU(max_entradas=2)
+    calculos = []
+
+    def calcular(valor):
+        def f():
+            calculos.append(valor)
+            return valor
+        return f
+
+    cache.obtener("a", calcular(1))
+    cache.obtener("b", calcular(2))
+    assert cache.obtener("a", calcular(-1)) == 1    # acierto; "a" pasa a ser la más reciente
+    cache.obtener("c", calcular(3))                 # expulsa "b"
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert calculos == [1, 2, 3]
+
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"], estadisticas["expulsiones"]) == (1, 3, 1)
+    assert estadisticas["tasa_aciertos"] == 0.25
+    assert "bytes" not in estadisticas
+
+    cache.limpiar()
+    assert len(cache) == 0
+
+
+def test_lru_sin_limite():
+    cache = CacheLRU(max_entradas=None)
+    for i in range(500):
+        cache.obtener(i, lambda: i)
+    assert len(cache) == 500 and cache.expulsiones == 0
+
+
+def test_lru_entre_hilos():
+    cache = CacheLRU()
+    barrera = threading.Barrier(4)
+    resultados = []
+
+    def trabajar():
+        barrera.wait()
+        resultados.append(cache.obtener("k", lambda: 42))
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert resultados == [42] * 4 and len(cache) == 1
+
+
+def test_escenarios_capas_independientes():
+    cache = CacheEscenarios(max_entradas=3, max_por_capa={"graficos": 1})
+    cache.obtener("van", "k", lambda: 1.0)
+    cache.obtener("graficos", "k", lambda: "fig1")
+    cache.obtener("graficos", "k2", lambda: "fig2")
+    # La misma clave en otra capa no choca, y cada capa tiene su propio límite
+    assert cache.obtener("van", "k", lambda: -1.0) == 1.0
+    assert len(cache.capa("graficos")) == 1 and cache.capa("van").max_entradas == 3
+
+    tabla = cache.estadisticas()
+    assert set(tabla.index) == {"van", "graficos"}
+    assert tabla.loc["graficos", "expulsiones"] == 1 and tabla.loc["van", "aciertos"] == 1
+
+    cache.limpiar()
+    assert len(cache.capa("van")) == 0
+
+
+def test_lru_acotada_en_bytes():
+    cache = CacheLRU(max_entradas=None, max_bytes=3000)
+    for i in range(5):
+        cache.obtener(i, lambda: np.zeros(125))          # 1000 bytes cada uno
+    assert len(cache) == 3 and cache.bytes == 3000 and list(cache._datos) == [2, 3, 4]
+    assert cache.expulsiones == 2
+
+    # Los valores sin nbytes no cuentan; una entrada más grande que el límite queda sola
+    cache.obtener("texto", lambda: "sin nbytes")
+    assert cache.bytes == 3000 and "texto" in cache
+    cache.obtener("grande", lambda: np.zeros(1000))
+    assert list(cache._datos) == ["grande"] and cache.bytes == 8000
+    estadisticas = cache.estadisticas()
+    assert estadisticas["bytes"] == 8000 and estadisticas["max_bytes"] == 3000
@@ -0,0 +1,65 @@
+# Archivo con varios clientes: la evaluación por lote de cada cliente coincide con el panel individual
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingesta_fv import ingerir
+from lote_fv import agregar_por_sitio, evaluar_bloque
+from motor_fv import evaluar_proyecto, preparar_consumo, tarifas_consumo
+
+PARAMETROS = {"objetivo_cobertura": 0.75, "factor_perdidas": 0.8, "costo_Wp": 1.2,
+              "mantenimiento_anual": 20.0, "tasa_descuento": 0.08, "años_proyecto": 20}
+PIXELES = {"Ana": (8, 12), "Beto": (25, 30), "Carla": (35, 45)}
+
+
+@pytest.fixture
+def clientes(tmp_path, rasters):
+    rng = np.random.default_rng(1)
+    filas = []
+    for cliente, (fila, col) in PIXELES.items():
+        lat, lon = rasters["centro"](fila, col)
+        for mes in range(1, 13):
+            consumo = float(rng.integers(80, 400))
+            filas.append({"Cliente": cliente, "Fecha": f"2023-{mes:02d}-01", "Consumo subtotal": consumo,
+                          "Monto": f"${consumo * 0.09:,.2f}", "Total_pagar": f"${consumo * rng.uniform(0.1, 0.13):,.2f}",
+                          "lat": lat, "lon": lon})
+    ruta = tmp_path / "clientes.csv"
+    pd.DataFrame(filas).sample(frac=1, random_state=0).to_csv(ruta, index=False)
+    return ruta
+
+
+def test_cada_cliente_igual_a_evaluar_proyecto(clientes, rasters):
+    df, resumen = ingerir(str(clientes), "csv", "Cliente", ["lat", "lon"], tamano_bloque=7)
+    assert resumen["filas"] == 36 and resumen["filas_descartadas"] == 0
+
+    sitios = agregar_por_sitio(df, "Cliente")
+    assert sorted(sitios["Cliente"]) == sorted(PIXELES)
+    filas = [PIXELES[c][0] for c in sitios["Cliente"]]
+    cols = [PIXELES[c][1] for c in sitios["Cliente"]]
+    pvout = rasters["datos_pvout"][:, filas, cols].T.astype(float)
+    ghi = rasters["datos_ghi"][filas, cols].astype(float)
+    resultados = evaluar_bloque(sitios, pvout, ghi, PARAMETROS)
+
+    for i, cliente in enumerate(sitios["Cliente"]):
+        # Lo mismo que calcula el panel al elegir al cliente, en sus propias coordenadas
+        propio = preparar_consumo(df[df["Cliente"] == cliente].drop(columns="Cliente").reset_index(drop=True))
+        consumo, _, tarifa = tarifas_consumo(propio)
+        lat, lon = rasters["centro"](*PIXELES[cliente])
+        assert resultados.loc[i, "lat"] == pytest.approx(lat) and resultados.loc[i, "lon"] == pytest.approx(lon)
+
+        esperado = evaluar_proyecto(consumo, tarifa, pvout[i], ghi[i], 0.8, 0.75, 1.2, 20.0, 20, 0.08)
+        assert resultados.loc[i, "consumo_promedio_kWh"] == pytest.approx(consumo)
+        assert resultados.loc[i, "tarifa_mas_impuestos"] == pytest.approx(tarifa)
+        assert resultados.loc[i, "tamano_sistema_kWp"] == pytest.approx(esperado["tamano_sistema_kWp"])
+        assert resultados.loc[i, "van"] == pytest.approx(esperado["van"])
+
+
+def test_agregar_por_cliente():
+    df = pd.DataFrame({"Cliente": ["x", "x", "y"], "Fecha": ["2023-01-01", "2023-02-01", "2023-01-01"],
+                       "Consumo subtotal": [100.0, 200.0, 50.0], "Monto": [9.0, 18.0, 4.5],
+                       "Total_pagar": [12.0, 24.0, 6.0], "lat": [-2.0, -2.0, -1.0], "lon": [-80.0, -80.0, -79.0]})
+    sitios = agregar_por_sitio(df, "Cliente")
+    assert sitios["meses"].tolist() == [2, 1]
+    np.testing.assert_allclose(sitios["consumo_promedio_kWh"], [150.0, 50.0])
+    np.testing.assert_allclose(sitios["tarifa_mas_impuestos"], [0.12, 0.12])
+    np.testing.assert_allclose(sitios["lat"], [-2.0, -1.0])
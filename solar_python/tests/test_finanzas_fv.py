@@ -0,0 +1,75 @@
+# finanzas_fv contra numpy_financial fila por fila
+import numpy as np
+import pytest
+
+from finanzas_fv import indicadores_lote, payback_lote, tir_lote, van_lote
+
+npf = pytest.importorskip("numpy_financial")
+
+
+def flujos_prueba():
+    # Proyectos FV típicos al azar más casos borde: sin cambio de signo (TIR NaN) y sin payback
+    rng = np.random.default_rng(0)
+    inversion = rng.uniform(1000, 20000, 200)
+    ahorro = inversion * rng.uniform(0.02, 0.4, 200)
+    aleatorios = np.column_stack([-inversion, ahorro[:, None] * (1.03 ** np.arange(20)) - 20])
+    bordes = np.array([
+        [-1000] + [-10] * 20,       # nunca hay ingresos: sin cambio de signo
+        [1000] + [10] * 20,         # todo positivo: sin cambio de signo
+        [-5000] + [100] * 20,       # recupera 2000 de 5000: TIR negativa y sin payback
+        [-1000] + [50] * 20,        # recupera exactamente la inversión en el año 20
+        [-1000, 1000] + [0] * 19,   # payback en el año 1 exacto
+    ], dtype=float)
+    return np.vstack([aleatorios, bordes])
+
+
+def payback_referencia(flujo):
+    # Bucle sencillo: primer año con acumulado >= 0, interpolando dentro de ese año
+    acumulado = 0.0
+    for anio, valor in enumerate(flujo):
+        anterior, acumulado = acumulado, acumulado + valor
+        if acumulado >= 0:
+            return (0.0 if anio == 0 else anio - 1 - anterior / valor), anio
+    return np.nan, np.nan
+
+
+def test_van_igual_a_npf():
+    flujos = flujos_prueba()
+    tasas = np.linspace(0.0, 0.15, flujos.shape[0])
+    esperado = np.array([npf.npv(t, f) for t, f in zip(tasas, flujos)])
+    np.testing.assert_allclose(van_lote(flujos, tasas), esperado, rtol=1e-10, atol=1e-8)
+    np.testing.assert_allclose(van_lote(flujos, 0.08), [npf.npv(0.08, f) for f in flujos], rtol=1e-10, atol=1e-8)
+
+
+def test_tir_igual_a_npf():
+    flujos = flujos_prueba()
+    tir, convergio = tir_lote(flujos)
+    esperado = np.array([npf.irr(f) for f in flujos])
+    np.testing.assert_allclose(tir, esperado, rtol=1e-7, atol=1e-9, equal_nan=True)
+    np.testing.assert_array_equal(convergio, np.isfinite(esperado))
+
+
+def test_tir_sin_cambio_de_signo_es_nan():
+    tir, convergio = tir_lote(np.array([[-1000] + [-10] * 20, [1000] + [10] * 20], dtype=float))
+    assert np.isnan(tir).all()
+    assert not convergio.any()
+    assert np.isnan(npf.irr([-1000] + [-10] * 20))
+
+
+def test_payback_igual_a_bucle():
+    flujos = flujos_prueba()
+    payback, anio = payback_lote(flujos)
+    esperado = np.array([payback_referencia(f) for f in flujos])
+    np.testing.assert_allclose(payback, esperado[:, 0], rtol=1e-12, equal_nan=True)
+    np.testing.assert_array_equal(anio, esperado[:, 1])
+    assert np.isnan(payback[-3]) and np.isnan(anio[-3])
+    assert payback[-2] == 20 and payback[-1] == 1
+
+
+def test_indicadores_lote():
+    flujos = flujos_prueba()
+    indicadores = indicadores_lote(flujos, 0.08)
+    np.testing.assert_allclose(indicadores["van"], [npf.npv(0.08, f) for f in flujos], rtol=1e-10, atol=1e-8)
+    np.testing.assert_allclose(indicadores["tir"], [npf.irr(f) for f in flujos], rtol=1e-7, atol=1e-9,
+                               equal_nan=True)
+    np.testing.assert_array_equal(indicadores["payback"], payback_lote(flujos)[0])
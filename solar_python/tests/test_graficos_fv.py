@@ -0,0 +1,25 @@
+# Figuras armadas por trazas en caché: una traza se reutiliza solo si sus datos no cambian
+import pytest
+
+from cache_fv import CacheEscenarios
+
+pytest.importorskip("plotly")
+
+from graficos_fv import figura_flujo_caja  # noqa: E402
+
+
+def test_flujo_caja_sigue_la_vida_util():
+    cache = CacheEscenarios()
+    flujo = [-1000.0] + [100.0] * 25
+    larga = figura_flujo_caja(cache, flujo, 25)
+    corta = figura_flujo_caja(cache, flujo, 20)
+    assert len(larga.data[0].x) == len(larga.data[1].x) == 26
+    assert len(corta.data[0].x) == len(corta.data[1].x) == 21
+    assert "20 años" in corta.layout.title.text
+
+
+def test_flujo_caja_reutiliza_la_figura():
+    cache = CacheEscenarios()
+    flujo = [-1000.0] + [150.0] * 20
+    assert figura_flujo_caja(cache, flujo, 20) is figura_flujo_caja(cache, list(flujo), 20)
+    assert figura_flujo_caja(cache, flujo, 20) is not figura_flujo_caja(cache, [-900.0] + [150.0] * 20, 20)
@@ -0,0 +1,63 @@
+# grilla_fv: escritura de la grilla binaria y consulta por memmap contra los rasters
+import numpy as np
+import pytest
+
+from grilla_fv import ALINEACION, NOMBRES_BANDAS, GrillaFV, construir_grilla
+
+
+@pytest.fixture(scope="module")
+def grilla(tmp_path_factory, rasters):
+    ruta = tmp_path_factory.mktemp("grilla") / "grilla_fv.bin"
+    encabezado = construir_grilla(str(ruta), rasters["pvout"], rasters["ghi"])
+    return ruta, encabezado
+
+
+def test_encabezado_y_alineacion(grilla, rasters):
+    ruta, encabezado = grilla
+    assert (encabezado["alto"], encabezado["ancho"]) == rasters["datos_ghi"].shape
+    assert encabezado["bandas"] == NOMBRES_BANDAS
+    assert encabezado["offset_datos"] % ALINEACION == 0 and encabezado["offset_mascara"] % ALINEACION == 0
+    assert GrillaFV(ruta).encabezado == encabezado
+
+
+def test_consulta_igual_a_los_rasters(grilla, rasters):
+    g = GrillaFV(grilla[0])
+    filas, cols = np.mgrid[0:g.alto, 0:g.ancho]
+    lat, lon = rasters["centro"](filas.ravel(), cols.ravel())
+    pvout, ghi = g.consultar(lat, lon)
+
+    esperado_pvout = rasters["datos_pvout"].reshape(12, -1).T
+    np.testing.assert_array_equal(pvout, esperado_pvout)
+    np.testing.assert_array_equal(ghi, rasters["datos_ghi"].ravel())
+    np.testing.assert_array_equal(g.mascara, np.isfinite(rasters["datos_ghi"]))
+
+
+def test_consulta_coincide_con_rasters_fv(grilla, rasters):
+    from rasters_fv import cargar_cubo_ghi, cargar_cubo_pvout, muestrear_sitios
+
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-1.6, 0.6, 200)       # incluye puntos fuera de la grilla
+    lon = rng.uniform(-81.1, -78.5, 200)
+    pvout, ghi = GrillaFV(grilla[0]).consultar(lat, lon)
+    esperado_pvout, esperado_ghi = muestrear_sitios(lat, lon, cargar_cubo_pvout(rasters["pvout"]),
+                                                    cargar_cubo_ghi(rasters["ghi"]))
+    np.testing.assert_array_equal(pvout, esperado_pvout)
+    np.testing.assert_array_equal(ghi, esperado_ghi)
+    assert np.isnan(ghi).any() and np.isfinite(ghi).any()
+
+
+def test_float16(tmp_path, rasters):
+    ruta = tmp_path / "grilla16.bin"
+    construir_grilla(str(ruta), rasters["pvout"], rasters["ghi"], "float16")
+    g = GrillaFV(ruta)
+    assert g.datos.dtype == np.float16
+    pvout, ghi = g.consultar(*rasters["centro"](10, 20))
+    np.testing.assert_allclose(pvout[0], rasters["datos_pvout"][:, 10, 20], rtol=1e-3)
+    assert ghi.dtype == np.float32
+
+
+def test_archivo_invalido(tmp_path):
+    ruta = tmp_path / "otro.bin"
+    ruta.write_bytes(b"no es una grilla")
+    with pytest.raises(ValueError):
+        GrillaFV(ruta)
@@ -0,0 +1,57 @@
+# horario_fv: las series horarias respetan los totales mensuales y el balance cierra
+import numpy as np
+import pytest
+
+from horario_fv import (DIAS_MES, HORAS_ANIO, balance_horario, carga_horaria, dia_tipico, generacion_horaria,
+                        perfil_solar, simular_horario, sumar_por_mes)
+
+VALORES_MENSUALES = np.array([118.0, 104.0, 121.0, 113.0, 116.0, 109.0, 120.0, 127.0, 125.0, 124.0, 117.0, 119.0])
+CONSUMO_MENSUAL = np.array([160.0, 150.0, 170.0, 140.0, 130.0, 120.0, 125.0, 135.0, 150.0, 165.0, 170.0, 185.0])
+
+
+def test_perfil_solar_de_dia():
+    perfil = perfil_solar(-2.19, -79.89)    # Guayaquil
+    assert perfil.shape == (1, HORAS_ANIO)
+    assert (perfil >= 0).all()
+    diario = perfil[0].reshape(365, 24)
+    # De noche no hay sol y el máximo cae cerca del mediodía
+    assert (diario[:, :5] == 0).all() and (diario[:, 20:] == 0).all()
+    assert set(np.argmax(diario, axis=1)) <= {11, 12}
+
+
+def test_series_respetan_los_totales_mensuales():
+    lat, lon = np.array([-2.19, -0.18]), np.array([-79.89, -78.47])
+    generacion_mensual = np.stack([VALORES_MENSUALES * 2.0, VALORES_MENSUALES * 3.5])
+    generacion = generacion_horaria(lat, lon, generacion_mensual)
+    carga = carga_horaria(np.stack([CONSUMO_MENSUAL, CONSUMO_MENSUAL * 2]))
+    assert generacion.shape == carga.shape == (2, HORAS_ANIO)
+    np.testing.assert_allclose(sumar_por_mes(generacion), generacion_mensual)
+    np.testing.assert_allclose(sumar_por_mes(carga)[1], CONSUMO_MENSUAL * 2)
+
+
+def test_balance_cierra():
+    resultado = simular_horario(-2.19, -79.89, VALORES_MENSUALES, 1.5, CONSUMO_MENSUAL, factor_perdidas=0.8,
+                                tarifa=0.117, tarifa_excedente=0.05)
+    np.testing.assert_allclose(resultado["generacion"], [VALORES_MENSUALES * 1.5 * 0.8])
+    np.testing.assert_allclose(resultado["autoconsumo"] + resultado["excedente"], resultado["generacion"])
+    np.testing.assert_allclose(resultado["autoconsumo"] + resultado["deficit"], resultado["consumo"])
+    assert (resultado["autoconsumo"] <= np.minimum(resultado["generacion"], resultado["consumo"]) + 1e-9).all()
+    np.testing.assert_allclose(resultado["ahorro"],
+                               resultado["autoconsumo"] * 0.117 + resultado["excedente"] * 0.05)
+    assert 0 < resultado["fraccion_autoconsumo"][0] < 1
+    assert resultado["fraccion_autosuficiencia"][0] == pytest.approx(
+        resultado["autoconsumo"].sum() / CONSUMO_MENSUAL.sum())
+
+
+def test_sin_tarifa_excedente_todo_a_tarifa():
+    resultado = balance_horario(np.full((1, HORAS_ANIO), 2.0), np.ones((1, HORAS_ANIO)), tarifa=0.1)
+    np.testing.assert_allclose(resultado["ahorro"], resultado["generacion"] * 0.1)
+    np.testing.assert_allclose(resultado["excedente"], resultado["consumo"])
+
+
+def test_dia_tipico():
+    carga = carga_horaria(CONSUMO_MENSUAL)
+    for mes in (1, 2, 12):
+        dia = dia_tipico(carga, mes)
+        assert dia.shape == (1, 24)
+        assert dia.sum() == pytest.approx(CONSUMO_MENSUAL[mes - 1] / DIAS_MES[mes - 1])
@@ -0,0 +1,30 @@
+# Importación diferida: los módulos no cargan las librerías pesadas hasta que se usan
+import os
+import subprocess
+import sys
+
+import pytest
+
+CARPETA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PESADAS = {"plotly", "folium", "streamlit_folium", "reportlab", "rasterio", "kaleido", "scipy"}
+
+
+def modulos_cargados(modulo):
+    # Importa modulo en un proceso nuevo y devuelve las librerías pesadas que quedaron cargadas
+    codigo = ("import sys; sys.path.insert(0, {!r}); import {}; "
+              "print(' '.join(sorted({{m.split('.')[0] for m in sys.modules}})))").format(CARPETA, modulo)
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    return set(salida.stdout.split()) & PESADAS
+
+
+@pytest.mark.parametrize("modulo", ["motor_fv", "finanzas_fv", "lote_fv", "rasters_fv", "grilla_fv",
+                                    "graficos_fv", "mapas_fv", "reportes_fv", "mapa_nacional_fv",
+                                    "montecarlo_fv", "sensibilidad_fv", "horario_fv", "baterias_fv"])
+def test_modulos_sin_librerias_pesadas(modulo):
+    assert modulos_cargados(modulo) == set()
+
+
+def test_app_sin_librerias_pesadas():
+    pytest.importorskip("streamlit")
+    # streamlit importa plotly por su cuenta; el resto solo se carga al dibujar o exportar
+    assert modulos_cargados("analisis_fv") - {"plotly"} == set()
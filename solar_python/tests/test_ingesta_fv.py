@@ -0,0 +1,71 @@
+# ingesta_fv.ingerir contra el camino original (read_csv completo + preparar_consumo)
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingesta_fv import ingerir
+from motor_fv import preparar_consumo
+
+
+def csv_facturas(ruta, clientes=5000):
+    # Una factura por cliente y mes. Los primeros ~1.5 MB tienen identificadores numéricos y
+    # consumos enteros; al final aparecen identificadores de texto ("ABC", "0042") y consumos
+    # con decimales, que un tipo inferido del primer bloque no admitiría.
+    rng = np.random.default_rng(4)
+    filas = []
+    for cliente in [str(1000 + i) for i in range(clientes)] + ["ABC", "0042"]:
+        texto = not cliente.isdigit() or cliente.startswith("0")
+        for mes in range(1, 13):
+            consumo = rng.integers(50, 400) + (0.5 if texto else 0)
+            monto = consumo * 0.092
+            fecha = f"2023-{mes:02d}-15" if mes % 2 else f"15/{mes:02d}/2023 00:00"
+            filas.append((cliente, fecha, consumo, f"${monto:,.2f}", f"${monto * 1.27:,.2f}"))
+    pd.DataFrame(filas, columns=["Cliente", "Fecha", "Consumo subtotal", "Monto", "Total_pagar"]).to_csv(
+        ruta, index=False)
+    return ruta
+
+
+def referencia(ruta):
+    df = preparar_consumo(pd.read_csv(ruta, dtype={"Cliente": str}))
+    mensual = df.groupby(["Cliente", "Año", "Mes_num"], as_index=False)[
+        ["Consumo subtotal", "Monto", "Total_pagar"]].sum()
+    return mensual.sort_values(["Cliente", "Año", "Mes_num"]).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def archivo(tmp_path_factory):
+    return str(csv_facturas(tmp_path_factory.mktemp("ingesta") / "facturas.csv"))
+
+
+@pytest.mark.parametrize("usar_pyarrow", [False, True])
+def test_ingerir_igual_a_preparar_consumo(archivo, usar_pyarrow):
+    if usar_pyarrow:
+        pytest.importorskip("pyarrow")
+    resultado, resumen = ingerir(archivo, columna_id="Cliente", tamano_bloque=20_000, usar_pyarrow=usar_pyarrow)
+    esperado = referencia(archivo)
+
+    assert resumen["filas"] == len(esperado) and resumen["filas_descartadas"] == 0
+    assert resumen["bloques"] > 1
+    obtenido = resultado.sort_values(["Cliente", "Año", "Mes_num"]).reset_index(drop=True)
+    assert obtenido["Cliente"].tolist() == esperado["Cliente"].tolist()
+    assert {"ABC", "0042"} <= set(obtenido["Cliente"])
+    np.testing.assert_array_equal(obtenido["Año"], esperado["Año"])
+    np.testing.assert_array_equal(obtenido["Mes_num"], esperado["Mes_num"])
+    for columna in ["Consumo subtotal", "Monto", "Total_pagar"]:
+        np.testing.assert_allclose(obtenido[columna].to_numpy(dtype=float), esperado[columna], rtol=1e-12)
+    assert obtenido["Consumo subtotal"].dtype == np.float64
+
+
+def test_ingerir_un_cliente_igual_a_preparar_consumo(tmp_path):
+    # Sin columna de cliente el resultado es directamente la tabla mensual de la app
+    ruta = tmp_path / "cliente.csv"
+    pd.DataFrame({
+        "Fecha": ["2023-03-01", "2023-01-01", "02/01/2023", "2023-04-01"],
+        "Consumo subtotal": [120, 98, 101, 130.5],
+        "Monto": ["$11.04", "$9.02", "$9.29", "$1,012.01"],
+        "Total_pagar": ["$14.02", "$11.46", "$11.80", "$1,285.25"],
+    }).to_csv(ruta, index=False)
+    resultado, _ = ingerir(str(ruta))
+    esperado = preparar_consumo(pd.read_csv(ruta)).reset_index(drop=True)
+    for columna in ["Fecha", "Consumo subtotal", "Monto", "Total_pagar", "Año", "Mes_num", "Mes"]:
+        assert resultado[columna].tolist() == esperado[columna].tolist(), columna
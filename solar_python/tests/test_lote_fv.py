@@ -0,0 +1,69 @@
+# lote_fv: ida y vuelta de un CSV pequeño por la línea de comandos, contra evaluar_proyecto
+import numpy as np
+import pandas as pd
+import pytest
+
+import lote_fv
+from motor_fv import evaluar_proyecto
+
+PIXELES = {"A": (10, 20), "B": (30, 40), "C": (20, 2)}     # C cae en el mar (nodata)
+
+
+@pytest.fixture
+def entrada(tmp_path, rasters):
+    filas = []
+    for sitio, (fila, col) in PIXELES.items():
+        lat, lon = rasters["centro"](fila, col)
+        for mes, consumo in zip(range(1, 5), (150.0, 160.0, 140.0, 170.0)):
+            filas.append({"Sitio": sitio, "Fecha": f"2023-{mes:02d}-01", "Consumo subtotal": consumo,
+                          "Monto": f"${consumo * 0.09:.2f}", "Total_pagar": f"${consumo * 0.117:.2f}",
+                          "lat": lat, "lon": lon})
+    ruta = tmp_path / "sitios.csv"
+    pd.DataFrame(filas).to_csv(ruta, index=False)
+    return ruta
+
+
+def ejecutar(entrada, salida, rasters, *opciones):
+    lote_fv.main([str(entrada), str(salida), "--rasters", rasters["pvout"], "--ghi", rasters["ghi"],
+                  "--tamano-bloque", "2", *opciones])
+    if str(salida).endswith(".parquet"):
+        return pd.read_parquet(salida)
+    return pd.read_csv(salida)
+
+
+def test_csv_ida_y_vuelta(tmp_path, rasters, entrada):
+    resultado = ejecutar(entrada, tmp_path / "resultados.csv", rasters)
+    assert resultado["Sitio"].tolist() == list(PIXELES)
+    assert resultado["meses"].tolist() == [4, 4, 4]
+    assert resultado["estado"].tolist() == ["ok", "ok", "fuera_del_raster"]
+
+    for i, (fila, col) in enumerate(list(PIXELES.values())[:2]):
+        pvout = rasters["datos_pvout"][:, fila, col].astype(float)
+        ghi = float(rasters["datos_ghi"][fila, col])
+        esperado = evaluar_proyecto(155.0, 0.117, pvout, ghi, 0.8, 0.75, 1.2, 20, 20, 0.08)
+        assert resultado.loc[i, "radiacion_diaria"] == pytest.approx(ghi)
+        assert resultado.loc[i, "tamano_sistema_kWp"] == pytest.approx(esperado["tamano_sistema_kWp"])
+        assert resultado.loc[i, "van"] == pytest.approx(esperado["van"])
+        assert resultado.loc[i, "anio_payback"] == esperado["payback_anio"]
+
+
+def test_lectura_por_bloques_y_procesos_dan_lo_mismo(tmp_path, rasters, entrada):
+    base = ejecutar(entrada, tmp_path / "base.csv", rasters)
+    sin_cubo = ejecutar(entrada, tmp_path / "sin_cubo.csv", rasters, "--sin-cubo")
+    paralelo = ejecutar(entrada, tmp_path / "paralelo.csv", rasters, "--procesos", "2")
+    pd.testing.assert_frame_equal(base, sin_cubo)
+    pd.testing.assert_frame_equal(base, paralelo)
+
+
+def test_parquet_ida_y_vuelta(tmp_path, rasters, entrada):
+    pytest.importorskip("pyarrow")
+    csv = ejecutar(entrada, tmp_path / "resultados.csv", rasters)
+    pd.DataFrame(pd.read_csv(entrada)).to_parquet(tmp_path / "sitios.parquet")
+    parquet = ejecutar(tmp_path / "sitios.parquet", tmp_path / "resultados.parquet", rasters)
+    np.testing.assert_allclose(parquet["van"], csv["van"])
+    assert parquet["estado"].tolist() == csv["estado"].tolist()
+
+
+def test_bilineal_requiere_el_cubo(tmp_path, rasters, entrada):
+    with pytest.raises(SystemExit):
+        ejecutar(entrada, tmp_path / "x.csv", rasters, "--bilineal", "--sin-cubo")
@@ -0,0 +1,68 @@
+# mapa_nacional_fv: teselas que cubren la grilla y evaluación de cada tesela contra evaluar_bloque
+import numpy as np
+import pandas as pd
+import pytest
+
+from lote_fv import evaluar_bloque
+from mapa_nacional_fv import CAPAS, evaluar_tesela, teselas
+
+PARAMETROS = {"consumo_promedio_kWh": 150.0, "tarifa_mas_impuestos": 0.117, "objetivo_cobertura": 0.75,
+              "factor_perdidas": 0.8, "costo_Wp": 1.2, "mantenimiento_anual": 20.0, "tasa_descuento": 0.08,
+              "años_proyecto": 20}
+
+
+@pytest.mark.parametrize("alto, ancho, tamano", [(40, 48, 16), (40, 48, 256), (7, 5, 3), (1, 1, 4)])
+def test_teselas_cubren_la_grilla_sin_solaparse(alto, ancho, tamano):
+    cubierta = np.zeros((alto, ancho), dtype=int)
+    for fila, col, alto_v, ancho_v in teselas(alto, ancho, tamano):
+        assert 0 < alto_v <= tamano and 0 < ancho_v <= tamano
+        cubierta[fila:fila + alto_v, col:col + ancho_v] += 1
+    assert (cubierta == 1).all()
+
+
+def esperado_en_ventana(rasters, ventana):
+    fila, col, alto, ancho = ventana
+    pvout = rasters["datos_pvout"][:, fila:fila + alto, col:col + ancho].transpose(1, 2, 0)
+    ghi = rasters["datos_ghi"][fila:fila + alto, col:col + ancho]
+    validos = np.isfinite(ghi)
+    bloque = pd.DataFrame({"consumo_promedio_kWh": np.full(validos.sum(), 150.0),
+                           "tarifa_mas_impuestos": np.full(validos.sum(), 0.117)})
+    return validos, evaluar_bloque(bloque, pvout[validos].astype(float), ghi[validos].astype(float), PARAMETROS)
+
+
+@pytest.mark.parametrize("ventana", [(0, 0, 16, 16), (16, 32, 16, 16), (32, 0, 8, 20)])
+def test_evaluar_tesela_igual_a_evaluar_bloque(rasters, ventana):
+    devuelta, capas = evaluar_tesela(ventana, rasters["pvout"], rasters["ghi"], PARAMETROS)
+    assert devuelta == ventana and set(capas) == set(CAPAS)
+    validos, esperado = esperado_en_ventana(rasters, ventana)
+    for nombre, capa in capas.items():
+        assert capa.shape == ventana[2:] and capa.dtype == np.float32
+        assert np.isnan(capa[~validos]).all()
+        np.testing.assert_allclose(capa[validos], esperado[nombre].to_numpy(), rtol=1e-5)
+
+
+def test_generar_mapa_nacional(tmp_path, rasters):
+    import rasterio
+    from mapa_nacional_fv import capas_disponibles, generar_mapa_nacional
+
+    celdas = generar_mapa_nacional(str(tmp_path), PARAMETROS, tamano_tesela=16,
+                                   ruta_rasters=rasters["pvout"], ruta_ghi=rasters["ghi"])
+    assert celdas == int(np.isfinite(rasters["datos_ghi"]).sum())
+
+    validos, esperado = esperado_en_ventana(rasters, (0, 0, 40, 48))
+    with rasterio.open(tmp_path / "van.tif") as src:
+        van = src.read(1)
+        assert src.tags()["capa"] == "van"
+    np.testing.assert_allclose(van[validos], esperado["van"].to_numpy(), rtol=1e-5)
+    assert np.isnan(van[~validos]).all()
+
+    leyendas = capas_disponibles(str(tmp_path))
+    assert len(leyendas) == len(CAPAS)
+    assert all("150 kWh/mes" in leyenda for leyenda in leyendas)
+
+
+def test_ghi_faltante(tmp_path, rasters):
+    from mapa_nacional_fv import generar_mapa_nacional
+    with pytest.raises(FileNotFoundError):
+        generar_mapa_nacional(str(tmp_path), PARAMETROS, ruta_rasters=rasters["pvout"],
+                              ruta_ghi=str(tmp_path / "no_existe.tif"))
@@ -0,0 +1,54 @@
+# mapas_fv: capa raster del mapa base y marcador independiente
+import numpy as np
+import pytest
+
+from mapas_fv import COLORES_PVOUT, imagen_pvout, imagen_raster
+
+
+@pytest.fixture(scope="module")
+def cubo(rasters):
+    from rasters_fv import cargar_cubo_pvout
+    return cargar_cubo_pvout(rasters["pvout"])
+
+
+def test_imagen_pvout(cubo, rasters):
+    imagen, limites, (vmin, vmax) = imagen_pvout(cubo, opacidad=0.5)
+    assert imagen.shape == (cubo.alto, cubo.ancho, 4) and imagen.dtype == np.uint8
+
+    # Transparente donde no hay datos, opacidad pedida en el resto
+    validos = np.isfinite(rasters["datos_ghi"])
+    assert (imagen[~validos, 3] == 0).all() and (imagen[validos, 3] == 128).all()
+
+    anual = rasters["datos_pvout"].sum(axis=0)[validos]
+    assert (vmin, vmax) == pytest.approx(tuple(np.percentile(anual, [2, 98])), rel=1e-5)
+    # Extremos de la escala en los colores de los extremos
+    minimo = np.unravel_index(np.nanargmin(np.where(validos, rasters["datos_pvout"].sum(axis=0), np.nan)), validos.shape)
+    np.testing.assert_array_equal(imagen[minimo][:3], COLORES_PVOUT[0])
+
+    (sur, oeste), (norte, este) = limites
+    assert (oeste, norte) == pytest.approx((-81.0, 0.5))
+    assert (este, sur) == pytest.approx((-81.0 + 0.05 * cubo.ancho, 0.5 - 0.05 * cubo.alto))
+
+
+def test_imagen_pvout_submuestreada(cubo):
+    imagen, limites, _ = imagen_pvout(cubo, max_pixeles=16)
+    assert max(imagen.shape[:2]) <= 16
+    assert limites == imagen_pvout(cubo)[1]
+
+
+def test_imagen_raster(rasters):
+    imagen, limites, _ = imagen_raster(rasters["ghi"], max_pixeles=24)
+    assert max(imagen.shape[:2]) <= 24
+    assert limites[0] == pytest.approx([0.5 - 0.05 * 40, -81.0]) and limites[1] == pytest.approx([0.5, -81.0 + 0.05 * 48])
+    assert (imagen[:, 0, 3] == 0).all() and (imagen[:, -1, 3] > 0).all()
+
+
+def test_mapa_base_y_marcador():
+    pytest.importorskip("folium")
+    from mapas_fv import mapa_base, marcador
+
+    mapa = mapa_base(capturar_clics=True)
+    assert "LatLngPopup" in {type(hijo).__name__ for hijo in mapa._children.values()}
+    grupo = marcador(-2.19, -79.89, "<b>Sitio</b>", "Guayaquil")
+    (pin,) = grupo._children.values()
+    assert pin.location == [-2.19, -79.89]
@@ -0,0 +1,73 @@
+# Monte Carlo: percentiles del histograma por bloques contra np.percentile de todas las muestras
+import numpy as np
+import pytest
+
+from finanzas_fv import indicadores_lote
+from montecarlo_fv import (BINS, INCERTIDUMBRE, PERCENTILES, HistogramaStreaming, flujos_sorteados,
+                           simular_montecarlo, sortear_parametros)
+from motor_fv import proyectar_escenarios
+
+ARGUMENTOS = dict(tamano_sistema_kWp=1.2, produccion_kWp_anio=1300.0, tarifa=0.117, costo_Wp=1.2,
+                  mantenimiento_anual=20.0, años_proyecto=20, tasa_descuento=0.08, factor_perdidas=0.8)
+
+
+@pytest.mark.parametrize("muestras", [
+    np.random.default_rng(0).normal(200, 80, 50_000),
+    np.random.default_rng(1).lognormal(0, 1, 50_000),       # asimétrica, con cola larga
+])
+def test_percentiles_como_np_percentile(muestras):
+    histograma = HistogramaStreaming()
+    for bloque in np.array_split(muestras, 7):
+        histograma.agregar(bloque)
+
+    ancho_bin = histograma.bordes[1] - histograma.bordes[0]
+    for q in (1, 10, 25, 50, 75, 90, 99):
+        assert abs(histograma.percentil(q) - np.percentile(muestras, q)) <= 2 * ancho_bin
+    resumen = histograma.resumen()
+    assert resumen["n"] == muestras.size
+    assert resumen["media"] == pytest.approx(muestras.mean())
+    assert (resumen["minimo"], resumen["maximo"]) == (muestras.min(), muestras.max())
+    assert histograma.conteos.sum() == muestras.size and histograma.conteos.size == BINS
+
+    centros, conteos = histograma.agrupado(bins=60)
+    assert conteos.sum() == muestras.size and len(centros) == len(conteos) <= 60
+
+
+def test_valores_fuera_de_rango_y_no_finitos():
+    histograma = HistogramaStreaming(margen=0.1)
+    histograma.agregar([0.0, 1.0, np.nan, np.inf])
+    histograma.agregar([100.0, -100.0])       # fuera del rango del primer bloque: bins extremos
+    assert histograma.n == 4
+    assert histograma.conteos[0] == 1 and histograma.conteos[-1] == 1
+    assert (histograma.minimo, histograma.maximo) == (-100.0, 100.0)
+    assert -100.0 <= histograma.percentil(0) <= histograma.percentil(100) <= 100.0
+    assert np.isnan(HistogramaStreaming().percentil(50))
+
+
+def test_simulacion_igual_a_todas_las_muestras():
+    # Se repiten los mismos sorteos en un solo arreglo y se comparan los percentiles
+    resultado = simular_montecarlo(**ARGUMENTOS, sorteos=30_000, tamano_bloque=7_000, semilla=3)
+    rng = np.random.default_rng(3)
+    van = []
+    for inicio in range(0, 30_000, 7_000):
+        n = min(7_000, 30_000 - inicio)
+        parametros = sortear_parametros(rng, n, 20, 0.8, 20.0)
+        flujos = flujos_sorteados(parametros, 1.2, 1300.0, 0.117, 1.2, 20, 0.8)
+        van.append(indicadores_lote(flujos, 0.08)["van"])
+    van = np.concatenate(van)
+
+    rango = van.max() - van.min()
+    for nombre, q in PERCENTILES.items():
+        assert resultado["van"][nombre] == pytest.approx(np.percentile(van, q), abs=3 * 3 * rango / BINS)
+    assert resultado["van"]["media"] == pytest.approx(van.mean())
+    assert resultado["prob_van_negativo"] == (van < 0).mean()
+    assert resultado["van"]["P90"] <= resultado["van"]["P50"] <= resultado["van"]["P10"]
+
+
+def test_sin_incertidumbre_da_el_caso_base():
+    sin_incertidumbre = {nombre: 0.0 for nombre in INCERTIDUMBRE}
+    resultado = simular_montecarlo(**ARGUMENTOS, sorteos=1_000, incertidumbre=sin_incertidumbre)
+    base = proyectar_escenarios(1.2, 1300.0, 0.117, 1.2, 20.0, 20, tasa_descuento=0.08)["van"][0]
+    for nombre in PERCENTILES:
+        assert resultado["van"][nombre] == pytest.approx(base)
+    assert resultado["van"]["minimo"] == pytest.approx(base) == resultado["van"]["maximo"]
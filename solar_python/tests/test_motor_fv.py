@@ -0,0 +1,130 @@
+# motor_fv contra la cadena escalar original de main(): dimensionamiento, flujo de caja e indicadores
+import numpy as np
+import pandas as pd
+import pytest
+
+from motor_fv import (DEGRADACION_ANUAL, INCREMENTO_TARIFA, MESES_ES, calcular_cobertura, consumo_por_mes,
+                      dimensionar_sistema, evaluar_proyecto, preparar_consumo, proyectar_escenarios,
+                      tarifas_consumo)
+
+VALORES_MENSUALES = np.array([118.0, 104.0, 121.0, 113.0, 116.0, 109.0, 120.0, 127.0, 125.0, 124.0, 117.0, 119.0])
+
+
+def flujo_original(consumo_promedio_kWh, tarifa, valores_mensuales, radiacion_diaria, factor_perdidas,
+                   objetivo_cobertura, costo_Wp, mantenimiento_anual, años_proyecto):
+    # Bucle de main() antes de motor_fv, tal como estaba en analisis_fv.py
+    promedio_anual = np.mean(valores_mensuales)
+    factores_relativos = valores_mensuales / promedio_anual
+    produccion_por_kWp = promedio_anual * factor_perdidas
+    tamano_sistema_kWp = consumo_promedio_kWh / produccion_por_kWp * objetivo_cobertura
+    inversion_usd = tamano_sistema_kWp * 1000 * costo_Wp
+
+    produccion_prom_kWp_mes = radiacion_diaria * 30 * factor_perdidas
+    tarifa_actual = tarifa
+    ahorros = []
+    for anio in range(1, años_proyecto + 1):
+        produccion_mensual = tamano_sistema_kWp * produccion_prom_kWp_mes * factores_relativos * (1 - 0.005) ** (anio - 1)
+        ahorros.append(np.sum(produccion_mensual) * tarifa_actual - mantenimiento_anual)
+        tarifa_actual *= (1 + 0.02)
+    return tamano_sistema_kWp, [-inversion_usd] + ahorros
+
+
+def test_constantes_de_la_proyeccion():
+    assert INCREMENTO_TARIFA == 0.02 and DEGRADACION_ANUAL == 0.005
+
+
+@pytest.mark.parametrize("consumo, cobertura, perdidas", [(150, 0.75, 0.8), (420, 1.0, 0.85), (60, 0.3, 0.7)])
+def test_evaluar_proyecto_igual_a_main(consumo, cobertura, perdidas):
+    argumentos = (consumo, 0.117, VALORES_MENSUALES, 4.6, perdidas, cobertura, 1.2, 20.0, 20)
+    tamano, flujo = flujo_original(*argumentos)
+    resultado = evaluar_proyecto(*argumentos, tasa_descuento=0.08)
+
+    assert resultado["tamano_sistema_kWp"] == pytest.approx(tamano)
+    assert resultado["inversion_usd"] == pytest.approx(-flujo[0])
+    np.testing.assert_allclose(resultado["flujo_de_caja"], flujo, rtol=1e-12)
+    assert resultado["valido"]
+
+    npf = pytest.importorskip("numpy_financial")
+    assert resultado["van"] == pytest.approx(npf.npv(0.08, flujo))
+    assert resultado["tir"] == pytest.approx(npf.irr(flujo))
+
+
+def test_evaluar_proyecto_flujo_invalido():
+    resultado = evaluar_proyecto(150, np.nan, VALORES_MENSUALES, 4.6, 0.8, 0.75, 1.2, 20.0, 20, 0.08)
+    assert not resultado["valido"] and resultado["van"] is None and resultado["tir"] is None
+
+
+def test_dimensionar_varios_sitios():
+    # N sitios a la vez dan lo mismo que uno por uno
+    valores = np.stack([VALORES_MENSUALES, VALORES_MENSUALES * 0.8, VALORES_MENSUALES * 1.1])
+    consumos = np.array([150.0, 300.0, 90.0])
+    lote = dimensionar_sistema(consumos, valores, 0.8, 0.75)
+    for i in range(3):
+        uno = dimensionar_sistema(consumos[i], valores[i], 0.8, 0.75)
+        assert lote["tamano_sistema_kWp"][i] == pytest.approx(uno["tamano_sistema_kWp"])
+        np.testing.assert_allclose(lote["factores_relativos"][i], uno["factores_relativos"])
+
+
+def test_preparar_consumo_y_tarifas():
+    df = pd.DataFrame({
+        "Fecha": ["2023-03-01", "2023-01-01", "02/01/2023"],
+        "Consumo subtotal": [120.0, 100.0, 110.0],
+        "Monto": ["$11.04", "$9.20", "$1,012.015"],
+        "Total_pagar": ["$14.02", "$11.46", "$12.00"],
+    })
+    df = preparar_consumo(df)
+    assert df["Mes"].tolist() == [MESES_ES[1], MESES_ES[2], MESES_ES[3]]
+    assert df["Monto"].tolist() == [9.2, 1012.02, 11.04]
+    consumo, tarifa, tarifa_mas_impuestos = tarifas_consumo(df)
+    assert consumo == pytest.approx(110.0)
+    assert tarifa_mas_impuestos == pytest.approx((14.02 + 11.46 + 12.0) / 3 / 110.0)
+
+    # Los meses sin datos usan el promedio general
+    mensual = consumo_por_mes(df)
+    np.testing.assert_allclose(mensual[:3], [100.0, 110.0, 120.0])
+    np.testing.assert_allclose(mensual[3:], 110.0)
+
+
+def test_calcular_cobertura():
+    df = pd.DataFrame({"Mes_num": [1, 2], "Consumo subtotal": [200.0, 100.0]})
+    df = calcular_cobertura(df, VALORES_MENSUALES, 1.5)
+    np.testing.assert_allclose(df["Generacion estimada (kWh)"], VALORES_MENSUALES[:2] * 1.5)
+    np.testing.assert_allclose(df["Cobertura (%)"], VALORES_MENSUALES[:2] * 1.5 / [200.0, 100.0] * 100)
+    np.testing.assert_allclose(df["Excedente (kWh)"], [0.0, VALORES_MENSUALES[1] * 1.5 - 100.0])
+
+
+##########
+# proyectar_escenarios: S escenarios vectorizados contra el bucle escalar
+
+def test_proyectar_escenarios_igual_al_bucle():
+    factor_perdidas = 0.8
+    tamanos = np.array([1.0, 2.5, 4.2])
+    produccion = np.sum(4.6 * 30 * factor_perdidas * VALORES_MENSUALES / VALORES_MENSUALES.mean())
+    resultado = proyectar_escenarios(tamanos, produccion, 0.117, 1.2, 20.0, 20, tasa_descuento=0.08)
+    assert resultado["flujos"].shape == (3, 21)
+
+    for i, tamano in enumerate(tamanos):
+        consumo = tamano * np.mean(VALORES_MENSUALES) * factor_perdidas  # cobertura 1 da este tamaño
+        _, flujo = flujo_original(consumo, 0.117, VALORES_MENSUALES, 4.6, factor_perdidas, 1.0, 1.2, 20.0, 20)
+        np.testing.assert_allclose(resultado["flujos"][i], flujo, rtol=1e-12)
+        descuento = 1.08 ** -np.arange(21)
+        assert resultado["van"][i] == pytest.approx(np.dot(flujo, descuento))
+
+
+def test_proyectar_escenarios_horizontes_mixtos():
+    resultado = proyectar_escenarios(2.0, 1500.0, [0.10, 0.15], 1.0, [10.0, 30.0], [5, 8],
+                                     tasa_descuento=[0.05, 0.10])
+    flujos = resultado["flujos"]
+    assert flujos.shape == (2, 9)
+    # Después del horizonte de cada escenario el flujo es cero y no altera el VAN
+    np.testing.assert_array_equal(flujos[0, 6:], 0.0)
+    for i, (tarifa, mantenimiento, años, tasa) in enumerate([(0.10, 10.0, 5, 0.05), (0.15, 30.0, 8, 0.10)]):
+        solo = proyectar_escenarios(2.0, 1500.0, tarifa, 1.0, mantenimiento, años, tasa_descuento=tasa)
+        np.testing.assert_allclose(flujos[i, :años + 1], solo["flujos"][0])
+        assert resultado["van"][i] == pytest.approx(solo["van"][0])
+
+
+def test_proyectar_escenarios_sin_tasa():
+    resultado = proyectar_escenarios(1.0, 1000.0, 0.1, 1.0, 0.0, 3)
+    assert resultado["van"] is None
+    np.testing.assert_allclose(resultado["flujos"][0], [-1000.0, 100.0, 100.0 * 0.995 * 1.02, 100.0 * (0.995 * 1.02) ** 2])
@@ -0,0 +1,68 @@
+# optimizar_tamano contra una búsqueda por fuerza bruta con evaluar_proyecto
+import numpy as np
+import pytest
+
+from motor_fv import evaluar_proyecto
+from optimizador_fv import optimizar_tamano
+
+VALORES_MENSUALES = np.array([118.0, 104.0, 121.0, 113.0, 116.0, 109.0, 120.0, 127.0, 125.0, 124.0, 117.0, 119.0])
+CONSUMO_MENSUAL = np.array([160.0, 150.0, 170.0, 140.0, 130.0, 120.0, 125.0, 135.0, 150.0, 165.0, 170.0, 185.0])
+COBERTURAS = np.round(np.arange(0.1, 1.51, 0.1), 2)
+PARAMETROS = dict(consumo_promedio_kWh=CONSUMO_MENSUAL.mean(), consumo_mensual=CONSUMO_MENSUAL,
+                  valores_mensuales=VALORES_MENSUALES, radiacion_diaria=4.6, factor_perdidas=0.8,
+                  tarifa=0.117, costo_Wp=1.2, mantenimiento_anual=20.0, años_proyecto=20,
+                  tasa_descuento=0.08, coberturas=COBERTURAS)
+
+
+def fuerza_bruta(tarifa_excedente=None):
+    return [evaluar_proyecto(CONSUMO_MENSUAL.mean(), 0.117, VALORES_MENSUALES, 4.6, 0.8, cobertura, 1.2, 20.0, 20,
+                             0.08, consumo_mensual=CONSUMO_MENSUAL, tarifa_excedente=tarifa_excedente)
+            for cobertura in COBERTURAS]
+
+
+@pytest.mark.parametrize("tarifa_excedente", [None, 0.04])
+def test_curva_igual_a_evaluar_proyecto(tarifa_excedente):
+    resultado = optimizar_tamano(**PARAMETROS, tarifa_excedente=tarifa_excedente)
+    curva = resultado["curva"]
+    proyectos = fuerza_bruta(tarifa_excedente)
+
+    np.testing.assert_allclose(curva["Tamaño (kWp)"], [p["tamano_sistema_kWp"] for p in proyectos])
+    np.testing.assert_allclose(curva["VAN"], [p["van"] for p in proyectos], rtol=1e-9)
+    np.testing.assert_allclose(curva["TIR"], [p["tir"] for p in proyectos], rtol=1e-6)
+
+    mejor = int(np.argmax([p["van"] for p in proyectos]))
+    assert resultado["encontrado"]
+    assert resultado["cobertura"] == COBERTURAS[mejor]
+    assert resultado["van"] == pytest.approx(proyectos[mejor]["van"])
+
+
+def test_excedente_barato_reduce_el_optimo():
+    # Si el excedente se paga poco, sobredimensionar deja de convenir
+    neto = optimizar_tamano(**PARAMETROS)
+    barato = optimizar_tamano(**PARAMETROS, tarifa_excedente=0.0)
+    assert barato["cobertura"] <= neto["cobertura"]
+    assert barato["cobertura"] <= 1.0
+
+
+def test_restricciones_de_area_y_presupuesto():
+    resultado = optimizar_tamano(**PARAMETROS, area_max_m2=3.0, presupuesto_max=1000.0)
+    curva = resultado["curva"]
+    esperado = (curva["Área (m²)"] <= 3.0) & (curva["Inversión (USD)"] <= 1000.0)
+    assert (curva["Factible"] == esperado).all()
+    assert resultado["encontrado"]
+    assert resultado["tamano_sistema_kWp"] * 5.0 <= 3.0
+    assert resultado["van"] == curva.loc[curva["Factible"], "VAN"].max()
+
+
+def test_sin_tamanos_factibles():
+    resultado = optimizar_tamano(**PARAMETROS, presupuesto_max=1.0)
+    assert not resultado["encontrado"]
+    assert not resultado["curva"]["Factible"].any()
+
+
+def test_criterio_payback():
+    resultado = optimizar_tamano(**PARAMETROS, criterio="payback")
+    curva = resultado["curva"]
+    assert resultado["payback"] == curva["Payback"].min()
+    with pytest.raises(ValueError):
+        optimizar_tamano(**PARAMETROS, criterio="tir")
@@ -0,0 +1,219 @@
+# rasters_fv: carga de los cubos desde GeoTIFF y consultas por pixel, bilineal y pixel válido más cercano
+import numpy as np
+import pytest
+
+from rasters_fv import KM_POR_GRADO, CuboRaster, consultar_cubo, muestrear_sitios
+
+rasterio = pytest.importorskip("rasterio")
+pytest.importorskip("scipy")
+
+# Grilla de 0.1° desde (lon -82, lat 1): 8 filas x 10 columnas. Las columnas 0-2 son mar (nodata).
+PASO = 0.1
+OESTE, NORTE = -82.0, 1.0
+COSTA = 3
+
+
+def campo(lat, lon, banda):
+    # Campo lineal: la interpolación bilineal entre centros lo reproduce exactamente
+    return 100 + 10 * banda + 20 * (lat - 0.5) - 15 * (lon + 81.5)
+
+
+def centro(fila, col):
+    # (lat, lon) del centro del pixel
+    return NORTE - (fila + 0.5) * PASO, OESTE + (col + 0.5) * PASO
+
+
+@pytest.fixture
+def cubo():
+    filas, cols = np.mgrid[0:8, 0:10]
+    lat, lon = centro(filas, cols)
+    datos = np.stack([campo(lat, lon, b) for b in range(2)]).astype(np.float32)
+    datos[:, :, :COSTA] = np.nan
+    return CuboRaster(datos, rasterio.transform.from_origin(OESTE, NORTE, PASO, PASO))
+
+
+def test_pixel_que_contiene_el_punto(cubo):
+    lat, lon = centro(4, 6)
+    valores, desplazamiento = consultar_cubo(cubo, [lat + 0.04], [lon - 0.04])
+    np.testing.assert_allclose(valores[0], cubo.datos[:, 4, 6])
+    assert desplazamiento[0] == 0
+
+
+def test_bilineal_reproduce_el_campo_lineal(cubo):
+    lat = np.array([0.53, 0.61, 0.32])
+    lon = np.array([-81.42, -81.27, -81.11])
+    valores, desplazamiento = consultar_cubo(cubo, lat, lon, bilineal=True)
+    esperado = np.stack([campo(lat, lon, b) for b in range(2)], axis=1)
+    np.testing.assert_allclose(valores, esperado, rtol=1e-6)
+    assert (desplazamiento == 0).all()
+    # En el centro de un pixel coincide con el modo por pixel
+    lat, lon = centro(2, 7)
+    np.testing.assert_allclose(consultar_cubo(cubo, lat, lon, bilineal=True)[0],
+                               consultar_cubo(cubo, lat, lon)[0], rtol=1e-6)
+
+
+def test_bilineal_en_la_costa_usa_solo_vecinos_validos(cubo):
+    # Punto en la columna costera, entre sus centros y los del mar: los vecinos del mar se
+    # descartan y los pesos de los válidos se renormalizan
+    lat_c, lon_c = centro(3, COSTA)
+    lat, lon = lat_c - 0.03, lon_c - 0.04
+    valores, _ = consultar_cubo(cubo, lat, lon, bilineal=True)
+    esperado = 0.7 * cubo.datos[:, 3, COSTA] + 0.3 * cubo.datos[:, 4, COSTA]
+    np.testing.assert_allclose(valores[0], esperado, rtol=1e-6)
+
+
+def test_pixel_valido_mas_cercano_en_la_costa(cubo):
+    # Centro de un pixel de mar a 2 pixeles de la costa (misma fila)
+    lat, lon = centro(5, COSTA - 2)
+    valores, desplazamiento = consultar_cubo(cubo, lat, lon)
+    assert np.isnan(valores).all() and np.isnan(desplazamiento[0])
+
+    valores, desplazamiento = consultar_cubo(cubo, lat, lon, max_distancia=3)
+    np.testing.assert_allclose(valores[0], cubo.datos[:, 5, COSTA])
+    assert desplazamiento[0] == pytest.approx(2 * PASO * KM_POR_GRADO)
+
+    # Fuera del radio de búsqueda sigue sin datos
+    valores, desplazamiento = consultar_cubo(cubo, lat, lon, max_distancia=1.5)
+    assert np.isnan(valores).all() and np.isnan(desplazamiento[0])
+
+
+def test_bilineal_sin_vecinos_validos_usa_el_pixel_mas_cercano(cubo):
+    # Lejos de la costa ningún vecino bilineal tiene datos; el respaldo toma el pixel válido
+    lat, lon = centro(1, 0)
+    valores, desplazamiento = consultar_cubo(cubo, [lat], [lon], bilineal=True, max_distancia=5)
+    np.testing.assert_allclose(valores[0], cubo.datos[:, 1, COSTA])
+    assert desplazamiento[0] == pytest.approx(COSTA * PASO * KM_POR_GRADO)
+
+
+def test_fuera_del_raster(cubo):
+    lat, lon = centro(0, 9)
+    valores, desplazamiento = consultar_cubo(cubo, [lat + 0.2, lat], [lon, lon + 0.3], max_distancia=5)
+    np.testing.assert_allclose(valores, cubo.datos[:, 0, 9][None, :].repeat(2, axis=0))
+    np.testing.assert_allclose(desplazamiento, [2 * PASO * KM_POR_GRADO, 3 * PASO * KM_POR_GRADO])
+    assert np.isnan(consultar_cubo(cubo, lat + 0.2, lon)[0]).all()
+
+
+def test_muestrear_sitios_mismos_modos(cubo):
+    lat = np.array([0.53, centro(5, 1)[0]])
+    lon = np.array([-81.42, centro(5, 1)[1]])
+    pvout, ghi = muestrear_sitios(lat, lon, cubo, cubo, bilineal=True, max_distancia=3)
+    esperado = consultar_cubo(cubo, lat, lon, bilineal=True, max_distancia=3)[0]
+    np.testing.assert_array_equal(pvout, esperado)
+    np.testing.assert_array_equal(ghi, esperado[:, 0])
+
+
+##########
+# Cubos cargados desde GeoTIFF (rasters sintéticos de conftest)
+
+def test_cargar_cubos(rasters):
+    from rasters_fv import cargar_cubo_ghi, cargar_cubo_pvout
+
+    cubo = cargar_cubo_pvout(rasters["pvout"])
+    np.testing.assert_array_equal(cubo.datos, rasters["datos_pvout"])
+    assert (cubo.bandas, cubo.alto, cubo.ancho) == rasters["datos_pvout"].shape
+    ghi = cargar_cubo_ghi(rasters["ghi"])
+    np.testing.assert_array_equal(ghi.datos[0], rasters["datos_ghi"])
+    assert ghi.transform == cubo.transform
+
+
+def test_cargar_cubo_sin_archivos(tmp_path):
+    from rasters_fv import cargar_cubo_ghi, cargar_cubo_pvout
+
+    with pytest.raises(FileNotFoundError):
+        cargar_cubo_pvout(str(tmp_path))
+    with pytest.raises(FileNotFoundError, match="GHI"):
+        cargar_cubo_ghi(str(tmp_path / "GHI.tif"))
+
+
+def test_cargar_cubo_ghi_rechaza_un_pvout(rasters):
+    from rasters_fv import cargar_cubo_ghi
+
+    with pytest.raises(ValueError, match="GHI diario"):
+        cargar_cubo_ghi(rasters["pvout"] + "/PVOUT_01.tif")
+
+
+def test_muestrear_cubo_punto_y_lote(rasters):
+    from rasters_fv import cargar_cubo_pvout, muestrear_cubo
+
+    cubo = cargar_cubo_pvout(rasters["pvout"])
+    lat, lon = rasters["centro"](7, 30)
+    np.testing.assert_array_equal(muestrear_cubo(cubo, lat, lon), rasters["datos_pvout"][:, 7, 30])
+
+    filas, cols = np.array([0, 12, 39, 20]), np.array([47, 5, 20, 2])   # el último cae en el mar
+    lat, lon = rasters["centro"](filas, cols)
+    valores = muestrear_cubo(cubo, lat, lon)
+    assert valores.shape == (4, 12)
+    np.testing.assert_array_equal(valores[:3], rasters["datos_pvout"][:, filas[:3], cols[:3]].T)
+    assert np.isnan(valores[3]).all()
+
+
+def sitios_prueba(rasters, n=500):
+    # Sitios al azar dentro y fuera de la grilla (incluye mar y puntos fuera del raster)
+    rng = np.random.default_rng(2)
+    return rng.uniform(-1.7, 0.7, n), rng.uniform(-81.2, -78.4, n)
+
+
+def test_muestrear_sitios_en_lote(rasters):
+    from rasters_fv import cargar_cubo_ghi, cargar_cubo_pvout, filas_columnas
+
+    cubo_pvout, cubo_ghi = cargar_cubo_pvout(rasters["pvout"]), cargar_cubo_ghi(rasters["ghi"])
+    lat, lon = sitios_prueba(rasters)
+    pvout, ghi = muestrear_sitios(lat, lon, cubo_pvout, cubo_ghi)
+    assert pvout.shape == (lat.size, 12) and ghi.shape == (lat.size,)
+
+    # Referencia punto a punto
+    fila, col = filas_columnas(cubo_pvout.transform, lat, lon)
+    for i in range(lat.size):
+        if 0 <= fila[i] < cubo_pvout.alto and 0 <= col[i] < cubo_pvout.ancho:
+            np.testing.assert_array_equal(pvout[i], rasters["datos_pvout"][:, fila[i], col[i]])
+            np.testing.assert_array_equal(ghi[i], rasters["datos_ghi"][fila[i], col[i]])
+        else:
+            assert np.isnan(pvout[i]).all() and np.isnan(ghi[i])
+
+    with pytest.raises(ValueError):
+        muestrear_sitios(lat, lon[:-1], cubo_pvout, cubo_ghi)
+
+
+def test_muestrear_sitios_archivos_igual_al_cubo(rasters):
+    from rasters_fv import CacheBloques, cargar_cubo_ghi, cargar_cubo_pvout, muestrear_sitios_archivos
+
+    lat, lon = sitios_prueba(rasters)
+    esperado = muestrear_sitios(lat, lon, cargar_cubo_pvout(rasters["pvout"]), cargar_cubo_ghi(rasters["ghi"]))
+    pvout, ghi = muestrear_sitios_archivos(lat, lon, rasters["pvout"], rasters["ghi"], cache=CacheBloques())
+    np.testing.assert_array_equal(pvout, esperado[0])
+    np.testing.assert_array_equal(ghi, esperado[1])
+
+
+def test_cache_bloques_decodifica_cada_bloque_una_vez(rasters):
+    from rasters_fv import CacheBloques, muestrear_sitios_archivos
+
+    # 3 x 3 bloques de hasta 16 x 16 por archivo (40 x 48 pixeles) y 13 archivos (12 PVOUT + GHI)
+    lat, lon = sitios_prueba(rasters, 2000)
+    cache = CacheBloques()
+    primera = muestrear_sitios_archivos(lat, lon, rasters["pvout"], rasters["ghi"], cache=cache)
+    estadisticas = cache.estadisticas()
+    assert estadisticas["bloques_decodificados"] == 13 * 9
+    assert estadisticas["bytes_decodificados"] == 13 * 40 * 48 * 4
+
+    segunda = muestrear_sitios_archivos(lat, lon, rasters["pvout"], rasters["ghi"], cache=cache)
+    assert cache.estadisticas()["bloques_decodificados"] == 13 * 9
+    np.testing.assert_array_equal(primera[0], segunda[0])
+
+
+def test_cache_bloques_respeta_el_limite_de_bytes(rasters):
+    from rasters_fv import CacheBloques, muestrear_sitios_archivos
+
+    lat, lon = sitios_prueba(rasters, 2000)
+    cache = CacheBloques(max_bytes=4 * 16 * 16 * 4)        # hasta 4 bloques completos
+    esperado = muestrear_sitios_archivos(lat, lon, rasters["pvout"], rasters["ghi"], cache=CacheBloques())
+    for _ in range(2):
+        pvout, ghi = muestrear_sitios_archivos(lat, lon, rasters["pvout"], rasters["ghi"], cache=cache)
+        np.testing.assert_array_equal(pvout, esperado[0])
+        np.testing.assert_array_equal(ghi, esperado[1])
+
+    estadisticas = cache.estadisticas()
+    assert estadisticas["bytes"] <= estadisticas["max_bytes"] and estadisticas["entradas"] <= 8
+    # Sin lugar para todos, la segunda pasada vuelve a decodificar
+    assert estadisticas["bloques_decodificados"] == 2 * 13 * 9
+    cache.limpiar()
+    assert cache.estadisticas()["bytes"] == 0
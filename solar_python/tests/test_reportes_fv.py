@@ -0,0 +1,187 @@
+# ColaReportes: pedidos iguales comparten el trabajo y los terminados salen de la caché
+import threading
+import time
+import zipfile
+
+import pandas as pd
+import pytest
+
+from reportes_fv import ColaReportes
+
+
+class GeneradorFalso:
+    # Cuenta las generaciones; cada una espera a que se libere el evento
+    def __init__(self):
+        self.llamadas = 0
+        self.liberar = threading.Event()
+
+    def __call__(self, datos, progreso=None):
+        self.llamadas += 1
+        if progreso:
+            progreso(0.5, "A la mitad")
+        self.liberar.wait(5)
+        if datos.get("fallar"):
+            raise RuntimeError("falló la maquetación")
+        return f"PDF {datos['n']}".encode()
+
+
+def esperar(cola, id_trabajo, estados=("listo", "error")):
+    limite = time.monotonic() + 5
+    while cola.estado(id_trabajo)["estado"] not in estados:
+        assert time.monotonic() < limite, cola.estado(id_trabajo)
+        time.sleep(0.005)
+    return cola.estado(id_trabajo)
+
+
+def test_pedidos_iguales_en_curso_comparten_trabajo():
+    generar = GeneradorFalso()
+    cola = ColaReportes(max_hilos=2, generar=generar)
+    primero = cola.enviar({"n": 1})
+    assert cola.enviar({"n": 1}) == primero
+    otro = cola.enviar({"n": 2})
+    assert otro != primero
+
+    assert esperar(cola, primero, ("en_proceso",))["mensaje"] in ("En cola", "A la mitad")
+    generar.liberar.set()
+    assert esperar(cola, primero)["pdf"] == b"PDF 1"
+    assert esperar(cola, otro)["pdf"] == b"PDF 2"
+    assert generar.llamadas == 2
+
+
+def test_reporte_terminado_sale_de_la_cache():
+    generar = GeneradorFalso()
+    generar.liberar.set()
+    cola = ColaReportes(generar=generar)
+    primero = cola.enviar({"n": 1})
+    esperar(cola, primero)
+
+    repetido = cola.enviar({"n": 1})
+    assert repetido != primero
+    estado = cola.estado(repetido)      # listo sin pasar por el pool
+    assert estado["estado"] == "listo" and estado["pdf"] == b"PDF 1" and "caché" in estado["mensaje"]
+    assert generar.llamadas == 1
+
+
+def test_error_queda_en_el_estado_y_se_puede_reintentar():
+    generar = GeneradorFalso()
+    generar.liberar.set()
+    cola = ColaReportes(generar=generar)
+    id_trabajo = cola.enviar({"n": 1, "fallar": True})
+    estado = esperar(cola, id_trabajo)
+    assert estado["estado"] == "error" and "maquetación" in estado["error"] and estado["pdf"] is None
+
+    # Los errores no se guardan: el mismo pedido se vuelve a generar
+    esperar(cola, cola.enviar({"n": 1, "fallar": True}))
+    assert generar.llamadas == 2
+
+
+def test_preparacion_con_el_primer_pedido():
+    generar = GeneradorFalso()
+    generar.liberar.set()
+    preparaciones = []
+    cola = ColaReportes(generar=generar, al_primer_pedido=lambda: preparaciones.append(1))
+    time.sleep(0.05)
+    assert preparaciones == []      # crear la cola (al abrir la app) no arranca nada
+
+    esperar(cola, cola.enviar({"n": 1}))
+    esperar(cola, cola.enviar({"n": 2}))
+    esperar(cola, cola.enviar({"n": 1}))
+    assert preparaciones == [1]
+
+
+def test_id_desconocido():
+    assert ColaReportes(generar=GeneradorFalso()).estado("no-existe") is None
+
+
+def test_pdf_real():
+    pytest.importorskip("reportlab")
+    from reportes_fv import generar_pdf
+
+    datos = {"cant_meses": 12, "año_min": 2023, "año_max": 2023, "consumo_promedio_kWh": 150.0,
+             "lat": -2.19, "lon": -79.89, "radiacion_diaria": 4.6, "tarifa_promedio": 0.117,
+             "objetivo_cobertura": 0.75, "tamano_sistema_kWp": 1.2, "produccion_total": 1500.0,
+             "ahorro_anual": 180.0, "interpretacion": "Texto."}
+    etapas = []
+    pdf = generar_pdf(datos, lambda fraccion, mensaje: etapas.append(fraccion))
+    assert pdf.startswith(b"%PDF")
+    assert etapas == sorted(etapas) and etapas[-1] == 1.0
+
+
+##########
+# Reportes por lote
+
+def resultados_lote(sitios):
+    n = len(sitios)
+    return pd.DataFrame({
+        "Sitio": sitios, "meses": [12] * n, "consumo_promedio_kWh": [150.0] * n, "lat": [-2.19] * n,
+        "lon": [-79.89] * n, "radiacion_diaria": [4.6] * n, "tarifa_mas_impuestos": [0.117] * n,
+        "tamano_sistema_kWp": [1.2] * n, "pvout_promedio": [118.0] * n, "inversion_usd": [1440.0] * n,
+        "van": [229.4] * n, "tir": [0.126] * n, "payback": [7.5] * n,
+        "estado": ["ok"] * (n - 1) + ["fuera_del_raster"],
+    })
+
+
+@pytest.mark.parametrize("procesos", [1, 2])
+def test_generar_lote_zip_con_nombres_repetidos(tmp_path, procesos):
+    pytest.importorskip("reportlab")
+    from reportes_fv import generar_lote
+
+    # "A/1", "A_1" y "A 1" dan el mismo nombre seguro; el último sitio está fuera del raster
+    resultados = resultados_lote(["A/1", "A_1", "A 1", "B", "mar"])
+    destino = tmp_path / "reportes.zip"
+    assert generar_lote(resultados, str(destino), 0.75, procesos=procesos, tamano_bloque=2) == 4
+    with zipfile.ZipFile(destino) as archivo:
+        nombres = archivo.namelist()
+        assert nombres == ["reporte_A_1.pdf", "reporte_A_1_2.pdf", "reporte_A_1_3.pdf", "reporte_B.pdf"]
+        assert all(archivo.read(nombre).startswith(b"%PDF") for nombre in nombres)
+
+
+def test_generar_lote_carpeta(tmp_path):
+    pytest.importorskip("reportlab")
+    from reportes_fv import main
+
+    ruta = tmp_path / "resultados.csv"
+    resultados_lote(["x", "y", "z"]).to_csv(ruta, index=False)
+    main([str(ruta), str(tmp_path / "pdfs")])
+    assert sorted(p.name for p in (tmp_path / "pdfs").iterdir()) == ["reporte_x.pdf", "reporte_y.pdf"]
+
+
+##########
+# Gráficos en el PDF
+
+def datos_con_graficos():
+    import plotly.graph_objects as go
+    figura = go.Figure(go.Bar(x=list(range(1, 13)), y=list(range(12))))
+    return {"cant_meses": 12, "consumo_promedio_kWh": 150.0, "lat": -2.19, "lon": -79.89,
+            "radiacion_diaria": 4.6, "tarifa_promedio": 0.117, "objetivo_cobertura": 0.75,
+            "tamano_sistema_kWp": 1.2, "produccion_total": 1500.0, "ahorro_anual": 180.0,
+            "interpretacion": "Texto.", "graficos": [("Consumo mensual", figura.to_json())]}
+
+
+def test_pdf_con_graficos():
+    pytest.importorskip("reportlab")
+    pytest.importorskip("plotly")
+    pytest.importorskip("kaleido")
+    import graficos_fv
+    from reportes_fv import ANCHO_GRAFICO, ALTO_GRAFICO, generar_pdf
+
+    datos = datos_con_graficos()
+    pdf = generar_pdf(datos)
+    assert pdf.startswith(b"%PDF") and b"/Subtype /Image" in pdf
+    # La imagen queda en caché para el siguiente reporte con la misma figura
+    assert graficos_fv.imagen_png(datos["graficos"][0][1], ANCHO_GRAFICO, ALTO_GRAFICO).startswith(b"\x89PNG")
+    assert graficos_fv._IMAGENES.aciertos >= 1
+
+
+def test_pdf_sin_kaleido(monkeypatch):
+    pytest.importorskip("reportlab")
+    pytest.importorskip("plotly")
+    import graficos_fv
+    from reportes_fv import contenido_reporte, generar_pdf
+
+    monkeypatch.setattr(graficos_fv, "exportador_disponible", lambda: False)
+    datos = datos_con_graficos()
+    pdf = generar_pdf(datos)
+    assert pdf.startswith(b"%PDF") and b"/Subtype /Image" not in pdf
+    textos = [getattr(f, "text", "") for f in contenido_reporte(datos, [("Consumo mensual", None)])]
+    assert any("kaleido" in texto for texto in textos)
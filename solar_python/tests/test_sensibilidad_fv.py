@@ -0,0 +1,69 @@
+# Sensibilidad: cada escenario del tornado y del mapa de calor coincide con evaluar_proyecto
+import numpy as np
+import pytest
+
+from motor_fv import INCREMENTO_TARIFA, evaluar_proyecto
+from sensibilidad_fv import PARAMETROS, evaluar_escenarios, mapa_calor, tornado
+
+BASE = {
+    "consumo_promedio_kWh": 150.0,
+    "valores_mensuales": np.array([118.0, 104.0, 121.0, 113.0, 116.0, 109.0, 120.0, 127.0, 125.0, 124.0, 117.0, 119.0]),
+    "radiacion_diaria": 4.6,
+    "objetivo_cobertura": 0.75,
+    "años_proyecto": 20,
+    "tasa_descuento": 0.08,
+    "costo_Wp": 1.2,
+    "mantenimiento_anual": 20.0,
+    "factor_perdidas": 0.8,
+    "tarifa": 0.117,
+}
+
+
+def van_escalar(**cambios):
+    p = {**BASE, **cambios}
+    return evaluar_proyecto(p["consumo_promedio_kWh"], p["tarifa"], p["valores_mensuales"], p["radiacion_diaria"],
+                            p["factor_perdidas"], p["objetivo_cobertura"], p["costo_Wp"], p["mantenimiento_anual"],
+                            p["años_proyecto"], p["tasa_descuento"])["van"]
+
+
+def test_caso_base():
+    resultado = evaluar_escenarios(BASE)
+    assert resultado["van"].shape == ()
+    assert float(resultado["van"]) == pytest.approx(van_escalar())
+
+
+def test_tornado_contra_evaluacion_escalar():
+    resultado = tornado(BASE, variacion=0.2)
+    tabla = resultado["tabla"]
+    assert resultado["van_base"] == pytest.approx(van_escalar())
+    assert set(tabla["parametro"]) == set(PARAMETROS)
+    assert (np.diff(tabla["Impacto VAN"]) <= 0).all()
+
+    for _, fila in tabla.iterrows():
+        parametro = fila["parametro"]
+        if parametro == "incremento_tarifa":
+            assert fila["Valor bajo"] == pytest.approx(INCREMENTO_TARIFA * 0.8)
+            continue
+        assert fila["VAN bajo"] == pytest.approx(van_escalar(**{parametro: BASE[parametro] * 0.8}))
+        assert fila["VAN alto"] == pytest.approx(van_escalar(**{parametro: BASE[parametro] * 1.2}))
+
+
+def test_tornado_incremento_de_tarifa():
+    # Con incremento cero la tarifa no escala: el VAN baja respecto del caso base
+    sin_incremento = evaluar_escenarios(BASE, incremento_tarifa=np.array([0.0, INCREMENTO_TARIFA]))
+    assert sin_incremento["van"][0] < sin_incremento["van"][1] == pytest.approx(van_escalar())
+
+
+def test_mapa_calor_contra_evaluacion_escalar():
+    resultado = mapa_calor(BASE, "costo_Wp", "tarifa", variacion=0.3, puntos=5)
+    assert resultado["van"].shape == (5, 5)
+    np.testing.assert_allclose(resultado["x"], np.linspace(1.2 * 0.7, 1.2 * 1.3, 5))
+    for i, tarifa in enumerate(resultado["y"]):
+        for j, costo in enumerate(resultado["x"]):
+            assert resultado["van"][i, j] == pytest.approx(van_escalar(tarifa=tarifa, costo_Wp=costo))
+
+
+def test_mapa_calor_recorta_el_factor_de_perdidas():
+    resultado = mapa_calor({**BASE, "factor_perdidas": 0.95}, "factor_perdidas", "tarifa", variacion=0.3, puntos=3)
+    assert resultado["x"].max() == 1.0
+    assert resultado["van"][1, 2] == pytest.approx(van_escalar(factor_perdidas=1.0))
@@ -0,0 +1,59 @@
+# Saldo rodante de Net Billing (recurrencia de Lindley) contra un bucle mes a mes
+import numpy as np
+import pytest
+
+from tarifas_fv import PERIODO_CREDITO, _saldo_rodante, liquidar_esquemas
+
+
+def saldo_rodante_bucle(saldo, periodo=PERIODO_CREDITO):
+    # credito[m] = max(0, credito[m-1] - saldo[m]), reiniciado cada periodo meses; lo que
+    # queda al cerrar el periodo vence
+    pagado, credito, vencido = np.zeros_like(saldo), np.zeros_like(saldo), np.zeros_like(saldo)
+    for fila in np.ndindex(saldo.shape[:-1]):
+        anterior = 0.0
+        for m in range(saldo.shape[-1]):
+            if m % periodo == 0:
+                anterior = 0.0
+            actual = max(0.0, anterior - saldo[fila + (m,)])
+            pagado[fila + (m,)] = saldo[fila + (m,)] + actual - anterior
+            credito[fila + (m,)] = actual
+            if m % periodo == periodo - 1:
+                vencido[fila + (m,)] = actual
+            anterior = actual
+    return pagado, credito, vencido
+
+
+@pytest.mark.parametrize("meses, periodo", [(12, 12), (36, 12), (30, 12), (30, 7), (5, 12)])
+def test_saldo_rodante_igual_a_bucle(meses, periodo):
+    rng = np.random.default_rng(meses * periodo)
+    saldo = rng.normal(0, 20, (2, 3, meses))
+    for obtenido, esperado in zip(_saldo_rodante(saldo, periodo), saldo_rodante_bucle(saldo, periodo)):
+        np.testing.assert_allclose(obtenido, esperado, atol=1e-10)
+
+
+def test_saldo_rodante_casos_borde():
+    # Todo a favor: nunca se paga y el saldo acumulado vence al cierre del periodo
+    pagado, credito, vencido = _saldo_rodante(np.full((1, 24), -10.0))
+    assert (pagado == 0).all()
+    np.testing.assert_allclose(credito[0, :12], np.arange(1, 13) * 10.0)
+    np.testing.assert_allclose(vencido[0, [11, 23]], [120.0, 120.0])
+    assert vencido.sum() == 240.0
+
+    # Todo por pagar: se paga el saldo tal cual
+    saldo = np.arange(1.0, 25.0)[None, :]
+    pagado, credito, vencido = _saldo_rodante(saldo)
+    np.testing.assert_allclose(pagado, saldo)
+    assert (credito == 0).all() and (vencido == 0).all()
+
+
+def test_net_billing_factura_desde_saldo_rodante():
+    rng = np.random.default_rng(3)
+    generacion = rng.uniform(50, 400, (2, 12))
+    consumo = rng.uniform(100, 300, (2, 12))
+    liquidacion = liquidar_esquemas(generacion, consumo, 0.12, 0.05)["net_billing"]
+    autoconsumo = np.minimum(generacion, consumo)
+    saldo = ((consumo - autoconsumo) * 0.12 - (generacion - autoconsumo) * 0.05).reshape(1, 24)
+    pagado, credito, vencido = saldo_rodante_bucle(saldo)
+    np.testing.assert_allclose(liquidacion["factura"].reshape(1, 24), pagado, atol=1e-10)
+    np.testing.assert_allclose(liquidacion["credito_usd"].reshape(1, 24), credito, atol=1e-10)
+    np.testing.assert_allclose(liquidacion["credito_vencido_usd"].reshape(1, 24), vencido, atol=1e-10)